@@ -7,16 +7,23 @@ import os
 class Settings(BaseSettings):
     # Database
     database_url: str = Field(default="sqlite:///./real_estate.db", env="DATABASE_URL")
+    # Connection pool: room for three concurrent scrape jobs plus notifier and dashboard queries
+    db_pool_size: int = Field(default=10, env="DB_POOL_SIZE")
+    db_max_overflow: int = Field(default=20, env="DB_MAX_OVERFLOW")
+    db_pool_timeout: int = Field(default=30, env="DB_POOL_TIMEOUT")  # Seconds to wait for a free connection
 
     # Scraping
     scraping_interval_minutes: int = Field(default=15, env="SCRAPING_INTERVAL_MINUTES")
     yad2_interval_minutes: int = Field(default=15, env="YAD2_INTERVAL_MINUTES")
     madlan_interval_minutes: int = Field(default=15, env="MADLAN_INTERVAL_MINUTES")
     facebook_interval_minutes: int = Field(default=20, env="FACEBOOK_INTERVAL_MINUTES")
+    scrape_stagger_seconds: int = Field(default=60, env="SCRAPE_STAGGER_SECONDS")  # Offset between sources' first runs
+    scrape_jitter_seconds: int = Field(default=30, env="SCRAPE_JITTER_SECONDS")  # Random +/- on each scheduled run
 
     # Telegram
     telegram_bot_token: Optional[str] = Field(default=None, env="TELEGRAM_BOT_TOKEN")
     telegram_chat_id: Optional[str] = Field(default=None, env="TELEGRAM_CHAT_ID")
+    telegram_send_interval_seconds: float = Field(default=1.0, env="TELEGRAM_SEND_INTERVAL_SECONDS")  # Telegram allows about one message per second per chat
 
     # Dashboard
     dashboard_host: str = Field(default="127.0.0.1", env="DASHBOARD_HOST")
@@ -55,16 +62,19 @@ class Settings(BaseSettings):
     chrome_debug_port: int = Field(default=9222, env="CHROME_DEBUG_PORT")
     chrome_user_data_dir: str = Field(default="~/chrome_bot_profile", env="CHROME_USER_DATA_DIR")
     headless: bool = Field(default=False, env="HEADLESS")
+    cookie_save_every_runs: int = Field(default=10, env="COOKIE_SAVE_EVERY_RUNS")  # Scrapes between cookie snapshots to the DB
 
     # Scraping Behavior
     scraper_polling_interval: int = Field(default=15, env="SCRAPER_POLLING_INTERVAL")
     default_max_scrolls: int = Field(default=5, env="DEFAULT_MAX_SCROLLS")
     min_wait_after_scroll: float = Field(default=2.0, env="MIN_WAIT_AFTER_SCROLL")
     max_wait_after_scroll: float = Field(default=5.0, env="MAX_WAIT_AFTER_SCROLL")
+    block_heavy_resources: bool = Field(default=True, env="BLOCK_HEAVY_RESOURCES")
 
     # Retries
     scraper_max_retries: int = Field(default=3, env="SCRAPER_MAX_RETRIES")
-    retry_delay_seconds: int = Field(default=60, env="RETRY_DELAY_SECONDS")
+    retry_delay_seconds: int = Field(default=60, env="RETRY_DELAY_SECONDS")  # Base delay, doubled after each failed attempt
+    retry_max_delay_seconds: int = Field(default=600, env="RETRY_MAX_DELAY_SECONDS")
 
     # Captcha Logic
     captcha_check_interval: int = Field(default=30, env="CAPTCHA_CHECK_INTERVAL")
@@ -1,4 +1,4 @@
-from sqlalchemy import create_engine, Column, Integer, String, Float, DateTime, Boolean, Text, ForeignKey, UniqueConstraint
+from sqlalchemy import create_engine, make_url, Column, Integer, String, Float, DateTime, Boolean, Text, ForeignKey, UniqueConstraint, Index
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, relationship
 from datetime import datetime
@@ -48,8 +48,8 @@ class Listing(Base):
     contact_phone = Column(String(50), index=True)
 
     # Metadata
-    first_seen = Column(DateTime, default=datetime.utcnow)
-    last_seen = Column(DateTime, default=datetime.utcnow)
+    first_seen = Column(DateTime, default=datetime.utcnow, index=True)
+    last_seen = Column(DateTime, default=datetime.utcnow, index=True)
     last_checked = Column(DateTime, default=datetime.utcnow)
 
     # Status
@@ -156,6 +156,12 @@ class Notification(Base):
 
     listing = relationship("Listing", back_populates="notifications")
 
+    __table_args__ = (
+        # Already-notified lookups filter on listing and type; the 24-hour price drop check
+        # also range-scans sent_at
+        Index('ix_notifications_listing_type_sent', 'listing_id', 'notification_type', 'sent_at'),
+    )
+
 
 class ScrapingState(Base):
     __tablename__ = 'scraping_state'
@@ -199,9 +205,30 @@ class NeighborhoodStats(Base):
     )
 
 
-def init_db(database_url):
+def init_db(database_url, pool_size=5, max_overflow=10, pool_timeout=30):
     """Initialize database and create all tables"""
-    engine = create_engine(database_url, echo=False)
+    url = make_url(database_url)
+    engine_options = {}
+    if not (url.get_backend_name() == 'sqlite' and url.database in (None, '', ':memory:')):
+        # File and server databases use a QueuePool; in-memory SQLite keeps its own pool
+        engine_options.update(
+            pool_size=pool_size,
+            max_overflow=max_overflow,
+            pool_timeout=pool_timeout,
+            pool_pre_ping=True
+        )
+    if url.get_driver_name() == 'psycopg2':
+        # Batch executemany UPDATEs too (INSERTs already use insertmanyvalues)
+        engine_options.update(
+            executemany_mode='values_plus_batch',
+            insertmanyvalues_page_size=1000,
+            executemany_batch_page_size=500
+        )
+    engine = create_engine(database_url, echo=False, **engine_options)
     Base.metadata.create_all(engine)
+    # create_all skips tables that already exist, so add indexes defined since the database was created
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(engine, checkfirst=True)
     SessionLocal = sessionmaker(bind=engine)
     return engine, SessionLocal
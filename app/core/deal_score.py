@@ -1,7 +1,9 @@
+from contextlib import contextmanager
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Dict, Iterable, Iterator, Optional, Tuple
+from sqlalchemy import func
 from sqlalchemy.orm import Session
-from app.core.database import Listing, NeighborhoodStats
+from app.core.database import Listing, NeighborhoodStats, PriceHistory
 from app.core.config import settings
 import statistics
 
@@ -12,6 +14,21 @@ class DealScoreCalculator:
     def __init__(self, db_session: Session):
         self.db = db_session
         self.settings = settings
+        # Neighborhood stats by (city, neighborhood), only while a batch is being scored
+        self._stats_cache: Optional[Dict[Tuple[str, str], Optional[NeighborhoodStats]]] = None
+
+    @contextmanager
+    def batch(self, neighborhoods: Iterable[Tuple[str, str]] = ()) -> Iterator[None]:
+        """
+        Reuse neighborhood stats lookups while scoring a batch of listings
+        Stats for the given (city, neighborhood) pairs are prefetched in one query.
+        """
+        self._stats_cache = {}
+        self.prefetch_neighborhood_stats(neighborhoods)
+        try:
+            yield
+        finally:
+            self._stats_cache = None
 
     def calculate_score(self, listing: Listing) -> float:
         """
@@ -47,10 +64,7 @@ class DealScoreCalculator:
         max_score = self.settings.deal_score_weight_price
 
         # Get neighborhood stats
-        stats = self.db.query(NeighborhoodStats).filter(
-            NeighborhoodStats.city == listing.city,
-            NeighborhoodStats.neighborhood == listing.neighborhood
-        ).first()
+        stats = self._get_neighborhood_stats(listing.city, listing.neighborhood)
 
         if not stats or not stats.avg_price_per_sqm:
             # No data, give neutral score (50% of max)
@@ -76,6 +90,41 @@ class DealScoreCalculator:
         else:  # More than 20% above average
             return max_score * 0.125
 
+    def prefetch_neighborhood_stats(self, neighborhoods: Iterable[Tuple[str, str]]):
+        """Load stats for many (city, neighborhood) pairs into the batch cache in one query"""
+        if self._stats_cache is None:
+            return
+
+        # Pairs with a missing part are left to the per-listing IS NULL lookup
+        keys = {key for key in neighborhoods if None not in key} - self._stats_cache.keys()
+        if not keys:
+            return
+
+        found = {
+            (stats.city, stats.neighborhood): stats
+            for stats in self.db.query(NeighborhoodStats).filter(
+                NeighborhoodStats.neighborhood.in_({neighborhood for _, neighborhood in keys})
+            )
+        }
+        # Pairs without stats are cached too, so they aren't queried again one by one
+        for key in keys:
+            self._stats_cache[key] = found.get(key)
+
+    def _get_neighborhood_stats(self, city: str, neighborhood: str) -> Optional[NeighborhoodStats]:
+        """Get stats for a neighborhood, from the batch cache when scoring a batch"""
+        key = (city, neighborhood)
+        if self._stats_cache is not None and key in self._stats_cache:
+            return self._stats_cache[key]
+
+        stats = self.db.query(NeighborhoodStats).filter(
+            NeighborhoodStats.city == city,
+            NeighborhoodStats.neighborhood == neighborhood
+        ).first()
+
+        if self._stats_cache is not None:
+            self._stats_cache[key] = stats
+        return stats
+
     def _score_features(self, listing: Listing) -> float:
         """Score based on matching user preferences"""
         score = 0.0
@@ -190,6 +239,48 @@ class DealScoreCalculator:
 
         return ((previous_price - current_price) / previous_price) * 100
 
+    def get_price_drop_percentages(self, listings: Iterable[Listing]) -> Dict[int, Optional[float]]:
+        """
+        Price drop percentage for each listing id, like get_price_drop_percentage
+        The latest two price history entries of every listing are read in one query.
+        """
+        listing_ids = list({listing.id for listing in listings if listing.id is not None})
+        if not listing_ids:
+            return {}
+
+        # Newest first; equal timestamps keep insertion order, as in get_price_drop_percentage
+        ranked = self.db.query(
+            PriceHistory.listing_id,
+            PriceHistory.price,
+            func.row_number().over(
+                partition_by=PriceHistory.listing_id,
+                order_by=(PriceHistory.timestamp.desc(), PriceHistory.id)
+            ).label('position')
+        ).filter(PriceHistory.listing_id.in_(listing_ids)).subquery()
+
+        rows = self.db.query(ranked.c.listing_id, ranked.c.price).filter(
+            ranked.c.position <= 2
+        ).order_by(ranked.c.listing_id, ranked.c.position).all()
+
+        latest_prices: Dict[int, list] = {}
+        for listing_id, price in rows:
+            latest_prices.setdefault(listing_id, []).append(price)
+
+        drops: Dict[int, Optional[float]] = {}
+        for listing_id in listing_ids:
+            prices = latest_prices.get(listing_id, [])
+            if len(prices) < 2:
+                drops[listing_id] = None
+                continue
+
+            current_price, previous_price = prices
+            if not current_price or not previous_price or previous_price <= 0:
+                drops[listing_id] = None
+            else:
+                drops[listing_id] = ((previous_price - current_price) / previous_price) * 100
+
+        return drops
+
 
 def update_neighborhood_stats(db_session: Session):
     """Update neighborhood statistics from current listings"""
@@ -1,10 +1,12 @@
+from sqlalchemy import insert
 from sqlalchemy.orm import Session
 from app.core.database import Listing, PriceHistory, DescriptionHistory
 from app.core.deal_score import DealScoreCalculator
 from app.core.config import settings
+from collections import defaultdict
 from datetime import datetime
 import logging
-from typing import Dict, Optional, List
+from typing import Dict, Optional, List, Tuple
 
 from app.utils.phone_normalizer import normalize_israeli_phone
 from app.utils.duplicate_detector import DuplicateDetector
@@ -13,6 +15,31 @@ from app.utils.listing_filter import ListingFilter
 logger = logging.getLogger(__name__)
 
 
+class PendingListings:
+    """
+    New listings of one batch, queued for a bulk insert
+    The queued listings are indexed like DuplicateDetector.load_candidates, so
+    later listings in the same batch are matched against them with every strategy.
+    """
+
+    def __init__(self):
+        self.rows: Dict[str, Dict] = {}
+        self.candidates: Dict[str, Dict] = {'property_hash': {}, 'external_id': {}, 'phone': {}}
+
+    def add(self, values: Dict, source: str, normalized_phone: Optional[str]):
+        """Queue a new listing's column values and index it for in-batch matching"""
+        property_hash = values['property_hash']
+        self.rows[property_hash] = values
+
+        # Transient, never added to the session; only its address is matched against
+        listing = Listing(property_hash=property_hash, address=values.get('address'))
+        self.candidates['property_hash'][property_hash] = listing
+        if values.get('external_id'):
+            self.candidates['external_id'][(source, values['external_id'])] = listing
+        if normalized_phone:
+            self.candidates['phone'].setdefault(normalized_phone, []).append(listing)
+
+
 class ListingProcessor:
     """Process and store scraped listings"""
 
@@ -26,35 +53,74 @@ class ListingProcessor:
     def process_listings(self, listings: List[Dict], source: str) -> Dict[str, int]:
         """
         Process a batch of listings from a source
-        Returns stats: {new: X, updated: X, duplicates: X, filtered: X}
+        Returns stats: {new: X, updated: X, duplicates: X, filtered: X, price_drops: X}
         """
         logger.info(f"[Listing Processor] Starting batch processing, source: {source}, count: {len(listings)}")
 
-        stats = {
+        # Seeded so every key is reported, even when its count is zero
+        stats = defaultdict(int, {
             'new': 0,
             'updated': 0,
             'duplicates': 0,
             'filtered': 0,
             'price_drops': 0
-        }
+        })
 
-        for idx, listing_data in enumerate(listings, 1):
-            try:
-                logger.debug(f"[Listing Processor] Processing listing, index: {idx}/{len(listings)}, source: {source}")
-                result = self.process_single_listing(listing_data, source)
-                stats[result] += 1
-                logger.debug(f"[Listing Processor] Listing processed, result: {result}, index: {idx}")
-            except Exception as e:
-                logger.error(f"[Listing Processor] Error processing listing, index: {idx}, error: {e}")
-                continue
+        # The same property can appear twice in one scrape (e.g. across result pages)
+        listings, keys, stats['duplicates'] = self._merge_batch_duplicates(listings)
+
+        # Load every existing listing the batch could match, one query per strategy
+        candidates = self.duplicate_detector.load_candidates(
+            property_hashes=[property_hash for property_hash, _ in keys],
+            external_ids=[(source, listing_data.get('external_id')) for listing_data in listings],
+            phones=[phone for _, phone in keys]
+        )
+
+        # New listings are queued here and inserted in bulk after the loop
+        pending = PendingListings()
+
+        # One timestamp for the whole batch
+        now = datetime.utcnow()
+
+        # Deal scoring queries would otherwise autoflush the pending updates once per
+        # listing; without autoflush the whole batch is flushed together at commit.
+        # Neighborhood stats for the whole batch are prefetched in one query
+        neighborhoods = {(listing_data.get('city'), listing_data.get('neighborhood')) for listing_data in listings}
+        with self.db.no_autoflush, self.deal_calculator.batch(neighborhoods):
+            for idx, listing_data in enumerate(listings, 1):
+                try:
+                    logger.debug(f"[Listing Processor] Processing listing, index: {idx}/{len(listings)}, source: {source}")
+                    result = self.process_single_listing(
+                        listing_data, source, pending=pending, candidates=candidates, now=now
+                    )
+                    stats[result] += 1
+                    logger.debug(f"[Listing Processor] Listing processed, result: {result}, index: {idx}")
+                except Exception as e:
+                    logger.error(f"[Listing Processor] Error processing listing, index: {idx}, error: {e}")
+                    continue
+
+        if pending.rows:
+            stats['new'] = self._bulk_create_listings(list(pending.rows.values()))
 
         self.db.commit()
+        stats = dict(stats)
         logger.info(f"[Listing Processor] Batch processing completed, source: {source}, stats: {stats}")
         return stats
 
-    def process_single_listing(self, listing_data: Dict, source: str) -> str:
+    def process_single_listing(
+        self,
+        listing_data: Dict,
+        source: str,
+        pending: Optional[PendingListings] = None,
+        candidates: Optional[Dict[str, Dict]] = None,
+        now: Optional[datetime] = None
+    ) -> str:
         """
         Process a single listing
+        If `pending` is given, a new listing is queued in it for a bulk insert
+        instead of being written immediately. If `candidates` is given (see
+        DuplicateDetector.load_candidates), duplicates are looked up in memory.
+        `now` is the timestamp written to the listing (defaults to the current time).
         Returns: 'new', 'updated', 'duplicates', or 'filtered'
         """
         title = listing_data.get('title', 'N/A')[:50]
@@ -70,16 +136,11 @@ class ListingProcessor:
 
         logger.debug(f"[Listing Processor] Listing passed all filters, title: {title}")
 
-        # Generate property hash
-        address = listing_data.get('address', '')
-        rooms = listing_data.get('rooms', 0)
-        size_sqm = listing_data.get('size_sqm', 0)
-
-        property_hash = Listing.generate_property_hash(address, rooms, size_sqm)
+        now = now or datetime.utcnow()
 
-        # Normalize phone for duplicate detection
-        phone = listing_data.get('contact_phone')
-        normalized_phone = normalize_israeli_phone(phone) if phone else None
+        # Generate property hash and normalize phone for duplicate detection
+        address = listing_data.get('address', '')
+        property_hash, normalized_phone = self._duplicate_keys(listing_data)
 
         # Use duplicate detector to find existing listing
         existing_listing, detection_method = self.duplicate_detector.find_duplicate(
@@ -87,22 +148,82 @@ class ListingProcessor:
             source=source,
             external_id=listing_data.get('external_id'),
             phone=normalized_phone,
-            address=address
+            address=address,
+            candidates=candidates
         )
 
         if existing_listing:
             logger.debug(f"Found duplicate via {detection_method}: {property_hash}")
-            return self._update_existing_listing(existing_listing, listing_data)
+            return self._update_existing_listing(existing_listing, listing_data, now)
 
-        # Create new listing
-        return self._create_new_listing(listing_data, property_hash)
+        if pending is None:
+            # Create new listing
+            return self._create_new_listing(listing_data, property_hash, now)
 
-    def _create_new_listing(self, listing_data: Dict, property_hash: str) -> str:
-        """Create a new listing"""
-        title = listing_data.get('title', 'N/A')[:50]
-        logger.info(f"[Listing Processor] Creating new listing, title: {title}, hash: {property_hash[:16]}")
+        # The same property may appear twice in one batch before anything is inserted
+        queued_listing, detection_method = self.duplicate_detector.find_duplicate(
+            property_hash=property_hash,
+            source=source,
+            external_id=listing_data.get('external_id'),
+            phone=normalized_phone,
+            address=address,
+            candidates=pending.candidates
+        )
+        if queued_listing:
+            logger.debug(f"Found duplicate within batch via {detection_method}: {property_hash}")
+            return 'duplicates'
+
+        logger.info(f"[Listing Processor] Queueing new listing, title: {title}, hash: {property_hash[:16]}")
+        pending.add(self._new_listing_values(listing_data, property_hash, now), source, normalized_phone)
+        return 'new'
 
-        listing = Listing(
+    def _merge_batch_duplicates(self, listings: List[Dict]) -> Tuple[List[Dict], List[Tuple[str, Optional[str]]], int]:
+        """
+        Merge listings that share a property hash within one batch
+        Later occurrences only fill in fields missing from the first one.
+        Returns the unique listings, the duplicate keys of those that could be hashed,
+        and the number of listings merged away.
+        """
+        merged: Dict[str, Dict] = {}
+        unique: List[Dict] = []
+        keys = []
+
+        for listing_data in listings:
+            try:
+                property_hash, normalized_phone = self._duplicate_keys(listing_data)
+            except Exception:
+                # Left for the main loop, which logs the error for this listing
+                unique.append(listing_data)
+                continue
+
+            first = merged.get(property_hash)
+            if first is None:
+                merged[property_hash] = dict(listing_data)
+                unique.append(merged[property_hash])
+                keys.append((property_hash, normalized_phone))
+                continue
+
+            logger.debug(f"[Listing Processor] Merging duplicate within batch, hash: {property_hash[:16]}")
+            for key, value in listing_data.items():
+                if first.get(key) in (None, '') and value not in (None, ''):
+                    first[key] = value
+
+        return unique, keys, len(listings) - len(unique)
+
+    def _duplicate_keys(self, listing_data: Dict) -> Tuple[str, Optional[str]]:
+        """Return the property hash and normalized phone used for duplicate detection"""
+        property_hash = Listing.generate_property_hash(
+            listing_data.get('address', ''),
+            listing_data.get('rooms', 0),
+            listing_data.get('size_sqm', 0)
+        )
+        phone = listing_data.get('contact_phone')
+        normalized_phone = normalize_israeli_phone(phone) if phone else None
+        return property_hash, normalized_phone
+
+    def _new_listing_values(self, listing_data: Dict, property_hash: str, now: datetime) -> Dict:
+        """Build the column values for a new listing, including its deal score"""
+        values = dict(
             property_hash=property_hash,
             source=listing_data.get('source'),
             external_id=listing_data.get('external_id'),
@@ -124,18 +245,33 @@ class ListingProcessor:
             price_per_sqm=listing_data.get('price_per_sqm'),
             contact_name=listing_data.get('contact_name'),
             contact_phone=normalize_israeli_phone(listing_data.get('contact_phone')),
-            first_seen=datetime.utcnow(),
-            last_seen=datetime.utcnow(),
-            last_checked=datetime.utcnow(),
+            first_seen=now,
+            last_seen=now,
+            last_checked=now,
             status='unseen'
         )
 
-        # Set images
+        # Set images and calculate deal score on a transient listing
+        listing = Listing(**values)
         if listing_data.get('images'):
             listing.set_images(listing_data['images'])
+        values['images_json'] = listing.images_json
+        values['deal_score'] = self.deal_calculator.calculate_score(listing)
+        return values
 
-        # Calculate deal score
-        listing.deal_score = self.deal_calculator.calculate_score(listing)
+    def _create_new_listing(self, listing_data: Dict, property_hash: str, now: datetime) -> str:
+        """Create a new listing"""
+        title = listing_data.get('title', 'N/A')[:50]
+        logger.info(f"[Listing Processor] Creating new listing, title: {title}, hash: {property_hash[:16]}")
+
+        listing = self._create_listing_from_values(self._new_listing_values(listing_data, property_hash, now))
+
+        logger.info(f"[Listing Processor] New listing created successfully, title: {listing.title[:50]}, score: {listing.deal_score:.1f}, price: {listing.price}")
+        return 'new'
+
+    def _create_listing_from_values(self, values: Dict) -> Listing:
+        """Add a listing with its initial price and description history"""
+        listing = Listing(**values)
 
         self.db.add(listing)
         self.db.flush()
@@ -146,7 +282,7 @@ class ListingProcessor:
                 listing_id=listing.id,
                 price=listing.price,
                 price_per_sqm=listing.price_per_sqm,
-                timestamp=datetime.utcnow()
+                timestamp=listing.first_seen
             )
             self.db.add(price_history)
 
@@ -155,22 +291,67 @@ class ListingProcessor:
             desc_history = DescriptionHistory(
                 listing_id=listing.id,
                 description=listing.description,
-                timestamp=datetime.utcnow()
+                timestamp=listing.first_seen
             )
             self.db.add(desc_history)
 
-        logger.info(f"[Listing Processor] New listing created successfully, title: {listing.title[:50]}, score: {listing.deal_score:.1f}, price: {listing.price}")
-        return 'new'
+        return listing
 
-    def _update_existing_listing(self, listing: Listing, listing_data: Dict) -> str:
+    def _bulk_create_listings(self, rows: List[Dict]) -> int:
+        """
+        Insert queued new listings and their initial history in a few bulk statements
+        Returns the number of listings created
+        """
+        logger.info(f"[Listing Processor] Bulk inserting new listings, count: {len(rows)}")
+
+        try:
+            with self.db.begin_nested():
+                listing_ids = self.db.scalars(
+                    insert(Listing).returning(Listing.id, sort_by_parameter_order=True),
+                    rows
+                ).all()
+
+                price_rows = [
+                    {'listing_id': listing_id, 'price': row['price'], 'price_per_sqm': row['price_per_sqm'], 'timestamp': row['first_seen']}
+                    for listing_id, row in zip(listing_ids, rows) if row['price']
+                ]
+                desc_rows = [
+                    {'listing_id': listing_id, 'description': row['description'], 'timestamp': row['first_seen']}
+                    for listing_id, row in zip(listing_ids, rows) if row['description']
+                ]
+
+                # Add initial price and description history
+                if price_rows:
+                    self.db.execute(insert(PriceHistory), price_rows)
+                if desc_rows:
+                    self.db.execute(insert(DescriptionHistory), desc_rows)
+
+            return len(listing_ids)
+
+        except Exception as e:
+            # Fall back to one listing at a time so a single bad row doesn't drop the batch
+            logger.error(f"[Listing Processor] Bulk insert failed, inserting one by one, error: {e}")
+
+        created = 0
+        for row in rows:
+            try:
+                with self.db.begin_nested():
+                    self._create_listing_from_values(row)
+                created += 1
+            except Exception as e:
+                logger.error(f"[Listing Processor] Error creating listing, hash: {row['property_hash'][:16]}, error: {e}")
+        return created
+
+    def _update_existing_listing(self, listing: Listing, listing_data: Dict, now: datetime) -> str:
         """Update an existing listing"""
         logger.debug(f"[Listing Processor] Updating existing listing, id: {listing.id}, title: {listing.title[:50]}")
 
         # Update last seen
-        listing.last_seen = datetime.utcnow()
-        listing.last_checked = datetime.utcnow()
+        listing.last_seen = now
+        listing.last_checked = now
 
         price_changed = False
+        price_dropped = False
         description_changed = False
 
         # Check for price change
@@ -184,19 +365,19 @@ class ListingProcessor:
             if listing.size_sqm and listing.size_sqm > 0:
                 listing.price_per_sqm = new_price / listing.size_sqm
 
-            # Add to price history
+            # Add to price history (through the relationship, so deal scoring sees it before a flush)
             price_history = PriceHistory(
-                listing_id=listing.id,
                 price=new_price,
                 price_per_sqm=listing.price_per_sqm,
-                timestamp=datetime.utcnow()
+                timestamp=now
             )
-            self.db.add(price_history)
+            listing.price_history.append(price_history)
 
             price_changed = True
 
             # Check for price drop
             if old_price and new_price < old_price:
+                price_dropped = True
                 drop_pct = ((old_price - new_price) / old_price) * 100
                 logger.info(f"[Listing Processor] 🔥 Price drop detected, id: {listing.id}, title: {listing.title[:50]}, drop_percent: {drop_pct:.1f}%, old_price: {old_price}, new_price: {new_price}")
 
@@ -213,11 +394,10 @@ class ListingProcessor:
 
             # Add to description history
             desc_history = DescriptionHistory(
-                listing_id=listing.id,
                 description=new_description,
-                timestamp=datetime.utcnow()
+                timestamp=now
             )
-            self.db.add(desc_history)
+            listing.description_history.append(desc_history)
 
             description_changed = True
 
@@ -233,8 +413,7 @@ class ListingProcessor:
 
         if price_changed:
             logger.info(f"[Listing Processor] Listing updated with price change, id: {listing.id}, title: {listing.title[:50]}, score_change: {old_score:.1f} → {listing.deal_score:.1f}")
-            # Check if price actually dropped (compare new_price with old_price from line 179)
-            return 'price_drops' if new_price < old_price else 'updated'
+            return 'price_drops' if price_dropped else 'updated'
         elif description_changed:
             logger.info(f"[Listing Processor] Listing updated with description change, id: {listing.id}, title: {listing.title[:50]}")
             return 'updated'
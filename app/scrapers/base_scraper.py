@@ -1,20 +1,88 @@
 from abc import ABC, abstractmethod
 from DrissionPage import ChromiumPage, ChromiumOptions
-from typing import List, Dict, Optional
+from typing import Callable, List, Dict, Optional
+import math
 import time
 import random
 import logging
 from datetime import datetime, timedelta
 from app.core.database import Listing, ScrapingState
+from sqlalchemy import func
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.orm import Session
 import json
 import os
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 
 from app.utils.phone_normalizer import normalize_israeli_phone
 from app.core.config import settings
 
 logger = logging.getLogger(__name__)
 
+# Single background writer for debug output, shared by all scraper instances
+_debug_writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="debug-writer")
+
+# The persistent browser profile keeps its cookie jar between runs, so saved cookies are
+# pushed into it once per process and snapshotted back only every few runs
+_cookies_loaded_sources = set()
+_runs_since_cookie_save: Dict[str, int] = {}
+
+# URL patterns (CDP Network.setBlockedURLs wildcards) for resources that are not
+# needed to read listing cards: images, fonts and media...
+_BLOCKED_MEDIA_PATTERNS = [
+    '*.jpg*', '*.jpeg*', '*.png*', '*.gif*', '*.webp*', '*.svg*', '*.ico*',
+    '*.woff*', '*.ttf*', '*.otf*', '*.eot*',
+    '*.mp4*', '*.webm*', '*.mp3*',
+]
+# ...plus stylesheets and trackers, for pages whose feed doesn't depend on its CSS
+_BLOCKED_RESOURCE_PATTERNS = _BLOCKED_MEDIA_PATTERNS + [
+    '*.css*',
+    '*google-analytics.com*', '*googletagmanager.com*', '*doubleclick.net*',
+    '*connect.facebook.net*', '*hotjar.com*',
+]
+
+# INSERT constructs with ON CONFLICT DO UPDATE support, by dialect name
+_UPSERT_INSERTS = {'sqlite': sqlite_insert, 'postgresql': postgresql_insert}
+
+# How often the page height is checked while waiting for lazy-loaded content after a scroll
+_SCROLL_POLL_INTERVAL = 0.25
+
+# Upper bound of the random extra delay added to each retry backoff
+_RETRY_JITTER_SECONDS = 5
+
+# Automation-masking overrides, injected together in a single JS evaluation
+_ANTI_DETECTION_JS = """
+// Override navigator.webdriver
+Object.defineProperty(navigator, 'webdriver', {
+    get: () => undefined
+});
+
+// Mock plugins
+Object.defineProperty(navigator, 'plugins', {
+    get: () => [1, 2, 3, 4, 5]
+});
+
+// Mock languages
+Object.defineProperty(navigator, 'languages', {
+    get: () => ['he-IL', 'he', 'en-US', 'en']
+});
+
+// Override permissions
+const originalQuery = window.navigator.permissions.query;
+window.navigator.permissions.query = (parameters) => (
+    parameters.name === 'notifications' ?
+        Promise.resolve({ state: Notification.permission }) :
+        originalQuery(parameters)
+);
+
+// Mock chrome runtime
+window.chrome = {
+    runtime: {}
+};
+"""
+
 # Global CAPTCHA state singleton
 class CaptchaState:
     """Singleton to track CAPTCHA status across all scrapers"""
@@ -69,8 +137,17 @@ captcha_state = CaptchaState()
 class BaseScraper(ABC):
     """Base class for all scrapers with common functionality using DrissionPage"""
 
-    def __init__(self, db_session: Session, source_name: str, page: Optional[ChromiumPage] = None):
+    # Scrapers that only read card DOM nodes opt in to skipping heavy resources
+    block_heavy_resources = False
+    # Scrapers whose feed layout or lazy loading needs the site's CSS keep stylesheets
+    block_stylesheets = True
+
+    def __init__(self, db_session: Optional[Session], source_name: str, page: Optional[ChromiumPage] = None,
+                 session_factory: Optional[Callable[[], Session]] = None):
         self.db = db_session
+        # When set, each DB operation opens its own short-lived session instead of
+        # keeping one transaction (and pooled connection) open for the whole scrape
+        self.session_factory = session_factory
         self.source_name = source_name
         self.page: Optional[ChromiumPage] = page  # Allow injection of mock page
         self.browser_alive = True  # Track browser connection status
@@ -135,8 +212,14 @@ class BaseScraper(ABC):
 
             logger.info(f"[{self.source_name}] Browser connection established in persistent mode")
 
-            # Load cookies if available
-            self._load_cookies()
+            # Load saved cookies once per process; the shared browser keeps them after that
+            if self.source_name not in _cookies_loaded_sources:
+                self._load_cookies()
+                _cookies_loaded_sources.add(self.source_name)
+
+            # Skip images, fonts, stylesheets and trackers while scraping
+            if self.block_heavy_resources and settings.block_heavy_resources:
+                self._set_resource_blocking(True)
 
         except ConnectionError:
             # Re-raise connection errors as-is
@@ -151,57 +234,48 @@ class BaseScraper(ABC):
             return
 
         try:
-            # Override navigator.webdriver
-            self.page.run_js("""
-                Object.defineProperty(navigator, 'webdriver', {
-                    get: () => undefined
-                });
-            """)
-
-            # Mock plugins
-            self.page.run_js("""
-                Object.defineProperty(navigator, 'plugins', {
-                    get: () => [1, 2, 3, 4, 5]
-                });
-            """)
-
-            # Mock languages
-            self.page.run_js("""
-                Object.defineProperty(navigator, 'languages', {
-                    get: () => ['he-IL', 'he', 'en-US', 'en']
-                });
-            """)
-
-            # Override permissions
-            self.page.run_js("""
-                const originalQuery = window.navigator.permissions.query;
-                window.navigator.permissions.query = (parameters) => (
-                    parameters.name === 'notifications' ?
-                        Promise.resolve({ state: Notification.permission }) :
-                        originalQuery(parameters)
-                );
-            """)
-
-            # Mock chrome runtime
-            self.page.run_js("""
-                window.chrome = {
-                    runtime: {}
-                };
-            """)
-
+            # One round-trip for all overrides
+            self.page.run_js(_ANTI_DETECTION_JS)
             logger.debug(f"[{self.source_name}] Anti-detection scripts injected")
         except Exception as e:
             logger.warning(f"[{self.source_name}] Failed to inject anti-detection scripts: {e}")
 
+    def _set_resource_blocking(self, enabled: bool):
+        """Block (or unblock) heavy resources for every request made by the page"""
+        if not self.page:
+            return
+
+        try:
+            patterns = _BLOCKED_RESOURCE_PATTERNS if self.block_stylesheets else _BLOCKED_MEDIA_PATTERNS
+            self.page.set.blocked_urls(patterns if enabled else None)
+            logger.debug(f"[{self.source_name}] Resource blocking {'enabled' if enabled else 'disabled'}")
+        except Exception as e:
+            logger.warning(f"[{self.source_name}] Failed to update resource blocking: {e}")
+
+    @contextmanager
+    def _db_session(self):
+        """Session for one short unit of DB work"""
+        if self.session_factory is None:
+            yield self.db
+            return
+
+        db = self.session_factory()
+        try:
+            yield db
+        finally:
+            db.close()
+
     def _load_cookies(self):
         """Load saved cookies for this source"""
-        state = self.db.query(ScrapingState).filter(
-            ScrapingState.source == self.source_name
-        ).first()
+        with self._db_session() as db:
+            state = db.query(ScrapingState).filter(
+                ScrapingState.source == self.source_name
+            ).first()
+            cookies_json = state.cookies_json if state else None
 
-        if state and state.cookies_json:
+        if cookies_json:
             try:
-                cookies = json.loads(state.cookies_json)
+                cookies = json.loads(cookies_json)
                 if cookies and self.page:
                     # DrissionPage cookie format
                     for cookie in cookies:
@@ -221,16 +295,20 @@ class BaseScraper(ABC):
         try:
             cookies = self.page.cookies(all_domains=True)
 
-            state = self.db.query(ScrapingState).filter(
-                ScrapingState.source == self.source_name
-            ).first()
+            with self._db_session() as db:
+                if self._upsert_scraping_state(db, {'cookies_json': json.dumps(cookies)}):
+                    return
 
-            if not state:
-                state = ScrapingState(source=self.source_name)
-                self.db.add(state)
+                state = db.query(ScrapingState).filter(
+                    ScrapingState.source == self.source_name
+                ).first()
 
-            state.cookies_json = json.dumps(cookies)
-            self.db.commit()
+                if not state:
+                    state = ScrapingState(source=self.source_name)
+                    db.add(state)
+
+                state.cookies_json = json.dumps(cookies)
+                db.commit()
 
         except Exception as e:
             logger.warning(f"Failed to save cookies for {self.source_name}: {e}")
@@ -295,21 +373,35 @@ class BaseScraper(ABC):
             return
 
         try:
-            # Create debug directory if it doesn't exist
-            debug_dir = "debug_output"
-            os.makedirs(debug_dir, exist_ok=True)
-
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            base_path = os.path.join("debug_output", f"{prefix}_{self.source_name}_{timestamp}")
+
+            # Capture the page now, while it still shows the failing state
+            screenshot = self.page.get_screenshot(as_bytes='png', full_page=True)
+            html = self.page.html
+
+            # Disk writes don't need to hold up the scrape
+            _debug_writer.submit(self._write_debug_files, base_path, screenshot, html)
+
+        except Exception as e:
+            logger.warning(f"[{self.source_name}] Failed to save debug output: {e}")
+
+    def _write_debug_files(self, base_path: str, screenshot: bytes, html: str):
+        """Write captured debug screenshot and HTML to disk"""
+        try:
+            # Create debug directory if it doesn't exist
+            os.makedirs(os.path.dirname(base_path), exist_ok=True)
 
             # Save screenshot
-            screenshot_path = os.path.join(debug_dir, f"{prefix}_{self.source_name}_{timestamp}.png")
-            self.page.get_screenshot(path=screenshot_path, full_page=True)
+            screenshot_path = f"{base_path}.png"
+            with open(screenshot_path, 'wb') as f:
+                f.write(screenshot)
             logger.info(f"[{self.source_name}] Saved debug screenshot: {screenshot_path}")
 
             # Save HTML
-            html_path = os.path.join(debug_dir, f"{prefix}_{self.source_name}_{timestamp}.html")
+            html_path = f"{base_path}.html"
             with open(html_path, 'w', encoding='utf-8') as f:
-                f.write(self.page.html)
+                f.write(html)
             logger.info(f"[{self.source_name}] Saved debug HTML: {html_path}")
 
         except Exception as e:
@@ -343,20 +435,51 @@ class BaseScraper(ABC):
             scrolls = settings.default_max_scrolls
 
         for i in range(scrolls):
+            previous_height = self._page_height()
+
             # Variable scroll amounts to appear more human
             scroll_amount = random.randint(300, 800)
 
             # Smooth scroll
             self.page.scroll.down(scroll_amount)
 
-            # Random delay between scrolls using configured values
-            self.random_delay(settings.min_wait_after_scroll, settings.max_wait_after_scroll)
+            # Human-like pause, cut short once lazy-loaded content has arrived
+            self._wait_after_scroll(previous_height)
 
             # Occasionally scroll back up a bit (human behavior)
             if random.random() < 0.3:
                 self.page.scroll.up(random.randint(50, 150))
                 self.random_delay(0.3, 0.8)
 
+    def _page_height(self) -> Optional[float]:
+        """Current document scroll height, or None if it can't be read"""
+        try:
+            height = self.page.run_js('return document.body.scrollHeight;')
+        except Exception as e:
+            logger.debug(f"[{self.source_name}] Could not read page height: {e}")
+            return None
+        return height if isinstance(height, (int, float)) else None
+
+    def _wait_after_scroll(self, previous_height: Optional[float]):
+        """
+        Wait between the configured min and a random max delay after a scroll.
+        Past the minimum, the wait ends as soon as the page has grown.
+        """
+        min_wait = settings.min_wait_after_scroll
+        max_wait = random.uniform(min_wait, settings.max_wait_after_scroll)
+
+        if previous_height is None:
+            # Growth can't be observed, keep the plain random delay
+            time.sleep(max_wait)
+            return
+
+        time.sleep(min_wait)
+        for _ in range(int((max_wait - min_wait) / _SCROLL_POLL_INTERVAL)):
+            height = self._page_height()
+            if height is not None and height > previous_height:
+                return
+            time.sleep(_SCROLL_POLL_INTERVAL)
+
     def safe_click(self, selector: str, timeout: int = 5) -> bool:
         """Safely click element with error handling"""
         if not self.page:
@@ -407,28 +530,59 @@ class BaseScraper(ABC):
         """
         return normalize_israeli_phone(phone) or ""
 
+    def _upsert_scraping_state(self, db: Session, values: Dict, update: Optional[Dict] = None) -> bool:
+        """
+        Insert or update this source's scraping state in a single statement.
+        `update` overrides what is written when the row already exists (defaults to `values`).
+        Returns False, without touching the database, if the dialect has no upsert.
+        """
+        insert = _UPSERT_INSERTS.get(db.get_bind().dialect.name)
+        if insert is None:
+            return False
+
+        stmt = insert(ScrapingState).values(source=self.source_name, **values)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[ScrapingState.source],
+            set_=update if update is not None else values
+        )
+        db.execute(stmt)
+        db.commit()
+        return True
+
     def update_scraping_state(self, success: bool = True, error_msg: Optional[str] = None):
         """Update scraping state in database"""
-        state = self.db.query(ScrapingState).filter(
-            ScrapingState.source == self.source_name
-        ).first()
+        now = datetime.utcnow()
+        if success:
+            values = {'last_scrape_time': now, 'status': 'active', 'error_count': 0, 'error_message': None}
+            update = None
+        else:
+            values = {'last_scrape_time': now, 'status': 'error', 'error_count': 1, 'error_message': error_msg}
+            update = dict(values, error_count=func.coalesce(ScrapingState.error_count, 0) + 1)
+
+        with self._db_session() as db:
+            if self._upsert_scraping_state(db, values, update):
+                return
 
-        if not state:
-            state = ScrapingState(source=self.source_name)
-            self.db.add(state)
+            state = db.query(ScrapingState).filter(
+                ScrapingState.source == self.source_name
+            ).first()
 
-        state.last_scrape_time = datetime.utcnow()
+            if not state:
+                state = ScrapingState(source=self.source_name)
+                db.add(state)
 
-        if success:
-            state.status = 'active'
-            state.error_count = 0
-            state.error_message = None
-        else:
-            state.status = 'error'
-            state.error_count = (state.error_count or 0) + 1
-            state.error_message = error_msg
+            state.last_scrape_time = now
 
-        self.db.commit()
+            if success:
+                state.status = 'active'
+                state.error_count = 0
+                state.error_message = None
+            else:
+                state.status = 'error'
+                state.error_count = (state.error_count or 0) + 1
+                state.error_message = error_msg
+
+            db.commit()
 
     def _check_for_captcha(self) -> bool:
         """
@@ -521,6 +675,11 @@ class BaseScraper(ABC):
             )
             captcha_state.set_waiting(self.source_name)
 
+            # The challenge needs its images and styles to be solvable
+            resource_blocking = self.block_heavy_resources and settings.block_heavy_resources
+            if resource_blocking:
+                self._set_resource_blocking(False)
+
             # Wait loop
             start_time = datetime.utcnow()
             check_count = 0
@@ -565,6 +724,8 @@ class BaseScraper(ABC):
                             f"Resuming scraping..."
                         )
                         captcha_state.set_normal()
+                        if resource_blocking:
+                            self._set_resource_blocking(True)
                         return
 
                 except ConnectionError as conn_err:
@@ -593,10 +754,18 @@ class BaseScraper(ABC):
 
     def cleanup(self):
         """Clean up browser resources (but don't close the persistent browser)"""
-        try:
-            self._save_cookies()
-        except Exception as e:
-            logger.warning(f"Error saving cookies during cleanup: {e}")
+        # Snapshot cookies on the first run and then every Nth run, not on every scrape
+        runs = _runs_since_cookie_save.get(self.source_name, 0)
+        if runs % max(settings.cookie_save_every_runs, 1) == 0:
+            try:
+                self._save_cookies()
+            except Exception as e:
+                logger.warning(f"Error saving cookies during cleanup: {e}")
+        _runs_since_cookie_save[self.source_name] = runs + 1
+
+        # The browser is shared, so don't leave our blocked URLs behind
+        if self.block_heavy_resources:
+            self._set_resource_blocking(False)
 
         # DO NOT close the browser in persistent mode
         # The browser stays open for the next scraping run
@@ -623,89 +792,127 @@ class BaseScraper(ABC):
 class ScraperWithRetry:
     """Wrapper to add retry logic to scrapers"""
 
-    def __init__(self, scraper: BaseScraper, max_retries: int = 3, retry_delay: int = 60, shutdown_event = None):
+    def __init__(self, scraper: BaseScraper, max_retries: int = 3, retry_delay: int = 60, shutdown_event = None,
+                 max_retry_delay: int = 600):
         self.scraper = scraper
         self.max_retries = max_retries
         self.retry_delay = retry_delay
+        self.max_retry_delay = max_retry_delay
         self.shutdown_event = shutdown_event
+        self.last_error = None
+
+    def backoff_delay(self, attempt: int) -> float:
+        """Delay before the next attempt: exponential backoff with jitter, capped"""
+        delay = self.retry_delay * (2 ** attempt) + random.uniform(0, _RETRY_JITTER_SECONDS)
+        return min(delay, self.max_retry_delay)
 
     def scrape_with_retry(self) -> List[Dict]:
-        """Execute scraping with retry logic"""
+        """
+        Execute scraping with retry logic, sleeping through the backoff between attempts
+        ScrapingScheduler runs the same attempts itself so it can release the browser
+        between them; both use run_attempt, backoff_delay and give_up.
+        """
         source = self.scraper.source_name
         logger.info(f"[Scraper Retry] Starting scrape with retry, source: {source}, max_retries: {self.max_retries}")
-        last_error = None
+        self.last_error = None
 
         for attempt in range(self.max_retries):
-            # Check for shutdown signal
-            if self.shutdown_event and self.shutdown_event.is_set():
-                logger.info(f"[Scraper Retry] Shutdown signal received, aborting scrape for {source}")
+            listings = self.run_attempt(attempt)
+            if listings is not None:
+                return listings
+
+            if attempt < self.max_retries - 1:
+                delay = self.backoff_delay(attempt)
+                logger.info(f"[Scraper Retry] Retrying in {delay:.0f} seconds, source: {source}")
+                if not self._sleep_unless_shutdown(delay):
+                    logger.info(f"[Scraper Retry] Shutdown signal received during retry delay for {source}")
+                    return []
+
+        return self.give_up()
+
+    def run_attempt(self, attempt: int) -> Optional[List[Dict]]:
+        """
+        Run a single scrape attempt
+        Returns the listings on success, [] when retrying is pointless (shutdown,
+        browser gone), or None when the attempt failed and may be retried.
+        """
+        source = self.scraper.source_name
+
+        # Check for shutdown signal
+        if self.shutdown_event and self.shutdown_event.is_set():
+            logger.info(f"[Scraper Retry] Shutdown signal received, aborting scrape for {source}")
+            return []
+
+        try:
+            logger.info(f"[Scraper Retry] Attempt {attempt + 1}/{self.max_retries}, source: {source}")
+
+            logger.debug(f"[Scraper Retry] Initializing browser, source: {source}")
+            self.scraper.initialize()
+
+            # Check if browser is alive before starting scrape
+            if not self.scraper._is_browser_alive():
+                logger.error(f"[Scraper Retry] ❌ Browser not alive, aborting scrape for {source}")
+                error_msg = "Browser connection not available"
+                self.scraper.update_scraping_state(success=False, error_msg=error_msg)
                 return []
 
-            try:
-                logger.info(f"[Scraper Retry] Attempt {attempt + 1}/{self.max_retries}, source: {source}")
+            logger.info(f"[Scraper Retry] Executing scrape, source: {source}")
+            listings = self.scraper.scrape()
 
-                logger.debug(f"[Scraper Retry] Initializing browser, source: {source}")
-                self.scraper.initialize()
+            logger.debug(f"[Scraper Retry] Cleaning up browser, source: {source}")
+            self.scraper.cleanup()
 
-                # Check if browser is alive before starting scrape
-                if not self.scraper._is_browser_alive():
-                    logger.error(f"[Scraper Retry] ❌ Browser not alive, aborting scrape for {source}")
-                    error_msg = "Browser connection not available"
-                    self.scraper.update_scraping_state(success=False, error_msg=error_msg)
-                    return []
+            self.scraper.update_scraping_state(success=True)
+            logger.info(f"[Scraper Retry] ✅ Scrape successful, source: {source}, listings_count: {len(listings)}")
 
-                logger.info(f"[Scraper Retry] Executing scrape, source: {source}")
-                listings = self.scraper.scrape()
+            return listings
 
-                logger.debug(f"[Scraper Retry] Cleaning up browser, source: {source}")
-                self.scraper.cleanup()
+        except Exception as e:
+            self.last_error = e
 
-                self.scraper.update_scraping_state(success=True)
-                logger.info(f"[Scraper Retry] ✅ Scrape successful, source: {source}, listings_count: {len(listings)}")
+            # Check for shutdown signal immediately after exception
+            if self.shutdown_event and self.shutdown_event.is_set():
+                logger.info(f"[Scraper Retry] Shutdown detected, cancelling retries for {source}")
+                return []
 
-                return listings
+            # Check if this is a browser disconnection error
+            if self.scraper._check_browser_connection(e):
+                # Browser disconnected - stop retrying immediately
+                error_msg = f"Browser connection lost: {e}"
+                self.scraper.update_scraping_state(success=False, error_msg=error_msg)
+                logger.error(f"[Scraper Retry] ❌ Browser disconnected, aborting all retries for {source}")
+                return []
 
-            except Exception as e:
-                last_error = e
+            # Chrome isn't running on the debug port - retrying won't start it
+            if isinstance(e, ConnectionError):
+                error_msg = f"Browser not reachable: {e}"
+                self.scraper.update_scraping_state(success=False, error_msg=error_msg)
+                logger.error(f"[Scraper Retry] ❌ Browser not reachable, aborting all retries for {source}")
+                return []
 
-                # Check for shutdown signal immediately after exception
-                if self.shutdown_event and self.shutdown_event.is_set():
-                    logger.info(f"[Scraper Retry] Shutdown detected, cancelling retries for {source}")
-                    return []
+            logger.error(f"[Scraper Retry] ❌ Attempt {attempt + 1} failed, source: {source}, error: {e}")
 
-                # Check if this is a browser disconnection error
-                if self.scraper._check_browser_connection(e):
-                    # Browser disconnected - stop retrying immediately
-                    error_msg = f"Browser connection lost: {e}"
-                    self.scraper.update_scraping_state(success=False, error_msg=error_msg)
-                    logger.error(f"[Scraper Retry] ❌ Browser disconnected, aborting all retries for {source}")
-                    return []
+            try:
+                logger.debug(f"[Scraper Retry] Attempting cleanup after error, source: {source}")
+                self.scraper.cleanup()
+            except Exception as cleanup_error:
+                logger.warning(f"[Scraper Retry] Cleanup failed, source: {source}, error: {cleanup_error}")
 
-                logger.error(f"[Scraper Retry] ❌ Attempt {attempt + 1} failed, source: {source}, error: {e}")
+            return None
 
-                try:
-                    logger.debug(f"[Scraper Retry] Attempting cleanup after error, source: {source}")
-                    self.scraper.cleanup()
-                except Exception as cleanup_error:
-                    logger.warning(f"[Scraper Retry] Cleanup failed, source: {source}, error: {cleanup_error}")
-
-                if attempt < self.max_retries - 1:
-                    # Check for shutdown before initiating retry delay
-                    if self.shutdown_event and self.shutdown_event.is_set():
-                        logger.info(f"[Scraper Retry] Shutdown signal received, aborting retry for {source}")
-                        return []
-
-                    # Check for shutdown during retry delay
-                    logger.info(f"[Scraper Retry] Retrying in {self.retry_delay} seconds, source: {source}")
-                    for _ in range(self.retry_delay):
-                        if self.shutdown_event and self.shutdown_event.is_set():
-                            logger.info(f"[Scraper Retry] Shutdown signal received during retry delay for {source}")
-                            return []
-                        time.sleep(settings.shutdown_check_interval)
-
-        # All retries failed
-        error_msg = f"Failed after {self.max_retries} attempts: {last_error}"
+    def _sleep_unless_shutdown(self, delay: float) -> bool:
+        """Sleep for delay seconds in short steps; returns False as soon as shutdown is requested"""
+        for _ in range(math.ceil(delay / settings.shutdown_check_interval)):
+            if self.shutdown_event and self.shutdown_event.is_set():
+                return False
+            time.sleep(settings.shutdown_check_interval)
+
+        return True
+
+    def give_up(self) -> List[Dict]:
+        """Record that every attempt failed"""
+        error_msg = f"Failed after {self.max_retries} attempts: {self.last_error}"
         self.scraper.update_scraping_state(success=False, error_msg=error_msg)
-        logger.error(f"[Scraper Retry] ❌ All retries exhausted, source: {source}, error: {error_msg}")
+        logger.error(f"[Scraper Retry] ❌ All retries exhausted, source: {self.scraper.source_name}, error: {error_msg}")
 
         return []
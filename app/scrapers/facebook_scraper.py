@@ -4,15 +4,90 @@ import logging
 import re
 import json
 import os
+from app.scrapers.listing_parse import extract_features
 
 logger = logging.getLogger(__name__)
 
+# Card-text patterns, compiled once at import
+_ITEM_ID_RE = re.compile(r'/marketplace/item/(\d+)')
+# Price formats in priority order: "₪5,000", "5000 ₪", "5,000 ש"ח"
+_PRICE_RES = (
+    re.compile(r'₪\s*([\d,]+)'),
+    re.compile(r'([\d,]+)\s*₪'),
+    re.compile(r'([\d,]+)\s*(?:ש"ח|שקל)'),
+)
+_ROOMS_RE = re.compile(r'(\d+\.?\d*)\s*(?:חדרים|חד\'|rooms)')
+_SIZE_RE = re.compile(r'(\d+)\s*(?:מ"ר|מ״ר|sqm|m2)')
+
+# Common Israeli cities and Tel Aviv neighborhoods, each matched in one pass over the text
+_CITIES = (
+    'תל אביב', 'תל אביב-יפו', 'רמת גן', 'גבעתיים',
+    'הרצליה', 'רמת השרון', 'פתח תקווה', 'ראשון לציון'
+)
+_NEIGHBORHOODS = (
+    'רמת אביב', 'בבלי', 'יד אליהו', 'נווה אביבים',
+    'פלורנטין', 'נווה צדק', 'רמת החייל'
+)
+_CITY_RE = re.compile('|'.join(re.escape(city) for city in _CITIES))
+_NEIGHBORHOOD_RE = re.compile('|'.join(re.escape(neighborhood) for neighborhood in _NEIGHBORHOODS))
+
+# Listing card selectors, in fallback order; only the newest cards are processed
+_MAX_CARDS = 30
+_CARD_SELECTORS = (
+    'css:[data-testid="marketplace-feed-item"]',
+    'css:div[role="article"]',
+    'css:[class*="marketplace"]',
+    'css:div[class*="feed"] > div',
+    'css:div[class*="item"]',
+)
+_TITLE_SELECTORS = ('css:span[class*="title"]', 'tag:h2', 'tag:h3')
+
+# Collects the raw fields of the newest cards in one browser round-trip,
+# trying the same selector cascade as the element-based fallback
+_CARDS_JS = """
+const selectors = ['[data-testid="marketplace-feed-item"]', 'div[role="article"]', '[class*="marketplace"]',
+                   'div[class*="feed"] > div', 'div[class*="item"]'];
+let cards = [];
+for (const selector of selectors) {
+    cards = Array.from(document.querySelectorAll(selector));
+    if (cards.length) break;
+}
+const title = card => {
+    for (const selector of ['span[class*="title"]', 'h2', 'h3']) {
+        const el = card.querySelector(selector);
+        if (el) return el.innerText;
+    }
+    return '';
+};
+return cards.slice(0, arguments[0]).map(card => {
+    const link = card.querySelector('a');
+    return {
+        href: link ? link.href : '',
+        title: title(card),
+        text: card.innerText,
+        images: Array.from(card.querySelectorAll('img')).slice(0, 5).map(img => img.src)
+    };
+});
+"""
+
+# Marketplace embeds the first page of search results as Relay JSON in script tags
+_PAYLOAD_JS = """
+return Array.from(document.querySelectorAll('script[type="application/json"]'))
+    .map(script => script.textContent)
+    .filter(text => text.includes('marketplace_search'));
+"""
+
 
 class FacebookScraper(BaseScraper):
     """Scraper for Facebook Marketplace and Groups"""
 
-    def __init__(self, db_session, cookies_file: Optional[str] = None):
-        super().__init__(db_session, 'facebook')
+    # Image bytes aren't needed (src attributes are still read), but the
+    # Marketplace feed only lazy-loads more cards with its stylesheets applied
+    block_heavy_resources = True
+    block_stylesheets = False
+
+    def __init__(self, db_session=None, cookies_file: Optional[str] = None, session_factory=None):
+        super().__init__(db_session, 'facebook', session_factory=session_factory)
         self.base_url = "https://www.facebook.com"
         self.cookies_file = cookies_file
 
@@ -75,44 +150,26 @@ class FacebookScraper(BaseScraper):
             self.human_like_mouse_movement()
             logger.debug("[Facebook Scraper] Mouse movements simulated")
 
-            # Scroll to load more results with human-like behavior
-            logger.info("[Facebook Scraper] Scrolling page to load dynamic content, scrolls: 4")
-            self.scroll_page(scrolls=4)
-            self.random_delay(2, 4)
-
-            # Get listing cards
-            logger.info("[Facebook Scraper] Attempting to find listing cards with selector: css:[data-testid=\"marketplace-feed-item\"]")
-            listing_cards = self.page.eles('css:[data-testid="marketplace-feed-item"]')
-
-            if not listing_cards:
-                logger.info("[Facebook Scraper] Primary selector failed, trying alternative: css:div[role=\"article\"]")
-                listing_cards = self.page.eles('css:div[role="article"]')
+            # Typed listing fields from the embedded search payload need no scrolling or card lookups
+            extracted = self._extract_listings_via_payload()
 
-            if not listing_cards:
-                logger.info("[Facebook Scraper] Second selector failed, trying: css:[class*=\"marketplace\"]")
-                listing_cards = self.page.eles('css:[class*="marketplace"]')
+            if extracted is None:
+                # Scroll to load more results with human-like behavior
+                logger.info("[Facebook Scraper] Scrolling page to load dynamic content, scrolls: 4")
+                self.scroll_page(scrolls=4)
+                self.random_delay(2, 4)
 
-            if not listing_cards:
-                logger.info("[Facebook Scraper] Third selector failed, trying generic: css:div[class*=\"feed\"] > div")
-                listing_cards = self.page.eles('css:div[class*="feed"] > div')
-                if not listing_cards:
-                    listing_cards = self.page.eles('css:div[class*="item"]')
+                # Read every card's fields in one JS evaluation, falling back to per-element extraction
+                extracted = self._extract_listings_via_js()
+                if extracted is None:
+                    extracted = self._extract_listings_via_elements()
 
-            logger.info(f"[Facebook Scraper] Found listing cards, count: {len(listing_cards)}")
-
-            # Debug: Save page if no listings found
-            if len(listing_cards) == 0:
-                logger.warning("[Facebook Scraper] No listing cards found - saving debug output")
-                self.debug_save_page("no_listings")
-
-            # Process listings
-            max_listings = min(len(listing_cards), 30)
+            max_listings = len(extracted)
             logger.info(f"[Facebook Scraper] Processing listings, max_count: {max_listings}")
 
-            for idx, card in enumerate(listing_cards[:30], 1):
+            for idx, listing_data in enumerate(extracted, 1):
                 try:
-                    logger.debug(f"[Facebook Scraper] Extracting listing data, index: {idx}/{max_listings}")
-                    listing_data = self._extract_listing_data(card)
+                    logger.debug(f"[Facebook Scraper] Parsing extracted listing data, index: {idx}/{max_listings}")
                     if listing_data:
                         parsed = self.parse_listing(listing_data)
                         if parsed:
@@ -134,79 +191,209 @@ class FacebookScraper(BaseScraper):
 
         return listings
 
+    def _extract_listings_via_payload(self) -> Optional[List[Optional[Dict]]]:
+        """Read the newest listings from the page's embedded search JSON, or None if it has none"""
+        try:
+            payloads = self.page.run_js(_PAYLOAD_JS)
+        except Exception as e:
+            logger.debug(f"[Facebook Scraper] Search payload lookup failed, error: {e}")
+            return None
+
+        edges = []
+        for payload in payloads if isinstance(payloads, list) else []:
+            if not isinstance(payload, str):
+                continue
+            try:
+                edges.extend(self._find_feed_edges(json.loads(payload)))
+            except ValueError as e:
+                logger.debug(f"[Facebook Scraper] Could not decode search payload, error: {e}")
+
+        extracted = [self._listing_from_feed_edge(edge) for edge in edges[:_MAX_CARDS]]
+        if not any(extracted):
+            logger.info("[Facebook Scraper] No listings in embedded search payload, falling back to listing cards")
+            return None
+
+        logger.info(f"[Facebook Scraper] Extracted listings from embedded search payload, count: {len(extracted)}")
+        return extracted
+
+    def _find_feed_edges(self, node) -> List[Dict]:
+        """Collect the feed edges of every marketplace_search object nested in a payload"""
+        edges = []
+        if isinstance(node, dict):
+            search = node.get('marketplace_search')
+            if isinstance(search, dict):
+                feed_edges = (search.get('feed_units') or {}).get('edges')
+                if isinstance(feed_edges, list):
+                    edges.extend(edge for edge in feed_edges if isinstance(edge, dict))
+            children = node.values()
+        elif isinstance(node, list):
+            children = node
+        else:
+            return edges
+
+        for child in children:
+            if isinstance(child, (dict, list)):
+                edges.extend(self._find_feed_edges(child))
+        return edges
+
+    def _listing_from_feed_edge(self, edge: Dict) -> Optional[Dict]:
+        """Build raw listing data from one search feed edge"""
+        listing = (edge.get('node') or {}).get('listing')
+        if not isinstance(listing, dict) or not listing.get('id'):
+            return None
+
+        title = listing.get('marketplace_listing_title') or listing.get('custom_title') or ''
+        price_info = listing.get('listing_price') or {}
+        subtitles = [
+            (item or {}).get('subtitle') or ''
+            for item in listing.get('custom_sub_titles_with_rendering_flags') or []
+        ]
+        city = ((listing.get('location') or {}).get('reverse_geocode') or {}).get('city') or ''
+        image = ((listing.get('primary_listing_photo') or {}).get('image') or {}).get('uri')
+
+        try:
+            price = float(price_info['amount'])
+        except (KeyError, TypeError, ValueError):
+            price = None
+
+        # Rooms, size and neighborhood are only given as display text
+        card_text = '\n'.join(
+            part for part in [title, price_info.get('formatted_amount') or '', *subtitles, city] if part
+        )
+
+        return self._build_listing_data(
+            href=f"{self.base_url}/marketplace/item/{listing['id']}/",
+            title=title,
+            card_text=card_text,
+            image_srcs=[image] if image else [],
+            price=price
+        )
+
+    def _extract_listings_via_js(self) -> Optional[List[Optional[Dict]]]:
+        """Extract the newest listing cards in a single JS evaluation, or None if it yields nothing"""
+        try:
+            raw_cards = self.page.run_js(_CARDS_JS, _MAX_CARDS)
+        except Exception as e:
+            logger.debug(f"[Facebook Scraper] JS card extraction failed, error: {e}")
+            return None
+
+        if not isinstance(raw_cards, list) or not raw_cards:
+            logger.info("[Facebook Scraper] JS card extraction returned no cards, falling back to element selectors")
+            return None
+
+        logger.info(f"[Facebook Scraper] Extracted listing cards via JS, count: {len(raw_cards)}")
+        return [
+            self._build_listing_data(
+                href=raw.get('href') or '',
+                title=raw.get('title') or '',
+                card_text=raw.get('text') or '',
+                image_srcs=raw.get('images') or []
+            ) if isinstance(raw, dict) else None
+            for raw in raw_cards
+        ]
+
+    def _extract_listings_via_elements(self) -> List[Optional[Dict]]:
+        """Find listing cards with the selector cascade and extract each one"""
+        listing_cards = []
+        for selector in _CARD_SELECTORS:
+            logger.info(f"[Facebook Scraper] Attempting to find listing cards with selector: {selector}")
+            listing_cards = self.page.eles(selector)
+            if listing_cards:
+                break
+
+        logger.info(f"[Facebook Scraper] Found listing cards, count: {len(listing_cards)}")
+
+        # Debug: Save page if no listings found
+        if len(listing_cards) == 0:
+            logger.warning("[Facebook Scraper] No listing cards found - saving debug output")
+            self.debug_save_page("no_listings")
+
+        return [self._extract_listing_data(card) for card in listing_cards[:_MAX_CARDS]]
+
     def _extract_listing_data(self, card) -> Optional[Dict]:
         """Extract data from a single Facebook listing card"""
         try:
+            # The card is already rendered, so missing children won't appear by waiting (timeout=0)
             # Extract link
-            link_element = card.ele('tag:a', timeout=2)
+            link_element = card.ele('tag:a', timeout=0)
             if not link_element:
                 return None
 
-            href = link_element.link
-            if not href:
-                return None
-
-            # Facebook URLs can be complex, extract clean URL
-            if '/marketplace/item/' in href:
-                id_match = re.search(r'/marketplace/item/(\d+)', href)
-                external_id = id_match.group(1) if id_match else None
-                full_url = f"{self.base_url}/marketplace/item/{external_id}" if external_id else href
-            else:
-                external_id = None
-                full_url = href
-
-            # Extract all text content
-            card_text = card.text
-
             # Extract title
             title = ""
-            title_selectors = ['css:span[class*="title"]', 'tag:h2', 'tag:h3']
-            for selector in title_selectors:
-                title_element = card.ele(selector, timeout=2)
+            for selector in _TITLE_SELECTORS:
+                title_element = card.ele(selector, timeout=0)
                 if title_element:
                     title = title_element.text
                     break
 
-            # Extract price
-            price = self._extract_price_from_text(card_text)
-
-            # Extract details
-            rooms = self._extract_rooms(card_text)
-            size_sqm = self._extract_size(card_text)
-
-            # Location (often in description or title)
-            city, neighborhood, street = self._extract_location_from_text(card_text)
-
             # Extract images
-            images = []
-            img_elements = card.eles('tag:img')
-            for img in img_elements[:5]:
-                src = img.attr('src')
-                if src and 'http' in src:
-                    images.append(src)
+            image_srcs = [img.attr('src') for img in card.eles('tag:img')[:5]]
 
-            return {
-                'external_id': external_id,
-                'url': full_url,
-                'title': title.strip(),
-                'price': price,
-                'rooms': rooms,
-                'size_sqm': size_sqm,
-                'floor': None,
-                'city': city,
-                'neighborhood': neighborhood,
-                'street': street,
-                'location_text': '',
-                'details_text': card_text,
-                'contact_name': '',
-                'contact_phone': '',
-                'images': images
-            }
+            return self._build_listing_data(
+                href=link_element.link,
+                title=title,
+                card_text=card.text,
+                image_srcs=image_srcs
+            )
 
         except Exception as e:
             logger.debug(f"Error extracting Facebook listing data: {e}")
             return None
 
+    def _build_listing_data(
+        self,
+        href: str,
+        title: str,
+        card_text: str,
+        image_srcs: List[str],
+        price: Optional[float] = None
+    ) -> Optional[Dict]:
+        """Build raw listing data from the text fields of a single card (price is parsed from the text if not given)"""
+        if not href:
+            return None
+
+        # Facebook URLs can be complex, extract clean URL
+        if '/marketplace/item/' in href:
+            id_match = _ITEM_ID_RE.search(href)
+            external_id = id_match.group(1) if id_match else None
+            full_url = f"{self.base_url}/marketplace/item/{external_id}" if external_id else href
+        else:
+            external_id = None
+            full_url = href
+
+        # Extract price
+        if price is None:
+            price = self._extract_price_from_text(card_text)
+
+        # Extract details
+        rooms = self._extract_rooms(card_text)
+        size_sqm = self._extract_size(card_text)
+
+        # Location (often in description or title)
+        city, neighborhood, street = self._extract_location_from_text(card_text)
+
+        # Keep only absolute image URLs
+        images = [src for src in image_srcs if src and src.startswith(('http://', 'https://'))]
+
+        return {
+            'external_id': external_id,
+            'url': full_url,
+            'title': title.strip(),
+            'price': price,
+            'rooms': rooms,
+            'size_sqm': size_sqm,
+            'floor': None,
+            'city': city,
+            'neighborhood': neighborhood,
+            'street': street,
+            'location_text': '',
+            'details_text': card_text,
+            'contact_name': '',
+            'contact_phone': '',
+            'images': images
+        }
+
     def parse_listing(self, raw_data: Dict) -> Optional[Dict]:
         """Parse raw listing data into standardized format"""
         try:
@@ -216,13 +403,13 @@ class FacebookScraper(BaseScraper):
                 price_per_sqm = raw_data['price'] / raw_data['size_sqm']
 
             # Detect features from text
-            details_lower = raw_data.get('details_text', '').lower()
-
-            has_elevator = any(word in details_lower for word in ['מעלית', 'elevator'])
-            has_parking = any(word in details_lower for word in ['חניה', 'parking', 'חנייה'])
-            has_balcony = any(word in details_lower for word in ['מרפסת', 'balcony', 'mirpeset'])
-            has_mamad = any(word in details_lower for word in ['ממ"ד', 'ממד', 'mamad', 'מרחב מוגן', 'מקלט'])
+            details_text = raw_data.get('details_text', '')
+            features = extract_features(details_text)
 
+            has_elevator = 'elevator' in features
+            has_parking = 'parking' in features
+            has_balcony = 'balcony' in features
+            has_mamad = 'mamad' in features
 
             return {
                 'source': 'facebook',
@@ -255,14 +442,8 @@ class FacebookScraper(BaseScraper):
     def _extract_price_from_text(self, text: str) -> Optional[float]:
         """Extract price from text"""
         # Look for patterns like "₪5,000" or "5000 ₪" or "5,000 shekels"
-        patterns = [
-            r'₪\s*([\d,]+)',
-            r'([\d,]+)\s*₪',
-            r'([\d,]+)\s*(?:ש"ח|שקל)',
-        ]
-
-        for pattern in patterns:
-            match = re.search(pattern, text)
+        for pattern in _PRICE_RES:
+            match = pattern.search(text)
             if match:
                 try:
                     price_str = match.group(1).replace(',', '')
@@ -273,7 +454,7 @@ class FacebookScraper(BaseScraper):
 
     def _extract_rooms(self, text: str) -> Optional[float]:
         """Extract number of rooms"""
-        match = re.search(r'(\d+\.?\d*)\s*(?:חדרים|חד\'|rooms)', text)
+        match = _ROOMS_RE.search(text)
         if match:
             try:
                 return float(match.group(1))
@@ -283,7 +464,7 @@ class FacebookScraper(BaseScraper):
 
     def _extract_size(self, text: str) -> Optional[float]:
         """Extract size in sqm"""
-        match = re.search(r'(\d+)\s*(?:מ"ר|מ״ר|sqm|m2)', text)
+        match = _SIZE_RE.search(text)
         if match:
             try:
                 return float(match.group(1))
@@ -293,31 +474,11 @@ class FacebookScraper(BaseScraper):
 
     def _extract_location_from_text(self, text: str) -> tuple:
         """Extract location information from text"""
-        # Common Israeli cities
-        cities = [
-            'תל אביב', 'תל אביב-יפו', 'רמת גן', 'גבעתיים',
-            'הרצליה', 'רמת השרון', 'פתח תקווה', 'ראשון לציון'
-        ]
+        city_match = _CITY_RE.search(text)
+        neighborhood_match = _NEIGHBORHOOD_RE.search(text)
 
-        city = None
-        neighborhood = None
+        city = city_match.group(0) if city_match else None
+        neighborhood = neighborhood_match.group(0) if neighborhood_match else None
         street = None
 
-        # Find city
-        for c in cities:
-            if c in text:
-                city = c
-                break
-
-        # Common neighborhoods in Tel Aviv (example)
-        neighborhoods = [
-            'רמת אביב', 'בבלי', 'יד אליהו', 'נווה אביבים',
-            'פלורנטין', 'נווה צדק', 'רמת החייל'
-        ]
-
-        for n in neighborhoods:
-            if n in text:
-                neighborhood = n
-                break
-
         return city, neighborhood, street
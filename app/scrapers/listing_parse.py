@@ -0,0 +1,90 @@
+"""Text parsing helpers shared by the listing-card scrapers (Yad2, Madlan)"""
+
+import re
+from typing import Optional, Set
+
+# Listing-parser patterns, compiled once at import
+_NUM_RE = re.compile(r'\d[\d,]*')
+# Rooms, size and floor alternatives fused so each card's text is scanned once.
+# The floor number is captured in a lookahead so it stays available to the rooms
+# alternative ("קומה 3 חדרים" yields both floor 3 and 3 rooms)
+_DETAILS_RE = re.compile(
+    r'(?P<rooms>\d+\.?\d*)\s*(?:חדרים|חד\'|חד|rooms)'
+    r'|(?P<size>\d+)\s*(?:מ"ר|מ״ר|sqm|m2)'
+    r'|(?:קומה|floor)\s*(?=(?P<floor>\d+))'
+)
+
+# Feature keywords, matched in a single case-insensitive pass over the card text
+_FEATURE_KEYWORDS = {
+    'elevator': ('מעלית', 'elevator'),
+    'parking': ('חניה', 'parking', 'חנייה'),
+    'balcony': ('מרפסת', 'balcony', 'mirpeset'),
+    'mamad': ('ממ"ד', 'ממד', 'mamad', 'מרחב מוגן', 'מקלט'),
+}
+_KEYWORD_TO_FEATURE = {
+    word: feature for feature, words in _FEATURE_KEYWORDS.items() for word in words
+}
+_FEATURE_RE = re.compile('|'.join(re.escape(word) for word in _KEYWORD_TO_FEATURE), re.IGNORECASE)
+
+# Common Israeli city names, matched in one pass when a card has no location element
+_CITY_NAMES = ('תל אביב', 'רמת גן', 'גבעתיים', 'הרצליה', 'רמת השרון', 'פתח תקווה')
+_CITY_RE = re.compile('|'.join(re.escape(city) for city in _CITY_NAMES))
+
+
+def extract_number(text: str) -> Optional[float]:
+    """Extract the first number from text, ignoring thousands separators"""
+    if not text:
+        return None
+
+    # First digit run, with thousands separators dropped from the match only
+    match = _NUM_RE.search(text)
+    return float(match.group().replace(',', '')) if match else None
+
+
+def extract_details(text: str) -> tuple:
+    """Extract rooms, size in sqm and floor in a single pass over the text"""
+    rooms = size_sqm = floor = None
+    for match in _DETAILS_RE.finditer(text or ''):
+        kind = match.lastgroup
+        if kind == 'rooms' and rooms is None:
+            rooms = float(match.group('rooms'))
+        elif kind == 'size' and size_sqm is None:
+            size_sqm = float(match.group('size'))
+        elif kind == 'floor' and floor is None:
+            floor = int(match.group('floor'))
+    return rooms, size_sqm, floor
+
+
+def extract_features(text: str) -> Set[str]:
+    """Return the features (elevator, parking, balcony, mamad) mentioned in the text"""
+    return {
+        _KEYWORD_TO_FEATURE[match.group(0).lower()]
+        for match in _FEATURE_RE.finditer(text or '')
+    }
+
+
+def extract_location_from_text(text: str) -> str:
+    """Try to extract location from general text"""
+    # Look for common Israeli city names
+    match = _CITY_RE.search(text or '')
+    if match:
+        # Get ~50 chars before and after
+        start = max(0, match.start() - 50)
+        end = min(len(text), match.end() + 50)
+        return text[start:end].strip()
+    return ""
+
+
+def parse_location(location_text: str) -> tuple:
+    """Parse location into city, neighborhood, street"""
+    if not location_text:
+        return None, None, None
+
+    # Location usually in format: "Street, Neighborhood, City"
+    parts = [p.strip() for p in location_text.split(',')]
+
+    city = parts[-1] if len(parts) > 0 else None
+    neighborhood = parts[-2] if len(parts) > 1 else None
+    street = parts[0] if len(parts) > 0 else None
+
+    return city, neighborhood, street
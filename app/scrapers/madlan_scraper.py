@@ -2,15 +2,76 @@ from app.scrapers.base_scraper import BaseScraper
 from typing import List, Dict, Optional
 import logging
 import re
+from app.scrapers.listing_parse import (
+    extract_details,
+    extract_features,
+    extract_location_from_text,
+    extract_number,
+    parse_location,
+)
 
 logger = logging.getLogger(__name__)
 
+# Listing URL ID pattern, compiled once at import
+_ID_RE_MADLAN = re.compile(r'/(\d+)/?$')
+
+# Listing card XPaths, in fallback order. Only the newest cards are processed, so
+# the limit is applied in the browser instead of wrapping every card on the page
+_MAX_CARDS = 30
+_CARD_XPATHS = (
+    '//*[@data-testid="listing-card"]',
+    '//*[contains(concat(" ", normalize-space(@class), " "), " listing-card ")]',
+    '//*[contains(@class, "listing")]',
+    '//*[contains(@class, "card")]',
+    '//article',
+)
+
+# Locators are built once as ('xpath', ...) tuples, which DrissionPage uses as-is
+# instead of re-parsing its string locator syntax on every lookup
+_CARD_LOCATORS = tuple(('xpath', f'({xpath})[position() <= {_MAX_CARDS}]') for xpath in _CARD_XPATHS)
+
+# Card field lookups, each a single XPath query instead of a chain of fallback selectors
+_TITLE_LOCATOR = ('xpath', './/h2|.//h3|.//*[contains(@class,"title")]')
+_PRICE_LOCATOR = ('xpath', './/*[contains(@class,"price")]')
+_LOCATION_LOCATOR = ('xpath', './/*[contains(@class,"location") or contains(@class,"address")]')
+
+# Collects the raw fields of the newest cards in one browser round-trip,
+# trying the same selector cascade as the element-based fallback
+_CARDS_JS = """
+const selectors = ['[data-testid="listing-card"]', '.listing-card', '[class*="listing"]', '[class*="card"]', 'article'];
+let cards = [];
+for (const selector of selectors) {
+    cards = Array.from(document.querySelectorAll(selector));
+    if (cards.length) break;
+}
+const text = (card, selector) => {
+    const el = card.querySelector(selector);
+    return el ? el.innerText : '';
+};
+return cards.slice(0, arguments[0]).map(card => {
+    const link = card.querySelector('a');
+    return {
+        href: link ? link.href : '',
+        title: text(card, 'h2, h3, [class*="title"]'),
+        price: text(card, '[class*="price"]'),
+        location: text(card, '[class*="location"], [class*="address"]'),
+        details: card.innerText,
+        images: Array.from(card.querySelectorAll('img')).slice(0, 5).map(img => img.getAttribute('src'))
+    };
+});
+"""
+
 
 class MadlanScraper(BaseScraper):
     """Scraper for Madlan.co.il real estate listings"""
 
-    def __init__(self, db_session):
-        super().__init__(db_session, 'madlan')
+    block_heavy_resources = True
+
+    # Card selector that matched last, shared across the per-scrape instances
+    _card_selector: Optional[tuple] = None
+
+    def __init__(self, db_session=None, session_factory=None):
+        super().__init__(db_session, 'madlan', session_factory=session_factory)
         self.base_url = "https://www.madlan.co.il"
 
     def scrape(self) -> List[Dict]:
@@ -49,41 +110,17 @@ class MadlanScraper(BaseScraper):
             self.scroll_page(scrolls=3)
             self.random_delay(2, 4)
 
-            # Get listing cards - Madlan uses different selectors
-            logger.info("[Madlan Scraper] Attempting to find listing cards with selector: css:[data-testid=\"listing-card\"]")
-            listing_cards = self.page.eles('css:[data-testid="listing-card"]')
-
-            if not listing_cards:
-                logger.info("[Madlan Scraper] Primary selector failed, trying alternative: .listing-card")
-                listing_cards = self.page.eles('.listing-card')
-
-            if not listing_cards:
-                logger.info("[Madlan Scraper] Second selector failed, trying: css:[class*=\"listing\"]")
-                listing_cards = self.page.eles('css:[class*="listing"]')
+            # Read every card's fields in one JS evaluation, falling back to per-element extraction
+            extracted = self._extract_listings_via_js()
+            if extracted is None:
+                extracted = self._extract_listings_via_elements()
 
-            if not listing_cards:
-                logger.info("[Madlan Scraper] Third selector failed, trying: css:[class*=\"card\"]")
-                listing_cards = self.page.eles('css:[class*="card"]')
-
-            if not listing_cards:
-                logger.info("[Madlan Scraper] Fourth selector failed, trying generic: tag:article")
-                listing_cards = self.page.eles('tag:article')
-
-            logger.info(f"[Madlan Scraper] Found listing cards, count: {len(listing_cards)}")
-
-            # Debug: Save page if no listings found
-            if len(listing_cards) == 0:
-                logger.warning("[Madlan Scraper] No listing cards found - saving debug output")
-                self.debug_save_page("no_listings")
-
-            # Process only first 30 newest listings per scrape
-            max_listings = min(len(listing_cards), 30)
+            max_listings = len(extracted)
             logger.info(f"[Madlan Scraper] Processing listings, max_count: {max_listings}")
 
-            for idx, card in enumerate(listing_cards[:30], 1):
+            for idx, listing_data in enumerate(extracted, 1):
                 try:
-                    logger.debug(f"[Madlan Scraper] Extracting listing data, index: {idx}/{max_listings}")
-                    listing_data = self._extract_listing_data(card)
+                    logger.debug(f"[Madlan Scraper] Parsing extracted listing data, index: {idx}/{max_listings}")
                     if listing_data:
                         parsed = self.parse_listing(listing_data)
                         if parsed:
@@ -105,11 +142,63 @@ class MadlanScraper(BaseScraper):
 
         return listings
 
+    def _extract_listings_via_js(self) -> Optional[List[Optional[Dict]]]:
+        """Extract the newest listing cards in a single JS evaluation, or None if it yields nothing"""
+        try:
+            raw_cards = self.page.run_js(_CARDS_JS, _MAX_CARDS)
+        except Exception as e:
+            logger.debug(f"[Madlan Scraper] JS card extraction failed, error: {e}")
+            return None
+
+        if not isinstance(raw_cards, list) or not raw_cards:
+            logger.info("[Madlan Scraper] JS card extraction returned no cards, falling back to element selectors")
+            return None
+
+        logger.info(f"[Madlan Scraper] Extracted listing cards via JS, count: {len(raw_cards)}")
+        return [
+            self._build_listing_data(
+                href=raw.get('href') or '',
+                title=raw.get('title') or '',
+                price_text=raw.get('price') or '',
+                location_text=raw.get('location') or '',
+                card_text=raw.get('details') or '',
+                image_srcs=raw.get('images') or []
+            ) if isinstance(raw, dict) else None
+            for raw in raw_cards
+        ]
+
+    def _extract_listings_via_elements(self) -> List[Optional[Dict]]:
+        """Find listing cards with the selector cascade and extract each one"""
+        # Get listing cards - Madlan uses different selectors. The one that matched
+        # on the previous scrape is tried first, the rest keep their fallback order
+        selectors = sorted(_CARD_LOCATORS, key=lambda selector: selector != MadlanScraper._card_selector)
+        listing_cards = []
+        for selector in selectors:
+            logger.info(f"[Madlan Scraper] Attempting to find listing cards with selector: {selector[1]}")
+            listing_cards = self.page.eles(selector)
+            if listing_cards:
+                MadlanScraper._card_selector = selector
+                break
+
+        logger.info(f"[Madlan Scraper] Found listing cards, count: {len(listing_cards)}")
+
+        # Debug: Save page if no listings found
+        if len(listing_cards) == 0:
+            logger.warning("[Madlan Scraper] No listing cards found - saving debug output")
+            self.debug_save_page("no_listings")
+
+        # Process only the newest listings per scrape
+        cards = listing_cards[:_MAX_CARDS]
+
+        # One tab's CDP connection is not thread-safe, so cards are read in order
+        return [self._extract_listing_data(card) for card in cards]
+
     def _extract_listing_data(self, card) -> Optional[Dict]:
         """Extract data from a single listing card"""
         try:
+            # The card is already rendered, so missing children won't appear by waiting (timeout=0)
             # Extract link and ID
-            link_element = card.ele('tag:a', timeout=2)
+            link_element = card.ele('tag:a', timeout=0)
             if not link_element:
                 return None
 
@@ -117,79 +206,90 @@ class MadlanScraper(BaseScraper):
             if not href:
                 return None
 
-            full_url = self.base_url + href if href.startswith('/') else href
-
-            # Extract ID from URL
-            id_match = re.search(r'/(\d+)/?$', href)
-            external_id = id_match.group(1) if id_match else None
-
-            # Extract all text content
-            card_text = card.text
-
             # Extract title (usually the first line or prominent text)
-            title_element = card.ele('tag:h2', timeout=2)
-            if not title_element:
-                title_element = card.ele('tag:h3', timeout=2)
-            if not title_element:
-                title_element = card.ele('.title', timeout=2)
-            if not title_element:
-                title_element = card.ele('css:[class*="title"]', timeout=2)
+            title_element = card.ele(_TITLE_LOCATOR, timeout=0)
             title = title_element.text if title_element else ""
 
             # Extract price
-            price_element = card.ele('css:[class*="price"]', timeout=2)
+            price_element = card.ele(_PRICE_LOCATOR, timeout=0)
             price_text = price_element.text if price_element else ""
-            price = self._extract_number(price_text)
-
-            # Extract details
-            rooms = self._extract_rooms(card_text)
-            size_sqm = self._extract_size(card_text)
-            floor = self._extract_floor(card_text)
 
             # Extract location
-            location_element = card.ele('css:[class*="location"]', timeout=2)
-            if not location_element:
-                location_element = card.ele('css:[class*="address"]', timeout=2)
+            location_element = card.ele(_LOCATION_LOCATOR, timeout=0)
             location_text = location_element.text if location_element else ""
 
-            if not location_text:
-                # Try to find location in card text
-                location_text = self._extract_location_from_text(card_text)
-
-            city, neighborhood, street = self._parse_location(location_text)
-
             # Extract images
-            images = []
-            img_elements = card.eles('tag:img')
-            for img in img_elements[:5]:
-                src = img.attr('src')
-                if src and ('http' in src or src.startswith('//')):
-                    if src.startswith('//'):
-                        src = 'https:' + src
-                    images.append(src)
+            image_srcs = [img.attr('src') for img in card.eles('tag:img')[:5]]
 
-            return {
-                'external_id': external_id,
-                'url': full_url,
-                'title': title.strip(),
-                'price': price,
-                'rooms': rooms,
-                'size_sqm': size_sqm,
-                'floor': floor,
-                'city': city,
-                'neighborhood': neighborhood,
-                'street': street,
-                'location_text': location_text,
-                'details_text': card_text,
-                'contact_name': '',
-                'contact_phone': '',
-                'images': images
-            }
+            return self._build_listing_data(
+                href=href,
+                title=title,
+                price_text=price_text,
+                location_text=location_text,
+                card_text=card.text,
+                image_srcs=image_srcs
+            )
 
         except Exception as e:
             logger.debug(f"Error extracting Madlan listing data: {e}")
             return None
 
+    def _build_listing_data(
+        self,
+        href: str,
+        title: str,
+        price_text: str,
+        location_text: str,
+        card_text: str,
+        image_srcs: List[str]
+    ) -> Optional[Dict]:
+        """Build raw listing data from the text fields of a single card"""
+        if not href:
+            return None
+
+        full_url = self.base_url + href if href.startswith('/') else href
+
+        # Extract ID from URL
+        id_match = _ID_RE_MADLAN.search(href)
+        external_id = id_match.group(1) if id_match else None
+
+        # Extract price
+        price = self._extract_number(price_text)
+
+        # Extract details
+        rooms, size_sqm, floor = self._extract_details(card_text)
+
+        if not location_text:
+            # Try to find location in card text
+            location_text = self._extract_location_from_text(card_text)
+
+        city, neighborhood, street = self._parse_location(location_text)
+
+        # Keep absolute and protocol-relative image URLs
+        images = [
+            'https:' + src if src.startswith('//') else src
+            for src in image_srcs
+            if src and src.startswith(('http://', 'https://', '//'))
+        ]
+
+        return {
+            'external_id': external_id,
+            'url': full_url,
+            'title': title.strip(),
+            'price': price,
+            'rooms': rooms,
+            'size_sqm': size_sqm,
+            'floor': floor,
+            'city': city,
+            'neighborhood': neighborhood,
+            'street': street,
+            'location_text': location_text,
+            'details_text': card_text,
+            'contact_name': '',
+            'contact_phone': '',
+            'images': images
+        }
+
     def parse_listing(self, raw_data: Dict) -> Optional[Dict]:
         """Parse raw listing data into standardized format"""
         try:
@@ -199,12 +299,13 @@ class MadlanScraper(BaseScraper):
                 price_per_sqm = raw_data['price'] / raw_data['size_sqm']
 
             # Detect features from text
-            details_lower = raw_data.get('details_text', '').lower()
+            details_text = raw_data.get('details_text', '')
+            features = extract_features(details_text)
 
-            has_elevator = any(word in details_lower for word in ['מעלית', 'elevator'])
-            has_parking = any(word in details_lower for word in ['חניה', 'parking', 'חנייה'])
-            has_balcony = any(word in details_lower for word in ['מרפסת', 'balcony', 'mirpeset'])
-            has_mamad = any(word in details_lower for word in ['ממ"ד', 'ממד', 'mamad', 'מרחב מוגן', 'מקלט'])
+            has_elevator = 'elevator' in features
+            has_parking = 'parking' in features
+            has_balcony = 'balcony' in features
+            has_mamad = 'mamad' in features
 
             return {
                 'source': 'madlan',
@@ -236,70 +337,28 @@ class MadlanScraper(BaseScraper):
 
     def _extract_number(self, text: str) -> Optional[float]:
         """Extract number from text"""
-        if not text:
-            return None
+        return extract_number(text)
 
-        numbers = re.findall(r'[\d,]+', text.replace(',', ''))
-        if numbers:
-            try:
-                return float(numbers[0])
-            except:
-                pass
-        return None
+    def _extract_details(self, text: str) -> tuple:
+        """Extract rooms, size in sqm and floor in a single pass over the text"""
+        return extract_details(text)
 
     def _extract_rooms(self, text: str) -> Optional[float]:
         """Extract number of rooms"""
-        match = re.search(r'(\d+\.?\d*)\s*(?:חדרים|חד\'|rooms)', text)
-        if match:
-            try:
-                return float(match.group(1))
-            except:
-                pass
-        return None
+        return extract_details(text)[0]
 
     def _extract_size(self, text: str) -> Optional[float]:
         """Extract size in sqm"""
-        match = re.search(r'(\d+)\s*(?:מ"ר|מ״ר|sqm|m2)', text)
-        if match:
-            try:
-                return float(match.group(1))
-            except:
-                pass
-        return None
+        return extract_details(text)[1]
 
     def _extract_floor(self, text: str) -> Optional[int]:
         """Extract floor number"""
-        match = re.search(r'(?:קומה|floor)\s*(\d+)', text)
-        if match:
-            try:
-                return int(match.group(1))
-            except:
-                pass
-        return None
+        return extract_details(text)[2]
 
     def _extract_location_from_text(self, text: str) -> str:
         """Try to extract location from general text"""
-        # Look for common Israeli city names
-        cities = ['תל אביב', 'רמת גן', 'גבעתיים', 'הרצליה', 'רמת השרון', 'פתח תקווה']
-        for city in cities:
-            if city in text:
-                # Try to find surrounding context
-                idx = text.find(city)
-                # Get ~50 chars before and after
-                start = max(0, idx - 50)
-                end = min(len(text), idx + len(city) + 50)
-                return text[start:end].strip()
-        return ""
+        return extract_location_from_text(text)
 
     def _parse_location(self, location_text: str) -> tuple:
         """Parse location into city, neighborhood, street"""
-        if not location_text:
-            return None, None, None
-
-        parts = [p.strip() for p in location_text.split(',')]
-
-        city = parts[-1] if len(parts) > 0 else None
-        neighborhood = parts[-2] if len(parts) > 1 else None
-        street = parts[0] if len(parts) > 0 else None
-
-        return city, neighborhood, street
+        return parse_location(location_text)
@@ -3,15 +3,64 @@ from typing import List, Dict, Optional
 import logging
 import re
 from app.core.config import settings
+from app.scrapers.listing_parse import (
+    extract_details,
+    extract_features,
+    extract_number,
+    parse_location,
+)
 
 logger = logging.getLogger(__name__)
 
+# Listing URL ID pattern, compiled once at import
+_ID_RE_YAD2 = re.compile(r'/item/(\d+)')
+
+# Listing card XPaths, in fallback order. Only the newest cards are processed, so
+# the limit is applied in the browser instead of wrapping every card on the page
+_MAX_CARDS = 30
+_CARD_XPATHS = (
+    '//*[contains(concat(" ", normalize-space(@class), " "), " feeditem ")]',
+    '//*[contains(@class, "feed_item")]',
+    '//*[contains(@data-testid, "item")]',
+    '//article',
+    '//div[contains(@class, "item")]',
+)
+_CARD_SELECTORS = tuple(f'xpath:({xpath})[position() <= {_MAX_CARDS}]' for xpath in _CARD_XPATHS)
+
+# Collects the raw fields of the newest cards in one browser round-trip,
+# trying the same selector cascade as the element-based fallback
+_CARDS_JS = """
+const selectors = ['.feeditem', '[class*="feed_item"]', '[data-testid*="item"]', 'article', 'div[class*="item"]'];
+let cards = [];
+for (const selector of selectors) {
+    cards = Array.from(document.querySelectorAll(selector));
+    if (cards.length) break;
+}
+const text = (card, selector) => {
+    const el = card.querySelector(selector);
+    return el ? el.innerText : '';
+};
+return cards.slice(0, arguments[0]).map(card => {
+    const link = card.querySelector('a.feed_item');
+    return {
+        href: link ? link.getAttribute('href') : '',
+        title: text(card, '.title'),
+        price: text(card, '.price'),
+        location: text(card, '.subtitle'),
+        details: card.innerText,
+        images: Array.from(card.querySelectorAll('img')).slice(0, 5).map(img => img.src)
+    };
+});
+"""
+
 
 class Yad2Scraper(BaseScraper):
     """Scraper for Yad2.co.il real estate listings"""
 
-    def __init__(self, db_session):
-        super().__init__(db_session, 'yad2')
+    block_heavy_resources = True
+
+    def __init__(self, db_session=None, session_factory=None):
+        super().__init__(db_session, 'yad2', session_factory=session_factory)
         self.base_url = "https://www.yad2.co.il"
 
     def build_search_url(self) -> str:
@@ -68,39 +117,17 @@ class Yad2Scraper(BaseScraper):
             self.scroll_page(scrolls=3)
             self.random_delay(2, 4)
 
-            # Get listing cards - try multiple selectors as Yad2 changes frequently
-            logger.info("[Yad2 Scraper] Attempting to find listing cards with selector: .feeditem")
-            listing_cards = self.page.eles('.feeditem')
-
-            if not listing_cards:
-                logger.info("[Yad2 Scraper] Primary selector failed, trying alternative: css:[class*=\"feed_item\"]")
-                listing_cards = self.page.eles('css:[class*="feed_item"]')
-
-            if not listing_cards:
-                logger.info("[Yad2 Scraper] Second selector failed, trying: css:[data-testid*=\"item\"]")
-                listing_cards = self.page.eles('css:[data-testid*="item"]')
-
-            if not listing_cards:
-                logger.info("[Yad2 Scraper] Third selector failed, trying generic: article, css:div[class*=\"item\"]")
-                listing_cards = self.page.eles('tag:article')
-                if not listing_cards:
-                    listing_cards = self.page.eles('css:div[class*="item"]')
+            # Read every card's fields in one JS evaluation, falling back to per-element extraction
+            extracted = self._extract_listings_via_js()
+            if extracted is None:
+                extracted = self._extract_listings_via_elements()
 
-            logger.info(f"[Yad2 Scraper] Found listing cards, count: {len(listing_cards)}")
-
-            # Debug: Save page if no listings found
-            if len(listing_cards) == 0:
-                logger.warning("[Yad2 Scraper] No listing cards found - saving debug output")
-                self.debug_save_page("no_listings")
-
-            # Process only first 20-30 newest listings per scrape
-            max_listings = min(len(listing_cards), 30)
+            max_listings = len(extracted)
             logger.info(f"[Yad2 Scraper] Processing listings, max_count: {max_listings}")
 
-            for idx, card in enumerate(listing_cards[:30], 1):
+            for idx, listing_data in enumerate(extracted, 1):
                 try:
-                    logger.debug(f"[Yad2 Scraper] Extracting listing data, index: {idx}/{max_listings}")
-                    listing_data = self._extract_listing_data(card)
+                    logger.debug(f"[Yad2 Scraper] Parsing extracted listing data, index: {idx}/{max_listings}")
                     if listing_data:
                         parsed = self.parse_listing(listing_data)
                         if parsed:
@@ -122,11 +149,60 @@ class Yad2Scraper(BaseScraper):
 
         return listings
 
+    def _extract_listings_via_js(self) -> Optional[List[Optional[Dict]]]:
+        """Extract the newest listing cards in a single JS evaluation, or None if it yields nothing"""
+        try:
+            raw_cards = self.page.run_js(_CARDS_JS, _MAX_CARDS)
+        except Exception as e:
+            logger.debug(f"[Yad2 Scraper] JS card extraction failed, error: {e}")
+            return None
+
+        if not isinstance(raw_cards, list) or not raw_cards:
+            logger.info("[Yad2 Scraper] JS card extraction returned no cards, falling back to element selectors")
+            return None
+
+        logger.info(f"[Yad2 Scraper] Extracted listing cards via JS, count: {len(raw_cards)}")
+        return [
+            self._build_listing_data(
+                href=raw.get('href') or '',
+                title=raw.get('title') or '',
+                price_text=raw.get('price') or '',
+                location_text=raw.get('location') or '',
+                details_text=raw.get('details') or '',
+                image_srcs=raw.get('images') or []
+            ) if isinstance(raw, dict) else None
+            for raw in raw_cards
+        ]
+
+    def _extract_listings_via_elements(self) -> List[Optional[Dict]]:
+        """Find listing cards with the selector cascade and extract each one"""
+        # Get listing cards - try multiple selectors as Yad2 changes frequently
+        listing_cards = []
+        for selector in _CARD_SELECTORS:
+            logger.info(f"[Yad2 Scraper] Attempting to find listing cards with selector: {selector}")
+            listing_cards = self.page.eles(selector)
+            if listing_cards:
+                break
+
+        logger.info(f"[Yad2 Scraper] Found listing cards, count: {len(listing_cards)}")
+
+        # Debug: Save page if no listings found
+        if len(listing_cards) == 0:
+            logger.warning("[Yad2 Scraper] No listing cards found - saving debug output")
+            self.debug_save_page("no_listings")
+
+        # Process only the newest listings per scrape
+        cards = listing_cards[:_MAX_CARDS]
+
+        # One tab's CDP connection is not thread-safe, so cards are read in order
+        return [self._extract_listing_data(card) for card in cards]
+
     def _extract_listing_data(self, card) -> Optional[Dict]:
         """Extract data from a single listing card"""
         try:
+            # The card is already rendered, so missing children won't appear by waiting (timeout=0)
             # Extract link and ID
-            link_element = card.ele('css:a.feed_item', timeout=2)
+            link_element = card.ele('css:a.feed_item', timeout=0)
             if not link_element:
                 return None
 
@@ -134,73 +210,86 @@ class Yad2Scraper(BaseScraper):
             if not href:
                 return None
 
-            full_url = self.base_url + href if href.startswith('/') else href
-
-            # Extract ID from URL
-            id_match = re.search(r'/item/(\d+)', href)
-            external_id = id_match.group(1) if id_match else None
-
             # Extract title
-            title_element = card.ele('.title', timeout=2)
+            title_element = card.ele('.title', timeout=0)
             title = title_element.text if title_element else ""
 
             # Extract price
-            price_element = card.ele('.price', timeout=2)
+            price_element = card.ele('.price', timeout=0)
             price_text = price_element.text if price_element else ""
-            price = self._extract_number(price_text)
-
-            # Extract details
-            details_text = card.text
-
-            # Extract rooms
-            rooms = self._extract_rooms(details_text)
-
-            # Extract size
-            size_sqm = self._extract_size(details_text)
-
-            # Extract floor
-            floor = self._extract_floor(details_text)
 
             # Extract address/location
-            location_element = card.ele('.subtitle', timeout=2)
+            location_element = card.ele('.subtitle', timeout=0)
             location_text = location_element.text if location_element else ""
 
-            city, neighborhood, street = self._parse_location(location_text)
-
-            # Extract contact
-            contact_name = ""
-            contact_phone = ""
-
             # Extract images
-            images = []
-            img_elements = card.eles('tag:img')
-            for img in img_elements[:5]:  # Max 5 images
-                src = img.attr('src')
-                if src and 'http' in src:
-                    images.append(src)
+            image_srcs = [img.attr('src') for img in card.eles('tag:img')[:5]]  # Max 5 images
 
-            return {
-                'external_id': external_id,
-                'url': full_url,
-                'title': title.strip(),
-                'price': price,
-                'rooms': rooms,
-                'size_sqm': size_sqm,
-                'floor': floor,
-                'city': city,
-                'neighborhood': neighborhood,
-                'street': street,
-                'location_text': location_text,
-                'details_text': details_text,
-                'contact_name': contact_name,
-                'contact_phone': contact_phone,
-                'images': images
-            }
+            return self._build_listing_data(
+                href=href,
+                title=title,
+                price_text=price_text,
+                location_text=location_text,
+                details_text=card.text,
+                image_srcs=image_srcs
+            )
 
         except Exception as e:
             logger.debug(f"Error extracting Yad2 listing data: {e}")
             return None
 
+    def _build_listing_data(
+        self,
+        href: str,
+        title: str,
+        price_text: str,
+        location_text: str,
+        details_text: str,
+        image_srcs: List[str]
+    ) -> Optional[Dict]:
+        """Build raw listing data from the text fields of a single card"""
+        if not href:
+            return None
+
+        full_url = self.base_url + href if href.startswith('/') else href
+
+        # Extract ID from URL
+        id_match = _ID_RE_YAD2.search(href)
+        external_id = id_match.group(1) if id_match else None
+
+        # Extract price
+        price = self._extract_number(price_text)
+
+        # Extract rooms, size and floor
+        rooms, size_sqm, floor = self._extract_details(details_text)
+
+        city, neighborhood, street = self._parse_location(location_text)
+
+        # Extract contact
+        contact_name = ""
+        contact_phone = ""
+
+        # Keep only absolute image URLs
+        images = [src for src in image_srcs if src and src.startswith(('http://', 'https://'))]
+
+        return {
+            'external_id': external_id,
+            'url': full_url,
+            'title': title.strip(),
+            'price': price,
+            'rooms': rooms,
+            'size_sqm': size_sqm,
+            'floor': floor,
+            'city': city,
+            'neighborhood': neighborhood,
+            'street': street,
+            'location_text': location_text,
+            'details_text': details_text,
+            'contact_name': contact_name,
+            'contact_phone': contact_phone,
+            'images': images
+        }
+
     def parse_listing(self, raw_data: Dict) -> Optional[Dict]:
         """Parse raw listing data into standardized format"""
         try:
@@ -210,13 +299,13 @@ class Yad2Scraper(BaseScraper):
                 price_per_sqm = raw_data['price'] / raw_data['size_sqm']
 
             # Detect features from text
-            details_lower = raw_data.get('details_text', '').lower()
-
-            has_elevator = any(word in details_lower for word in ['מעלית', 'elevator'])
-            has_parking = any(word in details_lower for word in ['חניה', 'parking', 'חנייה'])
-            has_balcony = any(word in details_lower for word in ['מרפסת', 'balcony', 'mirpeset'])
-            has_mamad = any(word in details_lower for word in ['ממ"ד', 'ממד', 'mamad', 'מרחב מוגן', 'מקלט'])
+            details_text = raw_data.get('details_text', '')
+            features = extract_features(details_text)
 
+            has_elevator = 'elevator' in features
+            has_parking = 'parking' in features
+            has_balcony = 'balcony' in features
+            has_mamad = 'mamad' in features
 
             return {
                 'source': 'yad2',
@@ -248,61 +337,24 @@ class Yad2Scraper(BaseScraper):
 
     def _extract_number(self, text: str) -> Optional[float]:
         """Extract number from text"""
-        if not text:
-            return None
+        return extract_number(text)
 
-        # Remove commas and extract numbers
-        numbers = re.findall(r'[\d,]+', text.replace(',', ''))
-        if numbers:
-            try:
-                return float(numbers[0])
-            except:
-                pass
-        return None
+    def _extract_details(self, text: str) -> tuple:
+        """Extract rooms, size in sqm and floor in a single pass over the text"""
+        return extract_details(text)
 
     def _extract_rooms(self, text: str) -> Optional[float]:
         """Extract number of rooms"""
-        # Look for patterns like "3 חדרים", "3.5 חד'", or "5 חד"
-        match = re.search(r'(\d+\.?\d*)\s*(?:חדרים|חד\'|חד|rooms)', text)
-        if match:
-            try:
-                return float(match.group(1))
-            except:
-                pass
-        return None
+        return extract_details(text)[0]
 
     def _extract_size(self, text: str) -> Optional[float]:
         """Extract size in sqm"""
-        # Look for patterns like "80 מ\"ר" or "80 sqm"
-        match = re.search(r'(\d+)\s*(?:מ"ר|מ״ר|sqm|m2)', text)
-        if match:
-            try:
-                return float(match.group(1))
-            except:
-                pass
-        return None
+        return extract_details(text)[1]
 
     def _extract_floor(self, text: str) -> Optional[int]:
         """Extract floor number"""
-        # Look for patterns like "קומה 3" or "floor 3"
-        match = re.search(r'(?:קומה|floor)\s*(\d+)', text)
-        if match:
-            try:
-                return int(match.group(1))
-            except:
-                pass
-        return None
+        return extract_details(text)[2]
 
     def _parse_location(self, location_text: str) -> tuple:
         """Parse location into city, neighborhood, street"""
-        if not location_text:
-            return None, None, None
-
-        # Location usually in format: "Street, Neighborhood, City"
-        parts = [p.strip() for p in location_text.split(',')]
-
-        city = parts[-1] if len(parts) > 0 else None
-        neighborhood = parts[-2] if len(parts) > 1 else None
-        street = parts[0] if len(parts) > 0 else None
-
-        return city, neighborhood, street
+        return parse_location(location_text)
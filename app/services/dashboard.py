@@ -78,7 +78,12 @@ templates.env.globals['get_whatsapp_url'] = get_whatsapp_url
 templates.env.globals['datetime'] = datetime
 
 # Database
-engine, SessionLocal = init_db(settings.database_url)
+engine, SessionLocal = init_db(
+    settings.database_url,
+    pool_size=settings.db_pool_size,
+    max_overflow=settings.db_max_overflow,
+    pool_timeout=settings.db_pool_timeout
+)
 
 
 def get_db():
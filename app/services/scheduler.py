@@ -1,6 +1,8 @@
 import asyncio
 import logging
 from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Optional
 
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.interval import IntervalTrigger
@@ -23,45 +25,35 @@ class ScrapingScheduler:
 
     def __init__(self, shutdown_event: asyncio.Event = None):
         self.scheduler = AsyncIOScheduler()
-        self.engine, self.SessionLocal = init_db(settings.database_url)
+        self.engine, self.SessionLocal = init_db(
+            settings.database_url,
+            pool_size=settings.db_pool_size,
+            max_overflow=settings.db_max_overflow,
+            pool_timeout=settings.db_pool_timeout
+        )
         self.is_running = False
         self.shutdown_event = shutdown_event or asyncio.Event()
-        # Thread pool for running synchronous scrapers
+        # Thread pool for the synchronous scrapers and blocking ORM work
         self.executor = ThreadPoolExecutor(max_workers=3)
+        # Created on first use, inside the running event loop
+        self._browser_lock: Optional[asyncio.Lock] = None
 
     def start(self):
         """Start the scheduler"""
         logger.info("[Scheduler] Starting scraping scheduler...")
 
-        # Schedule Yad2
-        logger.info(f"[Scheduler] Scheduling Yad2 scraper, interval: {settings.yad2_interval_minutes} minutes")
-        self.scheduler.add_job(
-            self.scrape_yad2,
-            trigger=IntervalTrigger(minutes=settings.yad2_interval_minutes),
-            id='yad2_scraper',
-            name='Yad2 Scraper',
-            replace_existing=True
-        )
-
-        # Schedule Madlan
-        logger.info(f"[Scheduler] Scheduling Madlan scraper, interval: {settings.madlan_interval_minutes} minutes")
-        self.scheduler.add_job(
-            self.scrape_madlan,
-            trigger=IntervalTrigger(minutes=settings.madlan_interval_minutes),
-            id='madlan_scraper',
-            name='Madlan Scraper',
-            replace_existing=True
-        )
-
-        # Schedule Facebook
-        logger.info(f"[Scheduler] Scheduling Facebook scraper, interval: {settings.facebook_interval_minutes} minutes")
-        self.scheduler.add_job(
-            self.scrape_facebook,
-            trigger=IntervalTrigger(minutes=settings.facebook_interval_minutes),
-            id='facebook_scraper',
-            name='Facebook Scraper',
-            replace_existing=True
-        )
+        # Offset each source's first run so their intervals don't keep firing in the same second
+        now = datetime.now()
+        for index, (source, name, job, interval) in enumerate(self._scrape_jobs()):
+            logger.info(f"[Scheduler] Scheduling {name} scraper, interval: {interval} minutes")
+            self.scheduler.add_job(
+                job,
+                trigger=IntervalTrigger(minutes=interval, jitter=settings.scrape_jitter_seconds),
+                id=f'{source}_scraper',
+                name=f'{name} Scraper',
+                next_run_time=now + timedelta(minutes=interval, seconds=index * settings.scrape_stagger_seconds),
+                replace_existing=True
+            )
 
         # Schedule neighborhood stats update (every 6 hours)
         logger.info("[Scheduler] Scheduling neighborhood stats updater, interval: 6 hours")
@@ -83,24 +75,32 @@ class ScrapingScheduler:
         # Run initial scrape immediately
         asyncio.create_task(self.run_initial_scrape())
 
+    def _scrape_jobs(self):
+        """Source id, display name, job and interval (minutes) for each scraper"""
+        return [
+            ('yad2', 'Yad2', self.scrape_yad2, settings.yad2_interval_minutes),
+            ('madlan', 'Madlan', self.scrape_madlan, settings.madlan_interval_minutes),
+            ('facebook', 'Facebook', self.scrape_facebook, settings.facebook_interval_minutes),
+        ]
+
     async def run_initial_scrape(self):
         """Run initial scrape on startup"""
         logger.info("[Scheduler] 🚀 Running initial scrape sequence...")
         logger.info("[Scheduler] Waiting 5 seconds for system initialization...")
         await asyncio.sleep(5)
 
-        logger.info("[Scheduler] Starting Yad2 initial scrape")
-        await self.scrape_yad2()
-        logger.info("[Scheduler] Waiting 30 seconds before next source...")
-        await asyncio.sleep(30)
-
-        logger.info("[Scheduler] Starting Madlan initial scrape")
-        await self.scrape_madlan()
-        logger.info("[Scheduler] Waiting 30 seconds before next source...")
-        await asyncio.sleep(30)
-
-        logger.info("[Scheduler] Starting Facebook initial scrape")
-        await self.scrape_facebook()
+        # Run the sources together; browser work is still serialized by the browser lock,
+        # but one source's processing and notifications overlap the next one's scrape
+        logger.info("[Scheduler] Starting Yad2, Madlan and Facebook initial scrapes")
+        results = await asyncio.gather(
+            self.scrape_yad2(),
+            self.scrape_madlan(),
+            self.scrape_facebook(),
+            return_exceptions=True
+        )
+        for source, result in zip(('Yad2', 'Madlan', 'Facebook'), results):
+            if isinstance(result, Exception):
+                logger.error(f"[Scheduler] {source} initial scrape failed, error: {result}")
 
         # Update stats after initial scrape
         logger.info("[Scheduler] Updating neighborhood statistics after initial scrape")
@@ -118,44 +118,30 @@ class ScrapingScheduler:
         logger.info("=" * 60)
         logger.info("[Scheduler] 🔍 Starting Yad2 scrape job")
         logger.info("=" * 60)
-        db = self.SessionLocal()
 
         try:
             logger.info("[Scheduler] Initializing Yad2 scraper")
-            scraper = Yad2Scraper(db)
+            scraper = Yad2Scraper(session_factory=self.SessionLocal)
             scraper_with_retry = ScraperWithRetry(
                 scraper,
                 max_retries=settings.scraper_max_retries,
                 retry_delay=settings.retry_delay_seconds,
-                shutdown_event=self.shutdown_event
+                shutdown_event=self.shutdown_event,
+                max_retry_delay=settings.retry_max_delay_seconds
             )
 
             logger.info("[Scheduler] Executing Yad2 scraper with retry logic")
-            # Run synchronous scraper in thread pool
-            loop = asyncio.get_event_loop()
-            listings = await loop.run_in_executor(
-                self.executor,
-                scraper_with_retry.scrape_with_retry
-            )
+            listings = await self._run_scraper(scraper_with_retry)
 
             if listings:
                 logger.info(f"[Scheduler] Yad2 scraper returned listings, count: {len(listings)}")
-                processor = ListingProcessor(db)
-                stats = processor.process_listings(listings, 'yad2')
-
-                logger.info(f"[Scheduler] Yad2 scrape completed successfully, stats: {stats}")
-
-                # Send notifications for new listings
-                if stats['new'] > 0 or stats['price_drops'] > 0:
-                    logger.info(f"[Scheduler] Sending notifications, new: {stats['new']}, price_drops: {stats['price_drops']}")
-                    await self._notify_new_listings(db, stats)
+                await self._process_listings(listings, 'yad2', 'Yad2')
             else:
                 logger.warning("[Scheduler] Yad2 scraper returned no listings")
 
         except Exception as e:
             logger.error(f"[Scheduler] Error in Yad2 scrape job, error: {e}")
         finally:
-            db.close()
             logger.info("[Scheduler] Yad2 scrape job finished")
 
     async def scrape_madlan(self):
@@ -168,44 +154,30 @@ class ScrapingScheduler:
         logger.info("=" * 60)
         logger.info("[Scheduler] 🔍 Starting Madlan scrape job")
         logger.info("=" * 60)
-        db = self.SessionLocal()
 
         try:
             logger.info("[Scheduler] Initializing Madlan scraper")
-            scraper = MadlanScraper(db)
+            scraper = MadlanScraper(session_factory=self.SessionLocal)
             scraper_with_retry = ScraperWithRetry(
                 scraper,
                 max_retries=settings.scraper_max_retries,
                 retry_delay=settings.retry_delay_seconds,
-                shutdown_event=self.shutdown_event
+                shutdown_event=self.shutdown_event,
+                max_retry_delay=settings.retry_max_delay_seconds
             )
 
             logger.info("[Scheduler] Executing Madlan scraper with retry logic")
-            # Run synchronous scraper in thread pool
-            loop = asyncio.get_event_loop()
-            listings = await loop.run_in_executor(
-                self.executor,
-                scraper_with_retry.scrape_with_retry
-            )
+            listings = await self._run_scraper(scraper_with_retry)
 
             if listings:
                 logger.info(f"[Scheduler] Madlan scraper returned listings, count: {len(listings)}")
-                processor = ListingProcessor(db)
-                stats = processor.process_listings(listings, 'madlan')
-
-                logger.info(f"[Scheduler] Madlan scrape completed successfully, stats: {stats}")
-
-                # Send notifications
-                if stats['new'] > 0 or stats['price_drops'] > 0:
-                    logger.info(f"[Scheduler] Sending notifications, new: {stats['new']}, price_drops: {stats['price_drops']}")
-                    await self._notify_new_listings(db, stats)
+                await self._process_listings(listings, 'madlan', 'Madlan')
             else:
                 logger.warning("[Scheduler] Madlan scraper returned no listings")
 
         except Exception as e:
             logger.error(f"[Scheduler] Error in Madlan scrape job, error: {e}")
         finally:
-            db.close()
             logger.info("[Scheduler] Madlan scrape job finished")
 
     async def scrape_facebook(self):
@@ -218,54 +190,99 @@ class ScrapingScheduler:
         logger.info("=" * 60)
         logger.info("[Scheduler] 🔍 Starting Facebook scrape job")
         logger.info("=" * 60)
-        db = self.SessionLocal()
 
         try:
             cookies_file = settings.facebook_cookies_file
             logger.info(f"[Scheduler] Initializing Facebook scraper, cookies_file: {cookies_file}")
-            scraper = FacebookScraper(db, cookies_file=cookies_file)
+            scraper = FacebookScraper(cookies_file=cookies_file, session_factory=self.SessionLocal)
             scraper_with_retry = ScraperWithRetry(
                 scraper,
                 max_retries=settings.scraper_max_retries,
                 retry_delay=settings.retry_delay_seconds,
-                shutdown_event=self.shutdown_event
+                shutdown_event=self.shutdown_event,
+                max_retry_delay=settings.retry_max_delay_seconds
             )
 
             logger.info("[Scheduler] Executing Facebook scraper with retry logic")
-            # Run synchronous scraper in thread pool
-            loop = asyncio.get_event_loop()
-            listings = await loop.run_in_executor(
-                self.executor,
-                scraper_with_retry.scrape_with_retry
-            )
+            listings = await self._run_scraper(scraper_with_retry)
 
             if listings:
                 logger.info(f"[Scheduler] Facebook scraper returned listings, count: {len(listings)}")
-                processor = ListingProcessor(db)
-                stats = processor.process_listings(listings, 'facebook')
-
-                logger.info(f"[Scheduler] Facebook scrape completed successfully, stats: {stats}")
-
-                # Send notifications
-                if stats['new'] > 0 or stats['price_drops'] > 0:
-                    logger.info(f"[Scheduler] Sending notifications, new: {stats['new']}, price_drops: {stats['price_drops']}")
-                    await self._notify_new_listings(db, stats)
+                await self._process_listings(listings, 'facebook', 'Facebook')
             else:
                 logger.warning("[Scheduler] Facebook scraper returned no listings")
 
         except Exception as e:
             logger.error(f"[Scheduler] Error in Facebook scrape job, error: {e}")
         finally:
-            db.close()
             logger.info("[Scheduler] Facebook scrape job finished")
 
+    async def _process_listings(self, listings: list, source: str, label: str):
+        """Store scraped listings and send notifications, in a session opened only for this step"""
+        db = self.SessionLocal()
+
+        try:
+            processor = ListingProcessor(db)
+            stats = await self._run_db(processor.process_listings, listings, source)
+
+            logger.info(f"[Scheduler] {label} scrape completed successfully, stats: {stats}")
+
+            # Send notifications for new listings and price drops
+            if stats['new'] > 0 or stats['price_drops'] > 0:
+                logger.info(f"[Scheduler] Sending notifications, new: {stats['new']}, price_drops: {stats['price_drops']}")
+                await self._notify_new_listings(db, stats)
+        finally:
+            db.close()
+
+    async def _run_scraper(self, scraper_with_retry: ScraperWithRetry) -> list:
+        """Run a synchronous scraper in the thread pool, one at a time, retrying failed attempts"""
+        # All scrapers drive the same Chrome tab, so their browser work must not overlap.
+        # The lock is held per attempt, so one source's retry backoff doesn't block the others
+        if self._browser_lock is None:
+            self._browser_lock = asyncio.Lock()
+
+        source = scraper_with_retry.scraper.source_name
+        loop = asyncio.get_event_loop()
+
+        for attempt in range(scraper_with_retry.max_retries):
+            async with self._browser_lock:
+                if self.shutdown_event.is_set():
+                    logger.info("[Scheduler] Shutdown requested while waiting for the browser, skipping scrape")
+                    return []
+
+                listings = await loop.run_in_executor(
+                    self.executor,
+                    scraper_with_retry.run_attempt,
+                    attempt
+                )
+
+            if listings is not None:
+                return listings
+
+            if attempt < scraper_with_retry.max_retries - 1:
+                delay = scraper_with_retry.backoff_delay(attempt)
+                logger.info(f"[Scheduler] Retrying in {delay:.0f} seconds, source: {source}")
+                try:
+                    await asyncio.wait_for(self.shutdown_event.wait(), timeout=delay)
+                    logger.info(f"[Scheduler] Shutdown requested during retry delay, source: {source}")
+                    return []
+                except asyncio.TimeoutError:
+                    pass
+
+        return scraper_with_retry.give_up()
+
+    async def _run_db(self, func, *args):
+        """Run blocking ORM work in the thread pool so it doesn't stall the event loop"""
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(self.executor, func, *args)
+
     async def update_stats(self):
         """Update neighborhood statistics"""
         logger.info("[Scheduler] 📊 Starting neighborhood statistics update")
         db = self.SessionLocal()
 
         try:
-            update_neighborhood_stats(db)
+            await self._run_db(update_neighborhood_stats, db)
             logger.info("[Scheduler] Neighborhood statistics updated successfully")
         except Exception as e:
             logger.error(f"[Scheduler] Error updating neighborhood stats, error: {e}")
@@ -278,40 +295,51 @@ class ScrapingScheduler:
             return
 
         try:
-            from datetime import datetime, timedelta
-
-            from app.core.database import Listing
-
             notifier = TelegramNotifier(db)
 
-            # Get recent new listings (last 5 minutes)
-            recent_listings = db.query(Listing).filter(
-                Listing.first_seen > datetime.utcnow() - timedelta(minutes=5),
-                Listing.status == 'unseen'
-            ).all()
-
-            for listing in recent_listings:
-                # Try to notify
-                if listing.deal_score >= settings.min_deal_score_notify:
-                    await notifier.notify_high_score(listing)
-                else:
-                    await notifier.notify_new_listing(listing)
-
-                # Small delay between notifications
-                await asyncio.sleep(1)
-
-            # Check for price drops
-            price_drop_listings = db.query(Listing).filter(
-                Listing.last_seen > datetime.utcnow() - timedelta(minutes=5)
-            ).all()
-
-            for listing in price_drop_listings:
-                await notifier.notify_price_drop(listing)
-                await asyncio.sleep(1)
+            # Only the sends run on the event loop; the queries and the recording commit
+            # go through the thread pool, under the lock that keeps batches from overlapping
+            async with TelegramNotifier.batch_lock():
+                prepared = await self._run_db(self._prepare_notifications, db, notifier)
+                sent = await notifier.send_prepared(prepared)
+                count = await self._run_db(notifier.record_notifications, sent)
+            logger.info(f"[Scheduler] Sent {count} notifications")
 
         except Exception as e:
             logger.error(f"Error sending notifications: {e}")
 
+    def _prepare_notifications(self, db, notifier: TelegramNotifier) -> list:
+        """Load the listings to notify about and build their messages (blocking ORM work)"""
+        from sqlalchemy import and_, or_
+
+        from app.core.database import Listing
+
+        # One query for both sets: recent new listings and recently seen listings
+        # (price drop candidates), last 5 minutes
+        cutoff = datetime.utcnow() - timedelta(minutes=5)
+        listings = db.query(Listing).filter(or_(
+            and_(Listing.first_seen > cutoff, Listing.status == 'unseen'),
+            Listing.last_seen > cutoff
+        )).all()
+
+        recent_listings = [
+            listing for listing in listings
+            if listing.status == 'unseen' and listing.first_seen and listing.first_seen > cutoff
+        ]
+        price_drop_listings = [
+            listing for listing in listings
+            if listing.last_seen and listing.last_seen > cutoff
+        ]
+
+        items = [
+            (listing, 'high_score' if listing.deal_score >= settings.min_deal_score_notify else 'new_listing')
+            for listing in recent_listings
+        ]
+        items.extend((listing, 'price_drop') for listing in price_drop_listings)
+
+        # The notification history and price drops of the batch are loaded here too
+        return notifier.prepare_notifications(items)
+
     def stop(self):
         """Stop the scheduler"""
         if not self.is_running:
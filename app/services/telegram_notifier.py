@@ -1,110 +1,254 @@
 from telegram import Bot
 from telegram.error import TelegramError
+from telegram.request import HTTPXRequest
+from sqlalchemy import insert
 from sqlalchemy.orm import Session
 from app.core.database import Listing, Notification
 from app.core.config import settings
 from app.core.deal_score import DealScoreCalculator
+from app.utils.phone_normalizer import to_international_phone
 from datetime import datetime, timedelta
 import logging
-from typing import Optional
+from typing import Dict, List, Optional, Tuple
 import asyncio
+import time
 
 logger = logging.getLogger(__name__)
 
+# listing id -> notification type -> when it was last sent
+NotifiedIndex = Dict[int, Dict[str, Optional[datetime]]]
+
+# Listing flag -> label shown in the message, in display order
+_FEATURE_LABELS = (
+    ('has_parking', "🅿️ חניה"),
+    ('has_elevator', "🛗 מעלית"),
+    ('has_balcony', "🏖 מרפסת"),
+)
+
+# One Bot per token, so its HTTP connection pool (and TLS sessions) outlive a single notifier
+_bots: Dict[str, Bot] = {}
+
+# Message header emoji by notification type
+_NOTIFICATION_EMOJI = {
+    'new_listing': '🆕',
+    'price_drop': '🔥',
+    'high_score': '⭐'
+}
+
+
+def _get_bot(token: str) -> Bot:
+    """Shared Bot for a token; a notifier is created per scrape run, the connections are not"""
+    bot = _bots.get(token)
+    if bot is None:
+        # Enough connections for the overlapping sends of a notify_many batch
+        bot = Bot(token=token, request=HTTPXRequest(connection_pool_size=8))
+        _bots[token] = bot
+    return bot
+
 
 class TelegramNotifier:
     """Send notifications via Telegram"""
+
+    # Monotonic time of the next free send slot, shared by every notifier (they all post to one chat)
+    _next_send_at = 0.0
+    
+    # Created on first use by batch_lock
+    _notify_lock: Optional[asyncio.Lock] = None
     
     def __init__(self, db_session: Session):
         self.db = db_session
         self.deal_calculator = DealScoreCalculator(db_session)
         
+        # Snapshot the notification criteria once; a notifier lives for a single batch
+        self._min_deal_score = settings.min_deal_score_notify
+        self._min_price_drop_percent = settings.min_price_drop_percent_notify
+        self._high_priority_neighborhoods = frozenset(settings.get_high_priority_neighborhoods_list())
+        
         if not settings.is_telegram_enabled():
             logger.warning("Telegram is not configured. Notifications disabled.")
             self.bot = None
             self.chat_id = None
         else:
-            self.bot = Bot(token=settings.telegram_bot_token)
+            self.bot = _get_bot(settings.telegram_bot_token)
             self.chat_id = settings.telegram_chat_id
+        
+        # Checked first by every notify method, before any query or message building
+        self._enabled = bool(self.bot and self.chat_id)
     
-    async def notify_new_listing(self, listing: Listing) -> bool:
+    async def notify_new_listing(self, listing: Listing, notified: Optional[NotifiedIndex] = None) -> bool:
         """Send notification for a new listing"""
-        if not self.bot:
-            return False
-        
-        # Check if should notify
-        if not self._should_notify(listing, 'new_listing'):
-            return False
-        
-        # Check if already notified
-        if self._already_notified(listing, 'new_listing'):
-            return False
-        
-        # Build message
-        message = self._build_listing_message(listing, notification_type='new_listing')
-        
-        # Send notification
-        success = await self._send_message(message)
-        
-        if success:
-            self._record_notification(listing, 'new_listing', message)
-        
-        return success
+        return await self._notify(listing, 'new_listing', notified)
     
-    async def notify_price_drop(self, listing: Listing) -> bool:
+    async def notify_price_drop(self, listing: Listing, notified: Optional[NotifiedIndex] = None) -> bool:
         """Send notification for a price drop"""
-        if not self.bot:
-            return False
-        
-        # Check if should notify
-        price_drop_pct = self.deal_calculator.get_price_drop_percentage(listing)
-        if not price_drop_pct or price_drop_pct < settings.min_price_drop_percent_notify:
-            return False
+        return await self._notify(listing, 'price_drop', notified)
+    
+    async def notify_high_score(self, listing: Listing, notified: Optional[NotifiedIndex] = None) -> bool:
+        """Send notification for high deal score"""
+        return await self._notify(listing, 'high_score', notified)
+    
+    @classmethod
+    def batch_lock(cls) -> asyncio.Lock:
+        """
+        Lock held from loading a batch's notification history until its sends are recorded,
+        so overlapping batches (one per scrape source) can't notify the same listing twice
+        """
+        if cls._notify_lock is None:
+            cls._notify_lock = asyncio.Lock()
+        return cls._notify_lock
+    
+    async def notify_many(self, items: List[Tuple[Listing, str]]) -> int:
+        """
+        Send notifications for several (listing, notification_type) pairs at once.
+        Messages are built up front, sent concurrently (still spaced by the send slot), and
+        the sent ones are recorded with one bulk insert and commit once the sends finish.
+        Returns the number sent.
+        
+        Recording once per batch trades crash safety for a single write: if the process dies
+        mid-batch, the messages already sent are not recorded and go out again on the next run.
+        """
+        if not self._enabled:
+            return 0
+        
+        async with self.batch_lock():
+            prepared = self.prepare_notifications(items)
+            sent = await self.send_prepared(prepared)
+            return self.record_notifications(sent)
+    
+    def prepare_notifications(self, items: List[Tuple[Listing, str]]) -> List[Tuple[Listing, str, str]]:
+        """Build the (listing, notification_type, message) triples of a batch that should be sent"""
+        if not self._enabled:
+            return []
+        
+        # One query each for the notification history and the price drops of the whole batch
+        notified = self._load_notified_index([listing.id for listing, _ in items])
+        price_drops = self.deal_calculator.get_price_drop_percentages(
+            [listing for listing, notification_type in items if notification_type == 'price_drop']
+        )
         
-        # Don't re-notify about same price drop within 24 hours
-        recent_notification = self.db.query(Notification).filter(
-            Notification.listing_id == listing.id,
-            Notification.notification_type == 'price_drop',
-            Notification.sent_at > datetime.utcnow() - timedelta(hours=24)
-        ).first()
+        prepared = []
+        for listing, notification_type in items:
+            message = self._prepare_message(listing, notification_type, notified, price_drops)
+            if message:
+                prepared.append((listing, notification_type, message))
         
-        if recent_notification:
+        return prepared
+    
+    async def send_prepared(self, prepared: List[Tuple[Listing, str, str]]) -> List[Tuple[Listing, str, str]]:
+        """Send prepared messages concurrently and return the ones that were sent"""
+        results = await asyncio.gather(
+            *(self._send_message(message) for _, _, message in prepared),
+            return_exceptions=True
+        )
+        return [item for item, sent in zip(prepared, results) if sent is True]
+    
+    def record_notifications(self, sent: List[Tuple[Listing, str, str]]) -> int:
+        """Record sent notifications with one bulk insert and a single commit; returns how many"""
+        if sent:
+            sent_at = datetime.utcnow()
+            rows = [
+                {
+                    'listing_id': listing.id,
+                    'notification_type': notification_type,
+                    'message': message,
+                    'sent_at': sent_at
+                }
+                for listing, notification_type, message in sent
+            ]
+            # Bulk INSERT: one executemany, no per-row RETURNING or identity-map bookkeeping
+            self.db.execute(insert(Notification), rows)
+            self.db.commit()
+        
+        return len(sent)
+    
+    async def _notify(self, listing: Listing, notification_type: str, notified: Optional[NotifiedIndex] = None) -> bool:
+        """Send and record a single notification"""
+        if not self._enabled:
             return False
         
-        # Build message
-        message = self._build_listing_message(listing, notification_type='price_drop', price_drop_pct=price_drop_pct)
+        message = self._prepare_message(listing, notification_type, notified)
+        if not message:
+            return False
         
         # Send notification
         success = await self._send_message(message)
         
         if success:
-            self._record_notification(listing, 'price_drop', message)
+            self._record_notification(listing, notification_type, message)
         
         return success
     
-    async def notify_high_score(self, listing: Listing) -> bool:
-        """Send notification for high deal score"""
-        if not self.bot:
-            return False
+    def _load_notified_index(self, listing_ids: List[int]) -> NotifiedIndex:
+        """Latest send time per notification type, for each of the given listings"""
+        listing_ids = list({listing_id for listing_id in listing_ids if listing_id is not None})
+        if not listing_ids:
+            return {}
+        
+        rows = self.db.query(
+            Notification.listing_id,
+            Notification.notification_type,
+            Notification.sent_at
+        ).filter(Notification.listing_id.in_(listing_ids)).all()
+        
+        index: NotifiedIndex = {}
+        for listing_id, notification_type, sent_at in rows:
+            sent_by_type = index.setdefault(listing_id, {})
+            previous = sent_by_type.get(notification_type)
+            if previous is None or (sent_at is not None and sent_at > previous):
+                sent_by_type[notification_type] = sent_at
+        
+        return index
+    
+    def _prepare_message(self, listing: Listing, notification_type: str,
+                         notified: Optional[NotifiedIndex] = None,
+                         price_drops: Optional[Dict[int, Optional[float]]] = None) -> Optional[str]:
+        """
+        Build the message for a notification, or None if it shouldn't be sent.
+        A preloaded notified index and price drops replace the per-listing queries.
+        """
+        sent_by_type = notified.get(listing.id, {}) if notified is not None else None
+        
+        if notification_type == 'price_drop':
+            # Check if should notify
+            if price_drops is not None:
+                price_drop_pct = price_drops.get(listing.id)
+            else:
+                price_drop_pct = self.deal_calculator.get_price_drop_percentage(listing)
+            if not price_drop_pct or price_drop_pct < self._min_price_drop_percent:
+                return None
+            
+            # Don't re-notify about same price drop within 24 hours
+            cutoff = datetime.utcnow() - timedelta(hours=24)
+            if sent_by_type is not None:
+                last_sent = sent_by_type.get('price_drop')
+                recent_notification = last_sent is not None and last_sent > cutoff
+            else:
+                recent_notification = self.db.query(Notification).filter(
+                    Notification.listing_id == listing.id,
+                    Notification.notification_type == 'price_drop',
+                    Notification.sent_at > cutoff
+                ).first()
+            
+            if recent_notification:
+                return None
+            
+            return self._build_listing_message(listing, notification_type='price_drop', price_drop_pct=price_drop_pct)
         
-        # Check if should notify
-        if listing.deal_score < settings.min_deal_score_notify:
-            return False
+        if notification_type == 'high_score':
+            # Check if should notify
+            if listing.deal_score < self._min_deal_score:
+                return None
+        elif not self._should_notify(listing, notification_type):
+            return None
         
         # Check if already notified
-        if self._already_notified(listing, 'high_score'):
-            return False
-        
-        # Build message
-        message = self._build_listing_message(listing, notification_type='high_score')
+        if sent_by_type is not None:
+            if notification_type in sent_by_type:
+                return None
+        elif self._already_notified(listing, notification_type):
+            return None
         
-        # Send notification
-        success = await self._send_message(message)
-        
-        if success:
-            self._record_notification(listing, 'high_score', message)
-        
-        return success
+        return self._build_listing_message(listing, notification_type=notification_type)
     
     def _should_notify(self, listing: Listing, notification_type: str) -> bool:
         """Determine if notification should be sent"""
@@ -119,12 +263,11 @@ class TelegramNotifier:
         
         if notification_type == 'new_listing':
             # Notify if high score
-            if listing.deal_score >= settings.min_deal_score_notify:
+            if listing.deal_score >= self._min_deal_score:
                 return True
             
             # Notify if in high priority neighborhood
-            high_priority = settings.get_high_priority_neighborhoods_list()
-            if listing.neighborhood in high_priority:
+            if listing.neighborhood in self._high_priority_neighborhoods:
                 return True
             
             return False
@@ -144,12 +287,7 @@ class TelegramNotifier:
         """Build notification message"""
         
         # Emoji based on notification type
-        emoji_map = {
-            'new_listing': '🆕',
-            'price_drop': '🔥',
-            'high_score': '⭐'
-        }
-        emoji = emoji_map.get(notification_type, '📢')
+        emoji = _NOTIFICATION_EMOJI.get(notification_type, '📢')
         
         # Build message
         lines = []
@@ -192,13 +330,7 @@ class TelegramNotifier:
             lines.append(f"📐 {' | '.join(details)}")
         
         # Features
-        features = []
-        if listing.has_parking:
-            features.append("🅿️ חניה")
-        if listing.has_elevator:
-            features.append("🛗 מעלית")
-        if listing.has_balcony:
-            features.append("🏖 מרפסת")
+        features = [label for attr, label in _FEATURE_LABELS if getattr(listing, attr)]
         
         if features:
             lines.append(" ".join(features))
@@ -215,13 +347,9 @@ class TelegramNotifier:
             lines.append("")
             lines.append(f"🔗 [View Listing]({listing.url})")
         
-        # WhatsApp contact
-        if listing.contact_phone:
-            # Clean phone for WhatsApp
-            clean_phone = listing.contact_phone.replace('-', '').replace(' ', '')
-            if clean_phone.startswith('0'):
-                clean_phone = '972' + clean_phone[1:]
-            
+        # WhatsApp contact (cached per phone, so repeat notifications don't redo it)
+        clean_phone = to_international_phone(listing.contact_phone)
+        if clean_phone:
             whatsapp_msg = f"היי, ראיתי את הדירה שלך ב-{listing.source} - {listing.address}"
             whatsapp_url = f"https://wa.me/{clean_phone}?text={whatsapp_msg}"
             lines.append(f"💬 [Contact via WhatsApp]({whatsapp_url})")
@@ -234,6 +362,7 @@ class TelegramNotifier:
             return False
         
         try:
+            await self._wait_for_send_slot()
             await self.bot.send_message(
                 chat_id=self.chat_id,
                 text=message,
@@ -250,6 +379,15 @@ class TelegramNotifier:
             logger.error(f"Unexpected error sending Telegram message: {e}")
             return False
     
+    async def _wait_for_send_slot(self):
+        """Space sends to the chat's rate limit, waiting only for whatever of the interval is left"""
+        now = time.monotonic()
+        send_at = max(now, TelegramNotifier._next_send_at)
+        # Reserve the slot before awaiting so concurrent notifiers queue up behind it
+        TelegramNotifier._next_send_at = send_at + settings.telegram_send_interval_seconds
+        if send_at > now:
+            await asyncio.sleep(send_at - now)
+    
     def _record_notification(self, listing: Listing, notification_type: str, message: str):
         """Record that notification was sent"""
         notification = Notification(
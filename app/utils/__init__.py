@@ -1,11 +1,12 @@
 """Utility modules for Real Estate Monitor"""
 
-from app.utils.phone_normalizer import normalize_israeli_phone
+from app.utils.phone_normalizer import normalize_israeli_phone, to_international_phone
 from app.utils.duplicate_detector import DuplicateDetector
 from app.utils.listing_filter import ListingFilter
 
 __all__ = [
     'normalize_israeli_phone',
+    'to_international_phone',
     'DuplicateDetector',
     'ListingFilter',
 ]
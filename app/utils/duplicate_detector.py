@@ -1,8 +1,9 @@
 """Duplicate detection utilities for real estate listings"""
 
-from typing import Optional, Tuple
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from sqlalchemy import and_, or_
 from sqlalchemy.orm import Session
-from fuzzywuzzy import fuzz
+from rapidfuzz import fuzz, process
 
 from app.core.database import Listing
 
@@ -90,33 +91,103 @@ class DuplicateDetector:
         if not phone or not address:
             return None, 0
 
-        # Find listing with same phone number
-        listing = self.db.query(Listing).filter(
+        # Find listings with same phone number
+        listings = self.db.query(Listing).filter(
             Listing.contact_phone == phone
-        ).first()
+        ).order_by(Listing.id).all()
+
+        return self._match_address(listings, address)
 
-        if not listing:
+    def _match_address(
+        self,
+        listings: List[Listing],
+        address: str
+    ) -> Tuple[Optional[Listing], int]:
+        """Return the listing whose address is most similar, if it exceeds the threshold"""
+        if not listings:
             return None, 0
 
-        # Calculate address similarity
-        similarity = fuzz.ratio(
-            listing.address.lower(),
-            address.lower()
+        # Calculate address similarity against every listing in the phone block at once
+        _, score, index = process.extractOne(
+            address.lower(),
+            [(listing.address or '').lower() for listing in listings],
+            scorer=fuzz.ratio
         )
+        similarity = int(round(score))
 
         # Return listing only if similarity exceeds threshold
         if similarity > self.similarity_threshold:
-            return listing, similarity
+            return listings[index], similarity
 
         return None, similarity
 
+    def load_candidates(
+        self,
+        property_hashes: Iterable[str],
+        external_ids: Iterable[Tuple[str, str]],
+        phones: Iterable[str]
+    ) -> Dict[str, Dict]:
+        """
+        Load every listing a batch could match, with one IN-query per strategy.
+
+        The result is passed to find_duplicate so a whole batch is checked
+        in memory instead of with up to three queries per listing.
+
+        Args:
+            property_hashes: Property hashes of the batch
+            external_ids: (source, external_id) pairs of the batch
+            phones: Normalized phone numbers of the batch
+
+        Returns:
+            Dict with 'property_hash', 'external_id' and 'phone' lookups
+        """
+        property_hashes = set(property_hashes)
+        external_ids = {key for key in external_ids if key[1]}
+        phones = {phone for phone in phones if phone}
+
+        by_hash = {}
+        if property_hashes:
+            for listing in self.db.query(Listing).filter(
+                Listing.property_hash.in_(property_hashes)
+            ):
+                by_hash[listing.property_hash] = listing
+
+        # Group IDs by source: SQLite scans the table for a row-value
+        # (source, external_id) IN, but seeks the unique index for this form
+        ids_by_source: Dict[str, Set[str]] = {}
+        for source, external_id in external_ids:
+            ids_by_source.setdefault(source, set()).add(external_id)
+
+        by_external_id = {}
+        if ids_by_source:
+            for listing in self.db.query(Listing).filter(or_(*(
+                and_(Listing.source == source, Listing.external_id.in_(ids))
+                for source, ids in ids_by_source.items()
+            ))):
+                by_external_id.setdefault((listing.source, listing.external_id), listing)
+
+        by_phone: Dict[str, List[Listing]] = {}
+        if phones:
+            # Block listings by phone; addresses are matched within each block
+            for listing in self.db.query(Listing).filter(
+                Listing.contact_phone.in_(phones)
+            ).order_by(Listing.id):
+                by_phone.setdefault(listing.contact_phone, []).append(listing)
+
+        return {
+            'property_hash': by_hash,
+            'external_id': by_external_id,
+            'phone': by_phone
+        }
+
     def find_duplicate(
         self,
         property_hash: str,
         source: str,
         external_id: Optional[str],
         phone: Optional[str],
-        address: str
+        address: str,
+        candidates: Optional[Dict[str, Dict]] = None
     ) -> Tuple[Optional[Listing], str]:
         """
         Find duplicate using all available strategies.
@@ -132,25 +203,38 @@ class DuplicateDetector:
             external_id: External listing ID
             phone: Normalized phone number
             address: Property address
+            candidates: Lookups from load_candidates; queries the database if omitted
 
         Returns:
             Tuple of (listing, detection_method) or (None, '')
             detection_method is one of: 'property_hash', 'external_id', 'phone_fuzzy'
         """
         # Strategy 1: Property hash (exact match)
-        listing = self.find_by_property_hash(property_hash)
+        if candidates is not None:
+            listing = candidates['property_hash'].get(property_hash)
+        else:
+            listing = self.find_by_property_hash(property_hash)
         if listing:
             return listing, 'property_hash'
 
         # Strategy 2: Source + external ID
         if external_id:
-            listing = self.find_by_external_id(source, external_id)
+            if candidates is not None:
+                listing = candidates['external_id'].get((source, external_id))
+            else:
+                listing = self.find_by_external_id(source, external_id)
             if listing:
                 return listing, 'external_id'
 
         # Strategy 3: Phone + fuzzy address
         if phone:
-            listing, similarity = self.find_by_phone_fuzzy(phone, address)
+            if candidates is not None:
+                listing, similarity = (
+                    self._match_address(candidates['phone'].get(phone, []), address)
+                    if address else (None, 0)
+                )
+            else:
+                listing, similarity = self.find_by_phone_fuzzy(phone, address)
             if listing:
                 return listing, f'phone_fuzzy (similarity: {similarity}%)'
 
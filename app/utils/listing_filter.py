@@ -1,6 +1,6 @@
 """Listing filtering utilities based on user preferences"""
 
-from typing import Dict, Tuple, Optional, Any
+from typing import Dict, FrozenSet, Tuple, Optional, Any
 from app.core.config import Settings
 
 
@@ -23,6 +23,17 @@ class ListingFilter:
         """
         self.settings = settings
 
+        # Snapshot the criteria once; a filter lives for a single scrape run
+        self._max_price = settings.max_price
+        self._min_rooms = settings.min_rooms
+        self._min_size_sqm = settings.min_size_sqm
+        self._exclude_ground_floor = settings.exclude_ground_floor
+        self._require_elevator_above_floor = settings.require_elevator_above_floor
+        self._require_parking = settings.require_parking
+        self._require_mamad = settings.require_mamad
+        self._cities = settings.get_cities_list()
+        self._allowed_cities: FrozenSet[str] = frozenset(self._cities)
+
     def passes_all_filters(self, listing_data: Dict) -> Tuple[bool, Optional[str]]:
         """
         Check if listing passes all configured filters.
@@ -43,15 +54,15 @@ class ListingFilter:
         """
         # Price filter
         if not self._passes_price_filter(listing_data):
-            return False, f"Price {listing_data.get('price')} exceeds maximum {self.settings.max_price}"
+            return False, f"Price {listing_data.get('price')} exceeds maximum {self._max_price}"
 
         # Rooms filter
         if not self._passes_rooms_filter(listing_data):
-            return False, f"Rooms {listing_data.get('rooms')} below minimum {self.settings.min_rooms}"
+            return False, f"Rooms {listing_data.get('rooms')} below minimum {self._min_rooms}"
 
         # Size filter
         if not self._passes_size_filter(listing_data):
-            return False, f"Size {listing_data.get('size_sqm')}m² below minimum {self.settings.min_size_sqm}m²"
+            return False, f"Size {listing_data.get('size_sqm')}m² below minimum {self._min_size_sqm}m²"
 
         # Deal breakers
         passes, reason = self._passes_deal_breakers(listing_data)
@@ -61,7 +72,7 @@ class ListingFilter:
         # City filter
         if not self._passes_city_filter(listing_data):
             city = listing_data.get('city', 'Unknown')
-            allowed = ', '.join(self.settings.get_cities_list())
+            allowed = ', '.join(self._cities)
             return False, f"City '{city}' not in allowed list: {allowed}"
 
         return True, None
@@ -80,7 +91,7 @@ class ListingFilter:
         if not price:
             return True  # No price specified, allow it
 
-        return price <= self.settings.max_price
+        return price <= self._max_price
 
     def _passes_rooms_filter(self, listing_data: Dict) -> bool:
         """
@@ -96,7 +107,7 @@ class ListingFilter:
         if not rooms:
             return True  # No rooms specified, allow it
 
-        return rooms >= self.settings.min_rooms
+        return rooms >= self._min_rooms
 
     def _passes_size_filter(self, listing_data: Dict) -> bool:
         """
@@ -112,7 +123,7 @@ class ListingFilter:
         if not size:
             return True  # No size specified, allow it
 
-        return size >= self.settings.min_size_sqm
+        return size >= self._min_size_sqm
 
     def _passes_deal_breakers(self, listing_data: Dict) -> Tuple[bool, Optional[str]]:
         """
@@ -127,28 +138,28 @@ class ListingFilter:
             Tuple of (passes, reason)
         """
         # Ground floor exclusion
-        if self.settings.exclude_ground_floor:
+        if self._exclude_ground_floor:
             floor = listing_data.get('floor')
             if floor is not None and floor == 0:
                 return False, "Ground floor excluded by user preference"
 
         # Elevator requirement for high floors
-        if self.settings.require_elevator_above_floor:
+        if self._require_elevator_above_floor:
             floor = listing_data.get('floor')
             has_elevator = listing_data.get('has_elevator', False)
 
-            if floor is not None and floor > self.settings.require_elevator_above_floor:
+            if floor is not None and floor > self._require_elevator_above_floor:
                 if not has_elevator:
-                    return False, f"Floor {floor} requires elevator (threshold: {self.settings.require_elevator_above_floor})"
+                    return False, f"Floor {floor} requires elevator (threshold: {self._require_elevator_above_floor})"
 
         # Parking requirement
-        if self.settings.require_parking:
+        if self._require_parking:
             has_parking = listing_data.get('has_parking', False)
             if not has_parking:
                 return False, "Parking required but not available"
 
         # Mamad (safe room) requirement
-        if self.settings.require_mamad:
+        if self._require_mamad:
             has_mamad = listing_data.get('has_mamad', False)
             if not has_mamad:
                 return False, "Mamad (safe room) required but not available"
@@ -169,11 +180,10 @@ class ListingFilter:
         if not city:
             return True  # No city specified, allow it
 
-        allowed_cities = self.settings.get_cities_list()
-        if not allowed_cities:
+        if not self._allowed_cities:
             return True  # No city filter configured, allow all
 
-        return city in allowed_cities
+        return city in self._allowed_cities
 
     def get_filter_summary(self) -> Dict[str, Any]:
         """
@@ -1,8 +1,15 @@
 """Phone number normalization utilities for Israeli phone numbers"""
 
+import re
+from functools import lru_cache
 from typing import Optional
 
+# Everything but digits, stripped in one C-level pass
+_NON_DIGIT_RE = re.compile(r'\D')
 
+
+# Pure over its input, and the same contact phones recur on every re-scrape
+@lru_cache(maxsize=65536)
 def normalize_israeli_phone(phone: Optional[str]) -> Optional[str]:
     """
     Normalize Israeli phone number to standard format.
@@ -32,7 +39,7 @@ def normalize_israeli_phone(phone: Optional[str]) -> Optional[str]:
         return None
 
     # Remove all non-digit characters
-    digits = ''.join(c for c in phone if c.isdigit())
+    digits = _NON_DIGIT_RE.sub('', phone)
 
     if not digits:
         return None
@@ -51,3 +58,22 @@ def normalize_israeli_phone(phone: Optional[str]) -> Optional[str]:
         return None
 
     return digits
+
+
+@lru_cache(maxsize=65536)
+def to_international_phone(phone: Optional[str]) -> Optional[str]:
+    """
+    Convert an Israeli phone number to international format without the plus sign,
+    as used in wa.me links.
+
+    Examples:
+        >>> to_international_phone("050-123-4567")
+        "972501234567"
+        >>> to_international_phone("invalid")
+        None
+    """
+    digits = normalize_israeli_phone(phone)
+    if not digits:
+        return None
+
+    return '972' + digits[1:]
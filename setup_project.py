@@ -4,17 +4,21 @@ Setup script for Real Estate Monitor
 Run this script to set up the application for first use
 """
 
+import hashlib
 import os
 import sys
 from pathlib import Path
 import subprocess
 
+# Written into the venv after a successful install; matches while requirements.txt
+# and the Python version are unchanged
+SETUP_HASH_FILE = Path("venv") / ".setup-hash"
+
 
 def print_header(text):
     """Print formatted header"""
-    print("\n" + "=" * 60)
-    print(f"  {text}")
-    print("=" * 60 + "\n")
+    rule = "=" * 60
+    print(f"\n{rule}\n  {text}\n{rule}\n")
 
 
 def check_python_version():
@@ -65,10 +69,20 @@ def get_pip_command():
         return str(Path("venv") / "bin" / "pip")
 
 
+def requirements_hash():
+    """Hash of requirements.txt and the Python version the venv is built with"""
+    return hashlib.sha256(Path("requirements.txt").read_bytes() + sys.version.encode()).hexdigest()
+
+
 def install_dependencies():
     """Install Python dependencies"""
     print_header("Installing Dependencies")
 
+    current_hash = requirements_hash()
+    if SETUP_HASH_FILE.exists() and SETUP_HASH_FILE.read_text().strip() == current_hash:
+        print("✅ Dependencies already up to date (requirements.txt unchanged)")
+        return True
+
     pip_cmd = get_pip_command()
 
     try:
@@ -76,10 +90,12 @@ def install_dependencies():
         print("Upgrading pip...")
         subprocess.run([pip_cmd, "install", "--upgrade", "pip"], check=True)
 
-        # Install requirements
+        # Install requirements in one resolver run; prefer wheels so lxml, pandas,
+        # pillow and matplotlib are never compiled from source
         print("Installing requirements...")
-        subprocess.run([pip_cmd, "install", "-r", "requirements.txt"], check=True)
+        subprocess.run([pip_cmd, "install", "--prefer-binary", "-r", "requirements.txt"], check=True)
 
+        SETUP_HASH_FILE.write_text(current_hash)
         print("✅ Dependencies installed")
         return True
     except subprocess.CalledProcessError as e:
@@ -200,8 +216,7 @@ def print_next_steps():
         "5. Open dashboard: http://127.0.0.1:8000"
     ]
 
-    for step in steps:
-        print(f"   {step}")
+    print("\n".join(f"   {step}" for step in steps))
 
     print("\n📖 For detailed instructions, see README.md\n")
 
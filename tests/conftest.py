@@ -3,8 +3,9 @@ Pytest configuration and shared fixtures for Real Estate Monitor tests.
 """
 import pytest
 from unittest.mock import Mock, MagicMock, patch
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, Session
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import StaticPool
 from datetime import datetime
 from typing import Dict, List
 
@@ -73,19 +74,46 @@ def test_settings():
     )
 
 
-@pytest.fixture(scope="function")
-def db_session(test_settings):
-    """Create a fresh in-memory database session for each test"""
-    engine = create_engine("sqlite:///:memory:", echo=False)
+@pytest.fixture(scope="session")
+def db_engine():
+    """In-memory database with the schema created once for the whole test session"""
+    # One shared connection, so every test (and thread) sees the same in-memory database
+    engine = create_engine(
+        "sqlite://",
+        echo=False,
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool
+    )
+
+    # pysqlite manages BEGIN itself and breaks SAVEPOINTs; let SQLAlchemy emit BEGIN instead
+    @event.listens_for(engine, "connect")
+    def _disable_pysqlite_transactions(dbapi_connection, connection_record):
+        dbapi_connection.isolation_level = None
+
+    @event.listens_for(engine, "begin")
+    def _emit_begin(conn):
+        conn.exec_driver_sql("BEGIN")
+
     Base.metadata.create_all(engine)
 
-    SessionLocal = sessionmaker(bind=engine)
-    session = SessionLocal()
+    yield engine
+
+    engine.dispose()
+
+
+@pytest.fixture(scope="function")
+def db_session(test_settings, db_engine):
+    """Database session for one test; everything it writes is rolled back afterwards"""
+    connection = db_engine.connect()
+    transaction = connection.begin()
+    # commit()/rollback() inside the test only end SAVEPOINTs within the outer transaction
+    session = Session(bind=connection, join_transaction_mode="create_savepoint")
 
     yield session
 
     session.close()
-    engine.dispose()
+    transaction.rollback()
+    connection.close()
 
 
 @pytest.fixture
@@ -7,6 +7,13 @@ from unittest.mock import MagicMock, patch
 from app.scrapers.yad2_scraper import Yad2Scraper
 
 
+@pytest.fixture(autouse=True)
+def no_debug_output():
+    """Keep scrapes that find no cards from writing debug files into the working tree"""
+    with patch.object(Yad2Scraper, 'debug_save_page'):
+        yield
+
+
 class TestYad2ScraperMocked:
     """Test Yad2 scraper with mocked browser"""
 
@@ -77,6 +84,36 @@ class TestYad2ScraperMocked:
             assert listings[0]['source'] == 'yad2'
             assert listings[0]['price'] > 0
 
+    def test_scrape_uses_js_batch_extraction(self, db_session, mock_chromium_page):
+        """Test that card fields returned by a single JS evaluation are parsed"""
+        mock_chromium_page.run_js = MagicMock(return_value=[{
+            'href': '/realestate/forsale/item/12345',
+            'title': 'דירת 3.5 חדרים',
+            'price': '2,500,000 ₪',
+            'location': 'רחוב הרצל, פלורנטין, תל אביב',
+            'details': 'דירת 3.5 חדרים, 85 מ"ר, קומה 3, מעלית',
+            'images': ['https://img.yad2.co.il/1.jpg', '/relative.jpg', 'data:image/gif;base64,http']
+        }])
+        mock_chromium_page.eles = MagicMock(return_value=[])
+
+        # Skip the human-like delays and scroll waits, which would add ~20s
+        with patch('app.scrapers.base_scraper.ChromiumPage', return_value=mock_chromium_page), \
+                patch('app.scrapers.base_scraper.time.sleep'):
+            scraper = Yad2Scraper(db_session)
+            scraper.initialize()
+
+            listings = scraper.scrape()
+
+            assert len(listings) == 1
+            assert listings[0]['external_id'] == '12345'
+            assert listings[0]['url'] == 'https://www.yad2.co.il/realestate/forsale/item/12345'
+            assert listings[0]['price'] == 2500000
+            assert listings[0]['rooms'] == 3.5
+            assert listings[0]['city'] == 'תל אביב'
+            assert listings[0]['has_elevator'] is True
+            assert listings[0]['images'] == ['https://img.yad2.co.il/1.jpg']
+            mock_chromium_page.eles.assert_not_called()
+
     def test_scrape_no_listings_found(self, db_session, mock_chromium_page):
         """Test scrape when no listings are found"""
         # Configure mock page to return empty list
@@ -159,6 +196,24 @@ class TestYad2ScraperMocked:
         assert parsed['has_balcony'] is True
         assert parsed['has_mamad'] is True
 
+    def test_parse_listing_detects_english_features_any_case(self, db_session):
+        """Test that English feature keywords are matched case-insensitively"""
+        scraper = Yad2Scraper(db_session)
+
+        raw_data = {
+            'external_id': '12345',
+            'url': 'https://example.com',
+            'title': 'Test',
+            'details_text': 'Elevator, PARKING and a Balcony'
+        }
+
+        parsed = scraper.parse_listing(raw_data)
+
+        assert parsed['has_elevator'] is True
+        assert parsed['has_parking'] is True
+        assert parsed['has_balcony'] is True
+        assert parsed['has_mamad'] is False
+
     def test_parse_listing_no_features(self, db_session):
         """Test that parse_listing handles no features"""
         scraper = Yad2Scraper(db_session)
@@ -9,7 +9,8 @@ from app.scrapers.base_scraper import (
     BaseScraper,
     ScraperWithRetry,
     CaptchaState,
-    captcha_state
+    captcha_state,
+    _debug_writer
 )
 from app.core.database import ScrapingState
 
@@ -135,6 +136,28 @@ class TestBaseScraper:
 
                 assert scraper.page is not None
 
+    @patch('app.scrapers.base_scraper.ChromiumPage')
+    def test_initialize_blocks_heavy_resources(self, mock_chromium_page, mock_db_session):
+        """Test that opted-in scrapers block heavy resources on initialize and unblock on cleanup"""
+        mock_page = Mock()
+        mock_chromium_page.return_value = mock_page
+
+        scraper = ConcreteScraper(mock_db_session, "test_source")
+        scraper.block_heavy_resources = True
+
+        with patch.object(scraper, '_inject_anti_detection_scripts'):
+            with patch.object(scraper, '_load_cookies'):
+                scraper.initialize()
+
+        blocked = mock_page.set.blocked_urls.call_args[0][0]
+        assert '*.css*' in blocked
+        assert '*google-analytics.com*' in blocked
+
+        with patch.object(scraper, '_save_cookies'):
+            scraper.cleanup()
+
+        mock_page.set.blocked_urls.assert_called_with(None)
+
     @patch('app.scrapers.base_scraper.ChromiumPage')
     def test_initialize_connection_error(self, mock_chromium_page, mock_db_session):
         """Test initialization with connection error"""
@@ -152,8 +175,8 @@ class TestBaseScraper:
 
         scraper._inject_anti_detection_scripts()
 
-        # Should call run_js multiple times
-        assert mock_page.run_js.call_count > 0
+        # All overrides go in a single JS evaluation
+        mock_page.run_js.assert_called_once()
 
     def test_inject_anti_detection_scripts_no_page(self, mock_db_session):
         """Test injecting scripts with no page"""
@@ -205,6 +228,22 @@ class TestBaseScraper:
             scraper.random_delay(0.1, 0.2)
             mock_sleep.assert_called_once()
 
+    def test_debug_save_page_writes_in_background(self, mock_db_session, mock_page, tmp_path, monkeypatch):
+        """Test that the page is captured immediately and written by the debug writer"""
+        monkeypatch.chdir(tmp_path)
+        mock_page.get_screenshot = Mock(return_value=b'png-bytes')
+
+        scraper = ConcreteScraper(mock_db_session, "test_source")
+        scraper.page = mock_page
+        scraper.debug_save_page("no_listings")
+
+        # Wait for the single background writer to drain
+        _debug_writer.submit(lambda: None).result()
+
+        written = sorted(p.suffix for p in (tmp_path / "debug_output").iterdir())
+        assert written == ['.html', '.png']
+        mock_page.get_screenshot.assert_called_once_with(as_bytes='png', full_page=True)
+
     def test_scroll_page(self, mock_db_session, mock_page):
         """Test scrolling page"""
         scraper = ConcreteScraper(mock_db_session, "test_source")
@@ -217,6 +256,22 @@ class TestBaseScraper:
 
                     assert mock_page.scroll.down.call_count == 2
 
+    def test_scroll_page_stops_waiting_once_content_loads(self, mock_db_session, mock_page):
+        """Test that the post-scroll wait ends early when the page grows"""
+        scraper = ConcreteScraper(mock_db_session, "test_source")
+        scraper.page = mock_page
+        mock_page.run_js = Mock(side_effect=[1000, 1000, 1500])
+
+        with patch('app.scrapers.base_scraper.settings') as mock_settings:
+            mock_settings.min_wait_after_scroll = 2.0
+            mock_settings.max_wait_after_scroll = 5.0
+            with patch('time.sleep') as mock_sleep:
+                with patch('random.uniform', return_value=5.0):
+                    with patch('random.random', return_value=0.5):
+                        scraper.scroll_page(scrolls=1)
+
+        assert [c.args[0] for c in mock_sleep.call_args_list] == [2.0, 0.25]
+
     def test_safe_click_success(self, mock_db_session, mock_page):
         """Test safe click success"""
         scraper = ConcreteScraper(mock_db_session, "test_source")
@@ -308,6 +363,59 @@ class TestBaseScraper:
         assert mock_state.error_count == 1
         assert mock_state.error_message == "Test error"
 
+    def test_update_scraping_state_with_session_factory(self, mock_db_session):
+        """Test that a session factory gives each update its own short-lived session"""
+        session_factory = Mock(return_value=mock_db_session)
+        scraper = ConcreteScraper(None, "test_source", session_factory=session_factory)
+
+        mock_state = Mock(spec=ScrapingState)
+        mock_query = Mock()
+        mock_db_session.query.return_value = mock_query
+        mock_query.filter.return_value = mock_query
+        mock_query.first.return_value = mock_state
+
+        scraper.update_scraping_state(success=True)
+
+        session_factory.assert_called_once()
+        assert mock_state.status == 'active'
+        mock_db_session.commit.assert_called_once()
+        mock_db_session.close.assert_called_once()
+
+    def test_update_scraping_state_upserts(self, db_session):
+        """Test that scraping state is written with a single upsert on SQLite"""
+        scraper = ConcreteScraper(db_session, "test_source")
+
+        scraper.update_scraping_state(success=False, error_msg="First error")
+        scraper.update_scraping_state(success=False, error_msg="Second error")
+
+        state = db_session.query(ScrapingState).filter_by(source="test_source").one()
+        assert state.status == 'error'
+        assert state.error_count == 2
+        assert state.error_message == "Second error"
+
+        with patch.object(db_session, 'query', wraps=db_session.query) as mock_query:
+            scraper.update_scraping_state(success=True)
+            mock_query.assert_not_called()
+
+        db_session.refresh(state)
+        assert state.status == 'active'
+        assert state.error_count == 0
+        assert state.error_message is None
+        assert state.last_scrape_time is not None
+
+    def test_save_cookies_upserts(self, db_session, mock_page):
+        """Test that cookies are stored without a lookup query on SQLite"""
+        scraper = ConcreteScraper(db_session, "test_source")
+        scraper.page = mock_page
+        mock_page.cookies.return_value = [{"name": "test", "value": "value"}]
+
+        scraper.update_scraping_state(success=False, error_msg="Error")
+        scraper._save_cookies()
+
+        state = db_session.query(ScrapingState).filter_by(source="test_source").one()
+        assert state.cookies_json == '[{"name": "test", "value": "value"}]'
+        assert state.error_message == "Error"
+
     def test_check_for_captcha_detected(self, mock_db_session, mock_page):
         """Test CAPTCHA detection"""
         scraper = ConcreteScraper(mock_db_session, "test_source")
@@ -344,6 +452,38 @@ class TestBaseScraper:
 
         assert result is True
 
+    @patch('app.scrapers.base_scraper.ChromiumPage')
+    def test_initialize_loads_cookies_once_per_process(self, mock_chromium_page, mock_db_session):
+        """Test that saved cookies are pushed into the shared browser only on the first run"""
+        mock_chromium_page.return_value = Mock()
+
+        with patch('app.scrapers.base_scraper._cookies_loaded_sources', set()):
+            for run in range(2):
+                scraper = ConcreteScraper(mock_db_session, "test_source")
+                with patch.object(scraper, '_inject_anti_detection_scripts'):
+                    with patch.object(scraper, '_load_cookies') as mock_load:
+                        scraper.initialize()
+
+                if run == 0:
+                    mock_load.assert_called_once()
+                else:
+                    mock_load.assert_not_called()
+
+    def test_cleanup_saves_cookies_every_nth_run(self, mock_db_session):
+        """Test that cookies are snapshotted on the first run and then every Nth run"""
+        saves = 0
+
+        with patch('app.scrapers.base_scraper._runs_since_cookie_save', {}):
+            with patch('app.scrapers.base_scraper.settings') as mock_settings:
+                mock_settings.cookie_save_every_runs = 3
+                for _ in range(7):
+                    scraper = ConcreteScraper(mock_db_session, "test_source")
+                    with patch.object(scraper, '_save_cookies') as mock_save:
+                        scraper.cleanup()
+                    saves += mock_save.call_count
+
+        assert saves == 3
+
     def test_cleanup(self, mock_db_session):
         """Test cleanup"""
         scraper = ConcreteScraper(mock_db_session, "test_source")
@@ -415,6 +555,31 @@ class TestScraperWithRetry:
 
                             assert result == []
 
+    def test_backoff_delay_grows_and_is_capped(self, mock_db_session):
+        """Test that retry delays double per attempt and stop at the cap"""
+        scraper = ConcreteScraper(mock_db_session, "test_source")
+        retry_scraper = ScraperWithRetry(scraper, retry_delay=60, max_retry_delay=600)
+
+        with patch('random.uniform', return_value=2):
+            delays = [retry_scraper.backoff_delay(attempt) for attempt in range(5)]
+
+        assert delays == [62, 122, 242, 482, 600]
+
+    def test_scrape_with_retry_browser_unreachable(self, mock_db_session):
+        """Test that a missing Chrome instance is not retried"""
+        scraper = ConcreteScraper(mock_db_session, "test_source")
+        retry_scraper = ScraperWithRetry(scraper, max_retries=3, retry_delay=1)
+
+        with patch.object(scraper, 'initialize', side_effect=ConnectionError("FATAL: Chrome not found on port 9222")) as mock_init:
+            with patch.object(scraper, 'update_scraping_state') as mock_state:
+                with patch('time.sleep') as mock_sleep:
+                    result = retry_scraper.scrape_with_retry()
+
+        assert result == []
+        mock_init.assert_called_once()
+        mock_sleep.assert_not_called()
+        mock_state.assert_called_once()
+
     def test_scrape_with_retry_shutdown(self, mock_db_session):
         """Test scrape with shutdown signal"""
         import asyncio
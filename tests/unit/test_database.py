@@ -3,7 +3,7 @@ Unit tests for database models.
 Tests Listing model methods and property hash generation.
 """
 import pytest
-from app.core.database import Listing
+from app.core.database import Listing, init_db
 from datetime import datetime
 
 
@@ -55,7 +55,7 @@ class TestListingModel:
         )
 
         db_session.add(listing)
-        db_session.commit()
+        db_session.flush()
 
         assert listing.id is not None
 
@@ -73,7 +73,7 @@ class TestListingModel:
         listing.set_images(images)
 
         db_session.add(listing)
-        db_session.commit()
+        db_session.flush()
 
         retrieved_images = listing.get_images()
         assert len(retrieved_images) == 2
@@ -90,7 +90,7 @@ class TestListingModel:
         )
 
         db_session.add(listing)
-        db_session.commit()
+        db_session.flush()
 
         images = listing.get_images()
         assert images == []
@@ -110,23 +110,21 @@ class TestListingModel:
 
         assert listing.price_per_sqm == 25000.0
 
-    def test_listing_status_values(self, db_session):
+    @pytest.mark.parametrize("status", ['unseen', 'interested', 'not_interested', 'contacted'])
+    def test_listing_status_values(self, db_session, status):
         """Test different status values"""
-        statuses = ['unseen', 'interested', 'not_interested', 'contacted']
-
-        for status in statuses:
-            listing = Listing(
-                property_hash=f'test_hash_{status}',
-                source='test',
-                rooms=3.5,
-                address='Test',
-                status=status
-            )
+        listing = Listing(
+            property_hash=f'test_hash_{status}',
+            source='test',
+            rooms=3.5,
+            address='Test',
+            status=status
+        )
 
-            db_session.add(listing)
-            db_session.commit()
+        db_session.add(listing)
+        db_session.flush()
 
-            assert listing.status == status
+        assert listing.status == status
 
     def test_listing_timestamps(self, db_session):
         """Test listing timestamp fields"""
@@ -144,7 +142,7 @@ class TestListingModel:
         )
 
         db_session.add(listing)
-        db_session.commit()
+        db_session.flush()
 
         assert listing.first_seen is not None
         assert listing.last_seen is not None
@@ -165,9 +163,30 @@ class TestListingModel:
         )
 
         db_session.add(listing)
-        db_session.commit()
+        db_session.flush()
 
         assert listing.has_elevator is True
         assert listing.has_parking is True
         assert listing.has_balcony is True
         assert listing.has_mamad is True
+
+
+class TestInitDb:
+    """Test engine creation"""
+
+    def test_init_db_sizes_file_database_pool(self, tmp_path):
+        """Test that file databases get the configured pool sizing"""
+        engine, _ = init_db(f"sqlite:///{tmp_path / 'test.db'}", pool_size=10, max_overflow=20, pool_timeout=30)
+
+        assert engine.pool.size() == 10
+        assert engine.pool._max_overflow == 20
+        assert engine.pool._timeout == 30
+        assert engine.pool._pre_ping is True
+        engine.dispose()
+
+    def test_init_db_in_memory(self):
+        """Test that in-memory SQLite ignores pool sizing"""
+        engine, SessionLocal = init_db("sqlite:///:memory:", pool_size=10, max_overflow=20)
+
+        with SessionLocal() as db:
+            assert db.query(Listing).count() == 0
@@ -8,111 +8,101 @@ from app.core.database import Listing
 from datetime import datetime
 
 
+@pytest.fixture
+def detector(db_session):
+    """Duplicate detector with the default similarity threshold"""
+    return DuplicateDetector(db_session)
+
+
 class TestDuplicateDetector:
     """Test duplicate detection logic"""
 
-    def test_find_by_property_hash(self, db_session, sample_listing):
+    def test_find_by_property_hash(self, detector, sample_listing):
         """Test finding duplicate by property hash"""
-        detector = DuplicateDetector(db_session)
-
         found = detector.find_by_property_hash(sample_listing.property_hash)
 
         assert found is not None
         assert found.id == sample_listing.id
 
-    def test_find_by_property_hash_not_found(self, db_session):
+    def test_find_by_property_hash_not_found(self, detector):
         """Test property hash search when no match exists"""
-        detector = DuplicateDetector(db_session)
-
         found = detector.find_by_property_hash('nonexistent_hash')
 
         assert found is None
 
-    def test_find_by_external_id(self, db_session, sample_listing):
+    def test_find_by_external_id(self, detector, sample_listing):
         """Test finding duplicate by source and external ID"""
-        detector = DuplicateDetector(db_session)
-
         found = detector.find_by_external_id('yad2', '12345')
 
         assert found is not None
         assert found.id == sample_listing.id
 
-    def test_find_by_external_id_wrong_source(self, db_session, sample_listing):
+    def test_find_by_external_id_wrong_source(self, detector, sample_listing):
         """Test external ID search with wrong source"""
-        detector = DuplicateDetector(db_session)
-
         found = detector.find_by_external_id('madlan', '12345')
 
         assert found is None
 
-    def test_find_by_external_id_none(self, db_session):
+    def test_find_by_external_id_none(self, detector):
         """Test external ID search with None"""
-        detector = DuplicateDetector(db_session)
-
         found = detector.find_by_external_id('yad2', None)
 
         assert found is None
 
-    def test_find_by_phone_fuzzy_exact_match(self, db_session, sample_listing):
-        """Test fuzzy phone matching with exact address"""
-        detector = DuplicateDetector(db_session)
-
-        found, similarity = detector.find_by_phone_fuzzy(
-            '0501234567',
-            'רחוב הרצל, פלורנטין, תל אביב'
+    @pytest.mark.parametrize("address,should_match", [
+        ('רחוב הרצל, פלורנטין, תל אביב', True),  # Exact address
+        ('הרצל, פלורנטין, תל-אביב', True),  # Slightly different formatting
+        ('רחוב אחר, שכונה אחרת, עיר אחרת', False),  # Very different address
+    ])
+    def test_find_by_phone_fuzzy(self, detector, sample_listing, address, should_match):
+        """Test fuzzy phone matching against the default 85 similarity threshold"""
+        found, similarity = detector.find_by_phone_fuzzy('0501234567', address)
+
+        if should_match:
+            assert found is not None
+            assert found.id == sample_listing.id
+            assert similarity >= 85
+        else:
+            assert found is None
+            assert similarity < 85
+
+    def test_find_by_phone_fuzzy_best_match_among_same_phone(self, db_session, detector, sample_listing):
+        """Test that the closest address wins when one phone has several listings"""
+        other = Listing(
+            property_hash='other_hash',
+            source='madlan',
+            external_id='55555',
+            address='רחוב אחר, שכונה אחרת, עיר אחרת',
+            contact_phone='0501234567'
         )
-
-        assert found is not None
-        assert found.id == sample_listing.id
-        assert similarity >= 85
-
-    def test_find_by_phone_fuzzy_similar_address(self, db_session, sample_listing):
-        """Test fuzzy phone matching with similar address"""
-        detector = DuplicateDetector(db_session)
-
-        found, similarity = detector.find_by_phone_fuzzy(
-            '0501234567',
-            'הרצל, פלורנטין, תל-אביב'  # Slightly different formatting
-        )
-
-        assert found is not None
-        assert similarity >= 80
-
-    def test_find_by_phone_fuzzy_different_address(self, db_session, sample_listing):
-        """Test fuzzy phone matching with very different address"""
-        detector = DuplicateDetector(db_session, similarity_threshold=85)
+        db_session.add(other)
+        db_session.commit()
 
         found, similarity = detector.find_by_phone_fuzzy(
             '0501234567',
             'רחוב אחר, שכונה אחרת, עיר אחרת'
         )
 
-        # Should not match due to low similarity
-        assert found is None
-        assert similarity < 85
+        assert found is not None
+        assert found.id == other.id
+        assert similarity == 100
 
-    def test_find_by_phone_fuzzy_no_phone(self, db_session):
+    def test_find_by_phone_fuzzy_no_phone(self, detector):
         """Test fuzzy phone matching with no phone"""
-        detector = DuplicateDetector(db_session)
-
         found, similarity = detector.find_by_phone_fuzzy(None, 'Some address')
 
         assert found is None
         assert similarity == 0
 
-    def test_find_by_phone_fuzzy_no_address(self, db_session):
+    def test_find_by_phone_fuzzy_no_address(self, detector):
         """Test fuzzy phone matching with no address"""
-        detector = DuplicateDetector(db_session)
-
         found, similarity = detector.find_by_phone_fuzzy('0501234567', None)
 
         assert found is None
         assert similarity == 0
 
-    def test_find_duplicate_by_property_hash(self, db_session, sample_listing):
+    def test_find_duplicate_by_property_hash(self, detector, sample_listing):
         """Test find_duplicate using property hash strategy"""
-        detector = DuplicateDetector(db_session)
-
         found, method = detector.find_duplicate(
             property_hash=sample_listing.property_hash,
             source='yad2',
@@ -125,10 +115,8 @@ class TestDuplicateDetector:
         assert found.id == sample_listing.id
         assert method == 'property_hash'
 
-    def test_find_duplicate_by_external_id(self, db_session, sample_listing):
+    def test_find_duplicate_by_external_id(self, detector, sample_listing):
         """Test find_duplicate using external ID strategy"""
-        detector = DuplicateDetector(db_session)
-
         found, method = detector.find_duplicate(
             property_hash='different_hash',
             source='yad2',
@@ -141,10 +129,8 @@ class TestDuplicateDetector:
         assert found.id == sample_listing.id
         assert method == 'external_id'
 
-    def test_find_duplicate_by_phone_fuzzy(self, db_session, sample_listing):
+    def test_find_duplicate_by_phone_fuzzy(self, detector, sample_listing):
         """Test find_duplicate using phone fuzzy strategy"""
-        detector = DuplicateDetector(db_session)
-
         found, method = detector.find_duplicate(
             property_hash='different_hash',
             source='madlan',  # Different source
@@ -158,10 +144,8 @@ class TestDuplicateDetector:
         assert 'phone_fuzzy' in method
         assert 'similarity' in method
 
-    def test_find_duplicate_no_match(self, db_session):
+    def test_find_duplicate_no_match(self, detector):
         """Test find_duplicate when no duplicate exists"""
-        detector = DuplicateDetector(db_session)
-
         found, method = detector.find_duplicate(
             property_hash='nonexistent',
             source='yad2',
@@ -186,3 +170,28 @@ class TestDuplicateDetector:
         # May or may not match depending on similarity score
         assert isinstance(similarity, int)
         assert 0 <= similarity <= 100
+
+    def test_find_duplicate_with_loaded_candidates(self, detector, sample_listing):
+        """Test find_duplicate against candidates preloaded for a batch"""
+        candidates = detector.load_candidates(
+            property_hashes=['different_hash'],
+            external_ids=[('yad2', '12345'), ('madlan', '99999')],
+            phones=['0501234567']
+        )
+
+        assert candidates['property_hash'] == {}
+        assert candidates['external_id'] == {('yad2', '12345'): sample_listing}
+        assert candidates['phone'] == {'0501234567': [sample_listing]}
+
+        found, method = detector.find_duplicate(
+            property_hash='different_hash',
+            source='madlan',
+            external_id='99999',
+            phone='0501234567',
+            address='רחוב הרצל, פלורנטין, תל אביב',
+            candidates=candidates
+        )
+
+        assert found is not None
+        assert found.id == sample_listing.id
+        assert 'phone_fuzzy' in method
@@ -4,6 +4,7 @@ Unit tests for Facebook scraper
 import pytest
 from unittest.mock import Mock, patch, MagicMock
 import os
+import json
 
 from app.scrapers.facebook_scraper import FacebookScraper
 
@@ -40,6 +41,16 @@ class TestFacebookScraper:
         assert scraper.base_url == "https://www.facebook.com"
         assert scraper.cookies_file == "test.json"
 
+    def test_resource_blocking_keeps_stylesheets(self, scraper, mock_page):
+        """Test that Facebook blocks media but not the CSS its feed needs"""
+        scraper.page = mock_page
+
+        scraper._set_resource_blocking(True)
+
+        blocked = mock_page.set.blocked_urls.call_args[0][0]
+        assert '*.jpg*' in blocked
+        assert '*.css*' not in blocked
+
     def test_load_cookies_file_exists(self, scraper, mock_page):
         """Test loading cookies from file"""
         scraper.page = mock_page
@@ -318,6 +329,70 @@ class TestFacebookScraper:
 
                         assert len(result) > 0
 
+    @patch('app.scrapers.facebook_scraper.BaseScraper.initialize')
+    def test_scrape_uses_js_batch_extraction(self, mock_init, scraper, mock_page):
+        """Test that card fields returned by a single JS evaluation are parsed"""
+        scraper.page = mock_page
+        mock_page.run_js.return_value = [{
+            'href': 'https://www.facebook.com/marketplace/item/123456/?ref=search',
+            'title': 'Test Apartment',
+            'text': '3 חדרים, 80 מ״ר, ₪5,000, תל אביב, מעלית',
+            'images': ['https://scontent.fb.com/1.jpg', 'data:image/gif;base64,R0l', '/static/http-placeholder.png']
+        }]
+
+        with patch.object(scraper, '_handle_anti_bot_protection'):
+            with patch.object(scraper, 'human_like_mouse_movement'):
+                with patch.object(scraper, 'scroll_page'):
+                    with patch.object(scraper, 'random_delay'):
+                        result = scraper.scrape()
+
+        assert len(result) == 1
+        assert result[0]['external_id'] == '123456'
+        assert result[0]['url'] == 'https://www.facebook.com/marketplace/item/123456'
+        assert result[0]['title'] == 'Test Apartment'
+        assert result[0]['price'] == 5000.0
+        assert result[0]['city'] == 'תל אביב'
+        assert result[0]['has_elevator'] is True
+        assert result[0]['images'] == ['https://scontent.fb.com/1.jpg']
+        mock_page.eles.assert_not_called()
+
+    @patch('app.scrapers.facebook_scraper.BaseScraper.initialize')
+    def test_scrape_uses_embedded_search_payload(self, mock_init, scraper, mock_page):
+        """Test that listings are read from the embedded search JSON without scrolling"""
+        scraper.page = mock_page
+        payload = {'require': [['ScheduledServerJS', {'__bbox': {'result': {'data': {'marketplace_search': {
+            'feed_units': {'edges': [
+                {'node': {'listing': {
+                    'id': '123456',
+                    'marketplace_listing_title': 'דירת 3 חדרים',
+                    'listing_price': {'amount': '5000.00', 'formatted_amount': '₪5,000'},
+                    'custom_sub_titles_with_rendering_flags': [{'subtitle': '3 חדרים · 80 מ״ר · פלורנטין'}],
+                    'location': {'reverse_geocode': {'city': 'תל אביב'}},
+                    'primary_listing_photo': {'image': {'uri': 'https://scontent.fb.com/1.jpg'}}
+                }}},
+                {'node': {'story_type': 'AD'}}
+            ]}
+        }}}}}]]}
+        mock_page.run_js.return_value = [json.dumps(payload)]
+
+        with patch.object(scraper, '_handle_anti_bot_protection'):
+            with patch.object(scraper, 'human_like_mouse_movement'):
+                with patch.object(scraper, 'scroll_page') as mock_scroll:
+                    with patch.object(scraper, 'random_delay'):
+                        result = scraper.scrape()
+
+        assert len(result) == 1
+        assert result[0]['external_id'] == '123456'
+        assert result[0]['url'] == 'https://www.facebook.com/marketplace/item/123456'
+        assert result[0]['price'] == 5000.0
+        assert result[0]['rooms'] == 3.0
+        assert result[0]['size_sqm'] == 80.0
+        assert result[0]['city'] == 'תל אביב'
+        assert result[0]['neighborhood'] == 'פלורנטין'
+        assert result[0]['images'] == ['https://scontent.fb.com/1.jpg']
+        mock_scroll.assert_not_called()
+        mock_page.eles.assert_not_called()
+
     @patch('app.scrapers.facebook_scraper.BaseScraper.initialize')
     def test_scrape_no_listings(self, mock_init, scraper, mock_page):
         """Test scraping with no listings found"""
@@ -157,6 +157,18 @@ class TestListingFilter:
 
         assert passes is True
 
+    def test_filter_snapshots_settings(self):
+        """Test that criteria are read once, when the filter is created"""
+        settings = Settings(cities="Tel Aviv, Haifa", max_price=3000000)
+        filter_obj = ListingFilter(settings)
+        listing_data = {'city': 'Haifa', 'price': 2500000}
+
+        settings.cities = "Tel Aviv"
+        settings.max_price = 2000000
+
+        assert filter_obj.passes_all_filters(listing_data) == (True, None)
+        assert ListingFilter(settings).passes_all_filters(listing_data)[0] is False
+
     def test_ground_floor_exclusion(self):
         """Test ground floor exclusion deal breaker"""
         settings = Settings(
@@ -3,8 +3,11 @@ Unit tests for parsing and data cleaning functions.
 Tests regex patterns for Hebrew text, phone normalization, and data extraction.
 """
 import pytest
+from lxml import html
+from app.scrapers import madlan_scraper, yad2_scraper
 from app.scrapers.yad2_scraper import Yad2Scraper
-from app.utils.phone_normalizer import normalize_israeli_phone
+from app.scrapers.listing_parse import extract_features, extract_location_from_text
+from app.utils.phone_normalizer import normalize_israeli_phone, to_international_phone
 
 
 class TestHebrewParsing:
@@ -51,6 +54,18 @@ class TestHebrewParsing:
         result = scraper._extract_floor(text)
         assert result == expected, f"Failed to extract floor from '{text}'"
 
+    @pytest.mark.parametrize("text,expected", [
+        ('דירת 3.5 חדרים, 85 מ"ר, קומה 3', (3.5, 85.0, 3)),
+        ('קומה 2, 4 חדרים, 100 sqm', (4.0, 100.0, 2)),
+        ('4 חדרים או 5 חדרים', (4.0, None, None)),
+        ('קומה 3 חדרים', (3.0, None, 3)),
+        ('דירה יפה', (None, None, None)),
+    ])
+    def test_extract_details_single_pass(self, db_session, text, expected):
+        """Test combined rooms/size/floor extraction keeps the first match of each"""
+        scraper = Yad2Scraper(db_session)
+        assert scraper._extract_details(text) == expected
+
     @pytest.mark.parametrize("text,expected", [
         ('2,500,000 ₪', 2500000.0),
         ('3,200,000', 3200000.0),
@@ -79,6 +94,7 @@ class TestPhoneNormalization:
         ('050.123.4567', '0501234567'),
         ('(050) 123-4567', '0501234567'),
         ('0501234567', '0501234567'),  # Already normalized
+        ('טלפון: 050-1234567', '0501234567'),  # Surrounding Hebrew text
         ('', None),  # Empty string
         (None, None),  # None input
         ('invalid', None),  # Invalid phone
@@ -88,6 +104,17 @@ class TestPhoneNormalization:
         result = normalize_israeli_phone(input_phone)
         assert result == expected, f"Failed to normalize '{input_phone}'"
 
+    @pytest.mark.parametrize("input_phone,expected", [
+        ('050-123-4567', '972501234567'),
+        ('+972-50-1234567', '972501234567'),
+        ('03-1234567', '97231234567'),
+        ('invalid', None),
+        (None, None),
+    ])
+    def test_to_international_phone(self, input_phone, expected):
+        """Test conversion to the international format used in WhatsApp links"""
+        assert to_international_phone(input_phone) == expected
+
     def test_normalize_phone_removes_spaces(self):
         """Test that normalization removes all spaces"""
         result = normalize_israeli_phone('050 123 45 67')
@@ -107,6 +134,14 @@ class TestPhoneNormalization:
         assert not result.startswith('+')
         assert result == '0501234567'
 
+    def test_normalize_phone_is_memoized(self):
+        """Test that repeated phones are served from the cache"""
+        normalize_israeli_phone('054-765-4321')
+        hits = normalize_israeli_phone.cache_info().hits
+
+        assert normalize_israeli_phone('054-765-4321') == '0547654321'
+        assert normalize_israeli_phone.cache_info().hits == hits + 1
+
 
 class TestLocationParsing:
     """Test location parsing into city, neighborhood, street"""
@@ -141,8 +176,7 @@ class TestFeatureDetection:
     ])
     def test_detect_elevator(self, text, has_elevator):
         """Test elevator detection in text"""
-        text_lower = text.lower()
-        detected = any(word in text_lower for word in ['מעלית', 'elevator'])
+        detected = 'elevator' in extract_features(text)
         assert detected == has_elevator
 
     @pytest.mark.parametrize("text,has_parking", [
@@ -154,8 +188,7 @@ class TestFeatureDetection:
     ])
     def test_detect_parking(self, text, has_parking):
         """Test parking detection in text"""
-        text_lower = text.lower()
-        detected = any(word in text_lower for word in ['חניה', 'parking', 'חנייה'])
+        detected = 'parking' in extract_features(text)
         assert detected == has_parking
 
     @pytest.mark.parametrize("text,has_balcony", [
@@ -167,8 +200,7 @@ class TestFeatureDetection:
     ])
     def test_detect_balcony(self, text, has_balcony):
         """Test balcony detection in text"""
-        text_lower = text.lower()
-        detected = any(word in text_lower for word in ['מרפסת', 'balcony', 'mirpeset'])
+        detected = 'balcony' in extract_features(text)
         assert detected == has_balcony
 
     @pytest.mark.parametrize("text,has_mamad", [
@@ -181,11 +213,42 @@ class TestFeatureDetection:
     ])
     def test_detect_mamad(self, text, has_mamad):
         """Test mamad (safe room) detection in text"""
-        text_lower = text.lower()
-        detected = any(word in text_lower for word in ['ממ"ד', 'ממד', 'mamad', 'מרחב מוגן', 'מקלט'])
+        detected = 'mamad' in extract_features(text)
         assert detected == has_mamad
 
 
+class TestCardSelectors:
+    """Test the primary listing-card XPaths against sample markup"""
+
+    @pytest.mark.parametrize("xpath,card_class", [
+        (yad2_scraper._CARD_XPATHS[0], 'feeditem'),
+        (madlan_scraper._CARD_XPATHS[1], 'listing-card'),
+    ])
+    def test_card_class_xpath_matches_class_token(self, xpath, card_class):
+        """Test that cards carrying extra classes match, like the CSS class selector"""
+        page = html.fromstring(
+            f'<div><div class="{card_class}">a</div>'
+            f'<div class="{card_class} table">b</div>'
+            f'<div class="{card_class}s">c</div></div>'
+        )
+
+        cards = page.xpath(xpath)
+
+        assert [card.text for card in cards] == ['a', 'b']
+
+
+class TestLocationFromText:
+    """Test the city-name fallback used when a card has no location element"""
+
+    def test_returns_context_around_first_city(self):
+        """Test that the leftmost city name is found with its surrounding text"""
+        assert extract_location_from_text('דירה ברמת גן ליד תל אביב') == 'דירה ברמת גן ליד תל אביב'
+
+    def test_no_city(self):
+        """Test that text without a known city yields an empty string"""
+        assert extract_location_from_text('דירה יפה') == ''
+
+
 class TestDataCleaning:
     """Test data cleaning and validation"""
 
@@ -3,6 +3,7 @@ Unit tests for ListingProcessor and DealScoreCalculator.
 Tests deal scoring logic, listing processing, and deduplication.
 """
 import pytest
+from unittest.mock import patch
 from datetime import datetime, timedelta
 from app.core.listing_processor import ListingProcessor
 from app.core.deal_score import DealScoreCalculator
@@ -152,6 +153,37 @@ class TestDealScoreCalculator:
         score = calculator._score_price_competitiveness(listing)
         assert 35 <= score <= 40, f"Expected ~40 points for 30% below market, got {score}"
 
+    def test_batch_reuses_neighborhood_stats(self, db_session, sample_neighborhood_stats):
+        """Test that neighborhood stats are queried once per neighborhood within a batch"""
+        calculator = DealScoreCalculator(db_session)
+        listing = Listing(city='תל אביב', neighborhood='פלורנטין', price_per_sqm=22353)
+
+        with patch.object(db_session, 'query', wraps=db_session.query) as query:
+            with calculator.batch():
+                first = calculator._score_price_competitiveness(listing)
+                second = calculator._score_price_competitiveness(listing)
+            assert query.call_count == 1
+
+            # Outside a batch every call queries again
+            calculator._score_price_competitiveness(listing)
+            assert query.call_count == 2
+
+        assert first == second
+
+    def test_batch_prefetches_neighborhood_stats(self, db_session, sample_neighborhood_stats):
+        """Test that stats for a batch's neighborhoods are fetched in a single query"""
+        calculator = DealScoreCalculator(db_session)
+        known = Listing(city='תל אביב', neighborhood='פלורנטין', price_per_sqm=22353)
+        unknown = Listing(city='Unknown City', neighborhood='Unknown', price_per_sqm=22353)
+
+        with patch.object(db_session, 'query', wraps=db_session.query) as query:
+            with calculator.batch([('תל אביב', 'פלורנטין'), ('Unknown City', 'Unknown')]):
+                known_score = calculator._score_price_competitiveness(known)
+                unknown_score = calculator._score_price_competitiveness(unknown)
+            assert query.call_count == 1
+
+        assert known_score > unknown_score == calculator.settings.deal_score_weight_price * 0.5
+
     def test_features_scoring(self, db_session, test_settings):
         """Test feature matching component of scoring"""
         calculator = DealScoreCalculator(db_session)
@@ -251,6 +283,32 @@ class TestDealScoreCalculator:
         score = calculator._score_price_trend(listing)
         assert score >= 12.0, f"Expected >=12 points for 10% price drop, got {score}"
 
+    def test_get_price_drop_percentages_matches_single_lookup(self, db_session):
+        """Test that the batch price drop lookup agrees with the per-listing one"""
+        calculator = DealScoreCalculator(db_session)
+        now = datetime.utcnow()
+        dropped = Listing(property_hash='dropped', source='yad2', price=900000)
+        raised = Listing(property_hash='raised', source='yad2', price=1100000)
+        single = Listing(property_hash='single', source='yad2', price=1000000)
+        db_session.add_all([dropped, raised, single])
+        db_session.commit()
+        db_session.add_all([
+            PriceHistory(listing_id=dropped.id, price=1200000, timestamp=now - timedelta(days=9)),
+            PriceHistory(listing_id=dropped.id, price=1000000, timestamp=now - timedelta(days=5)),
+            PriceHistory(listing_id=dropped.id, price=900000, timestamp=now),
+            PriceHistory(listing_id=raised.id, price=1000000, timestamp=now - timedelta(days=5)),
+            PriceHistory(listing_id=raised.id, price=1100000, timestamp=now),
+            PriceHistory(listing_id=single.id, price=1000000, timestamp=now),
+        ])
+        db_session.commit()
+        listings = [dropped, raised, single]
+
+        drops = calculator.get_price_drop_percentages(listings)
+
+        assert drops == {listing.id: calculator.get_price_drop_percentage(listing) for listing in listings}
+        assert drops[dropped.id] == pytest.approx(10.0)
+        assert drops[single.id] is None
+
 
 class TestListingProcessor:
     """Test listing processing and deduplication logic"""
@@ -304,6 +362,36 @@ class TestListingProcessor:
         # Verify price history was created
         assert len(sample_listing.price_history) > 0
 
+    def test_process_first_price_is_update(self, db_session, sample_listing, sample_listing_data, test_settings, monkeypatch):
+        """Test that a price appearing on a listing stored without one is an update, not a drop"""
+        monkeypatch.setattr('app.core.listing_processor.settings', test_settings)
+        sample_listing.price = None
+        db_session.commit()
+        processor = ListingProcessor(db_session)
+
+        result = processor.process_single_listing(sample_listing_data, 'yad2')
+
+        assert result == 'updated'
+        assert sample_listing.price == sample_listing_data['price']
+
+    def test_batch_price_change_scores_new_history(self, db_session, sample_listing, sample_listing_data,
+                                                   test_settings, monkeypatch):
+        """Test that a batch update scores the listing with its new, not yet flushed, price history"""
+        monkeypatch.setattr('app.core.listing_processor.settings', test_settings)
+        db_session.add(PriceHistory(listing_id=sample_listing.id, price=2500000,
+                                    timestamp=datetime.utcnow() - timedelta(days=1)))
+        db_session.commit()
+        processor = ListingProcessor(db_session)
+
+        new_data = {**sample_listing_data, 'price': 2000000}
+        stats = processor.process_listings([new_data], 'yad2')
+
+        assert stats['price_drops'] == 1
+        db_session.refresh(sample_listing)
+        assert [entry.price for entry in sample_listing.price_history] == [2500000, 2000000]
+        expected_score = DealScoreCalculator(db_session).calculate_score(sample_listing)
+        assert sample_listing.deal_score == pytest.approx(expected_score)
+
     def test_process_filtered_listing(self, db_session, sample_listing_data):
         """Test that listings outside criteria are filtered"""
         processor = ListingProcessor(db_session)
@@ -342,6 +430,62 @@ class TestListingProcessor:
         assert stats['duplicates'] == 0
         assert stats['filtered'] == 0
 
+    def test_batch_processing_bulk_insert(self, db_session, sample_listing_data, test_settings, monkeypatch):
+        """Test that a batch is inserted in bulk with history and in-batch repeats are duplicates"""
+        monkeypatch.setattr('app.core.listing_processor.settings', test_settings)
+        processor = ListingProcessor(db_session)
+
+        listing1 = sample_listing_data.copy()
+        listing2 = {**sample_listing_data, 'external_id': '12346', 'price': 2600000,
+                    'address': 'רחוב דיזנגוף 10, רמת אביב, תל אביב',
+                    'street': 'רחוב דיזנגוף 10', 'rooms': 4.0, 'size_sqm': 95.0}
+
+        stats = processor.process_listings([listing1, listing2, listing1.copy()], 'yad2')
+
+        assert stats['new'] == 2, f"Should create 2 new listings, got stats: {stats}"
+        assert stats['duplicates'] == 1
+
+        listings = db_session.query(Listing).order_by(Listing.id).all()
+        assert [listing.external_id for listing in listings] == ['12345', '12346']
+        for listing in listings:
+            assert listing.deal_score is not None
+            history = db_session.query(PriceHistory).filter_by(listing_id=listing.id).all()
+            assert [entry.price for entry in history] == [listing.price]
+
+    def test_batch_same_phone_similar_address_is_duplicate(self, db_session, sample_listing_data,
+                                                          test_settings, monkeypatch):
+        """Test that a queued listing is matched by phone and fuzzy address within the batch"""
+        monkeypatch.setattr('app.core.listing_processor.settings', test_settings)
+        processor = ListingProcessor(db_session)
+
+        first = sample_listing_data.copy()
+        # Same phone, reformatted address and another size, so the property hash differs
+        repeat = {**sample_listing_data, 'external_id': '99999',
+                  'address': 'הרצל, פלורנטין, תל-אביב', 'size_sqm': 86.0}
+
+        stats = processor.process_listings([first, repeat], 'yad2')
+
+        assert stats['new'] == 1, f"Should create 1 new listing, got stats: {stats}"
+        assert stats['duplicates'] == 1
+        assert db_session.query(Listing).count() == 1
+
+    def test_batch_duplicates_are_merged(self, db_session, sample_listing_data, test_settings, monkeypatch):
+        """Test that a repeat within a batch fills in fields missing from the first occurrence"""
+        monkeypatch.setattr('app.core.listing_processor.settings', test_settings)
+        processor = ListingProcessor(db_session)
+
+        first = {**sample_listing_data, 'description': '', 'contact_name': None}
+        repeat = {**sample_listing_data, 'description': 'דירה משופצת', 'contact_name': 'Dana', 'price': 2400000}
+
+        stats = processor.process_listings([first, repeat], 'yad2')
+
+        assert stats['new'] == 1
+        assert stats['duplicates'] == 1
+        listing = db_session.query(Listing).one()
+        assert listing.description == 'דירה משופצת'
+        assert listing.contact_name == 'Dana'
+        assert listing.price == sample_listing_data['price']
+
     def test_phone_normalization(self, db_session, sample_listing_data, test_settings, monkeypatch):
         """Test that phone numbers are normalized"""
         monkeypatch.setattr('app.core.listing_processor.settings', test_settings)
@@ -3,9 +3,13 @@ Unit tests for scheduler service
 """
 import pytest
 import asyncio
+import threading
+import time
 from unittest.mock import Mock, patch, AsyncMock, MagicMock
-from datetime import datetime
+from datetime import datetime, timedelta
 
+from app.core.config import settings
+from app.core.database import Listing
 from app.services.scheduler import ScrapingScheduler
 
 
@@ -61,6 +65,24 @@ class TestScrapingScheduler:
                 assert scheduler.is_running is True
                 mock_scheduler_instance.start.assert_called_once()
 
+    def test_start_staggers_scrape_jobs(self, scheduler):
+        """Test that each source's first run is offset from the others"""
+        scheduler.scheduler = Mock()
+
+        with patch.object(scheduler, 'run_initial_scrape', new_callable=AsyncMock):
+            with patch('asyncio.create_task'):
+                scheduler.start()
+
+        calls = {c.kwargs['id']: c.kwargs for c in scheduler.scheduler.add_job.call_args_list}
+        first_runs = [calls[f'{source}_scraper']['next_run_time'] for source in ('yad2', 'madlan', 'facebook')]
+
+        assert calls['yad2_scraper']['trigger'].jitter == settings.scrape_jitter_seconds
+        assert len(set(first_runs)) == 3
+        assert first_runs[1] - first_runs[0] == timedelta(
+            minutes=settings.madlan_interval_minutes - settings.yad2_interval_minutes,
+            seconds=settings.scrape_stagger_seconds
+        )
+
     def test_stop(self, scheduler):
         """Test stopping the scheduler"""
         scheduler.is_running = True
@@ -93,6 +115,75 @@ class TestScrapingScheduler:
                             mock_facebook.assert_called_once()
                             mock_stats.assert_called_once()
 
+    @pytest.mark.asyncio
+    async def test_run_initial_scrape_runs_sources_concurrently(self, scheduler):
+        """Test that the initial scrapes are started together instead of one after another"""
+        started = []
+        all_started = asyncio.Event()
+
+        def fake_scrape(source):
+            async def scrape():
+                started.append(source)
+                if len(started) == 3:
+                    all_started.set()
+                await asyncio.wait_for(all_started.wait(), timeout=1)
+            return scrape
+
+        with patch.object(scheduler, 'scrape_yad2', side_effect=fake_scrape('yad2')):
+            with patch.object(scheduler, 'scrape_madlan', side_effect=fake_scrape('madlan')):
+                with patch.object(scheduler, 'scrape_facebook', side_effect=fake_scrape('facebook')):
+                    with patch.object(scheduler, 'update_stats', new_callable=AsyncMock) as mock_stats:
+                        with patch('asyncio.sleep', new_callable=AsyncMock):
+                            await scheduler.run_initial_scrape()
+
+        assert sorted(started) == ['facebook', 'madlan', 'yad2']
+        mock_stats.assert_called_once()
+
+    @pytest.mark.asyncio
+    async def test_run_scraper_serializes_browser_work(self, scheduler):
+        """Test that scrapers sharing the browser never run at the same time"""
+        active = []
+        overlaps = []
+
+        def run_attempt(attempt):
+            overlaps.append(bool(active))
+            active.append(1)
+            time.sleep(0.05)
+            active.pop()
+            return []
+
+        scraper = Mock(run_attempt=run_attempt, max_retries=1)
+        await asyncio.gather(scheduler._run_scraper(scraper), scheduler._run_scraper(scraper))
+
+        assert overlaps == [False, False]
+
+    @pytest.mark.asyncio
+    async def test_run_scraper_releases_browser_during_backoff(self, scheduler):
+        """Test that a failing source's retry backoff doesn't hold the browser from other sources"""
+        events = []
+
+        def failing_attempt(attempt):
+            events.append(f'failing {attempt}')
+            return None if attempt == 0 else []
+
+        def other_attempt(attempt):
+            events.append('other')
+            return [{'title': 'Test'}]
+
+        failing = Mock(run_attempt=failing_attempt, max_retries=2)
+        failing.backoff_delay.return_value = 0.2
+        other = Mock(run_attempt=other_attempt, max_retries=2)
+
+        async def start_other_later():
+            await asyncio.sleep(0.05)
+            return await scheduler._run_scraper(other)
+
+        results = await asyncio.gather(scheduler._run_scraper(failing), start_other_later())
+
+        assert events == ['failing 0', 'other', 'failing 1']
+        assert results == [[], [{'title': 'Test'}]]
+        failing.give_up.assert_not_called()
+
     @pytest.mark.asyncio
     async def test_scrape_yad2(self, scheduler):
         """Test Yad2 scraping"""
@@ -106,8 +197,8 @@ class TestScrapingScheduler:
                     mock_scraper = Mock()
                     mock_scraper_class.return_value = mock_scraper
 
-                    mock_retry = Mock()
-                    mock_retry.scrape_with_retry.return_value = [{'title': 'Test'}]
+                    mock_retry = Mock(max_retries=3)
+                    mock_retry.run_attempt.return_value = [{'title': 'Test'}]
                     mock_retry_class.return_value = mock_retry
 
                     mock_processor = Mock()
@@ -120,8 +211,9 @@ class TestScrapingScheduler:
 
                     with patch.object(scheduler, '_notify_new_listings', new_callable=AsyncMock):
                         with patch('asyncio.get_event_loop') as mock_loop:
+                            # Run executor work inline: the scrape and then the listing processing
                             mock_loop.return_value.run_in_executor = AsyncMock(
-                                return_value=[{'title': 'Test'}]
+                                side_effect=lambda executor, func, *args: func(*args)
                             )
 
                             await scheduler.scrape_yad2()
@@ -129,6 +221,21 @@ class TestScrapingScheduler:
                             mock_scraper_class.assert_called_once()
                             mock_processor.process_listings.assert_called_once()
 
+    @pytest.mark.asyncio
+    async def test_process_listings_runs_off_event_loop(self, scheduler):
+        """Test that blocking listing processing runs in the thread pool, not on the loop thread"""
+        threads = []
+        scheduler.SessionLocal = Mock(return_value=Mock())
+
+        with patch('app.services.scheduler.ListingProcessor') as mock_processor_class:
+            mock_processor_class.return_value.process_listings.side_effect = lambda listings, source: (
+                threads.append(threading.get_ident()) or {'new': 0, 'price_drops': 0}
+            )
+
+            await scheduler._process_listings([{'title': 'Test'}], 'yad2', 'Yad2')
+
+        assert threads and threads[0] != threading.get_ident()
+
     @pytest.mark.asyncio
     async def test_scrape_yad2_shutdown(self, scheduler):
         """Test Yad2 scraping with shutdown signal"""
@@ -145,8 +252,8 @@ class TestScrapingScheduler:
 
         with patch('app.services.scheduler.Yad2Scraper'):
             with patch('app.services.scheduler.ScraperWithRetry') as mock_retry_class:
-                mock_retry = Mock()
-                mock_retry.scrape_with_retry.return_value = []
+                mock_retry = Mock(max_retries=3)
+                mock_retry.run_attempt.return_value = []
                 mock_retry_class.return_value = mock_retry
 
                 with patch('asyncio.get_event_loop') as mock_loop:
@@ -167,8 +274,8 @@ class TestScrapingScheduler:
                     mock_scraper = Mock()
                     mock_scraper_class.return_value = mock_scraper
 
-                    mock_retry = Mock()
-                    mock_retry.scrape_with_retry.return_value = [{'title': 'Test'}]
+                    mock_retry = Mock(max_retries=3)
+                    mock_retry.run_attempt.return_value = [{'title': 'Test'}]
                     mock_retry_class.return_value = mock_retry
 
                     mock_processor = Mock()
@@ -200,8 +307,8 @@ class TestScrapingScheduler:
                     mock_scraper = Mock()
                     mock_scraper_class.return_value = mock_scraper
 
-                    mock_retry = Mock()
-                    mock_retry.scrape_with_retry.return_value = [{'title': 'Test'}]
+                    mock_retry = Mock(max_retries=3)
+                    mock_retry.run_attempt.return_value = [{'title': 'Test'}]
                     mock_retry_class.return_value = mock_retry
 
                     mock_processor = Mock()
@@ -251,6 +358,7 @@ class TestScrapingScheduler:
         mock_listing = Mock()
         mock_listing.deal_score = 85
         mock_listing.first_seen = datetime.utcnow()
+        mock_listing.last_seen = datetime.utcnow()
         mock_listing.status = 'unseen'
 
         mock_query = Mock()
@@ -262,13 +370,84 @@ class TestScrapingScheduler:
 
         with patch('app.services.scheduler.TelegramNotifier') as mock_notifier_class:
             with patch('asyncio.sleep', new_callable=AsyncMock):
+                mock_notifier_class.batch_lock.return_value = asyncio.Lock()
                 mock_notifier = Mock()
-                mock_notifier.notify_high_score = AsyncMock()
+                mock_notifier.prepare_notifications.return_value = [(mock_listing, 'high_score', 'Test')]
+                mock_notifier.send_prepared = AsyncMock(return_value=[(mock_listing, 'high_score', 'Test')])
+                mock_notifier.record_notifications.return_value = 1
                 mock_notifier_class.return_value = mock_notifier
 
                 await scheduler._notify_new_listings(mock_db, stats)
 
-                mock_notifier.notify_high_score.assert_called_once()
+                mock_notifier.prepare_notifications.assert_called_once_with([
+                    (mock_listing, 'high_score'),
+                    (mock_listing, 'price_drop')
+                ])
+                mock_notifier.send_prepared.assert_awaited_once_with([(mock_listing, 'high_score', 'Test')])
+                mock_notifier.record_notifications.assert_called_once_with([(mock_listing, 'high_score', 'Test')])
+
+    @pytest.mark.asyncio
+    async def test_notify_new_listings_queries_off_event_loop(self, scheduler):
+        """Test that loading and recording a notification batch run in the thread pool"""
+        threads = {}
+        prepared = [(Mock(), 'new_listing', 'Test')]
+
+        def prepare(db, notifier):
+            threads['prepare'] = threading.get_ident()
+            return prepared
+
+        async def send(items):
+            threads['send'] = threading.get_ident()
+            return items
+
+        def record(sent):
+            threads['record'] = threading.get_ident()
+            return len(sent)
+
+        with patch('app.services.scheduler.TelegramNotifier') as mock_notifier_class:
+            mock_notifier_class.batch_lock.return_value = asyncio.Lock()
+            mock_notifier = Mock(send_prepared=send, record_notifications=record)
+            mock_notifier_class.return_value = mock_notifier
+
+            with patch.object(scheduler, '_prepare_notifications', side_effect=prepare):
+                await scheduler._notify_new_listings(Mock(), {'new': 1, 'price_drops': 0})
+
+        loop_thread = threading.get_ident()
+        assert threads['send'] == loop_thread
+        assert threads['prepare'] != loop_thread
+        assert threads['record'] != loop_thread
+
+    @pytest.mark.asyncio
+    async def test_notify_new_listings_single_query(self, scheduler, db_session):
+        """Test that new listings and price drop candidates come from one query"""
+        now = datetime.utcnow()
+        new_listing = Listing(property_hash='new', source='yad2', status='unseen',
+                              deal_score=90, first_seen=now, last_seen=now)
+        seen_listing = Listing(property_hash='seen', source='yad2', status='unseen',
+                               deal_score=50, first_seen=now - timedelta(days=3), last_seen=now)
+        old_listing = Listing(property_hash='old', source='yad2', status='unseen',
+                              deal_score=50, first_seen=now - timedelta(days=3), last_seen=now - timedelta(days=1))
+        db_session.add_all([new_listing, seen_listing, old_listing])
+        db_session.commit()
+
+        stats = {'new': 1, 'price_drops': 0}
+
+        with patch('app.services.scheduler.TelegramNotifier') as mock_notifier_class:
+            with patch('asyncio.sleep', new_callable=AsyncMock):
+                mock_notifier_class.batch_lock.return_value = asyncio.Lock()
+                mock_notifier = Mock()
+                mock_notifier.prepare_notifications.return_value = []
+                mock_notifier.send_prepared = AsyncMock(return_value=[])
+                mock_notifier_class.return_value = mock_notifier
+
+                with patch.object(db_session, 'query', wraps=db_session.query) as mock_query:
+                    await scheduler._notify_new_listings(db_session, stats)
+
+        mock_query.assert_called_once()
+        items = mock_notifier.prepare_notifications.call_args.args[0]
+        assert [item for item in items if item[1] != 'price_drop'] == [(new_listing, 'high_score')]
+        notified_drops = {listing.property_hash for listing, kind in items if kind == 'price_drop'}
+        assert notified_drops == {'new', 'seen'}
 
     @pytest.mark.asyncio
     async def test_notify_new_listings_no_new(self, scheduler):
@@ -1,11 +1,12 @@
 """
 Unit tests for telegram notifier service
 """
+import asyncio
 import pytest
 from unittest.mock import Mock, patch, AsyncMock
 from datetime import datetime, timedelta
 
-from app.services.telegram_notifier import TelegramNotifier, send_test_notification
+from app.services.telegram_notifier import TelegramNotifier, send_test_notification, _bots
 from app.core.database import Listing, Notification
 
 
@@ -40,6 +41,18 @@ def mock_listing():
     return listing
 
 
+@pytest.fixture(autouse=True)
+def reset_send_slot():
+    """Start every test with a free Telegram send slot and no cached Bot"""
+    TelegramNotifier._next_send_at = 0.0
+    TelegramNotifier._notify_lock = None
+    _bots.clear()
+    yield
+    TelegramNotifier._next_send_at = 0.0
+    TelegramNotifier._notify_lock = None
+    _bots.clear()
+
+
 @pytest.fixture
 def notifier_enabled(mock_db_session):
     """Create notifier with Telegram enabled"""
@@ -49,6 +62,7 @@ def notifier_enabled(mock_db_session):
         mock_settings.telegram_chat_id = "test_chat_id"
         mock_settings.min_deal_score_notify = 80
         mock_settings.min_price_drop_percent_notify = 10
+        mock_settings.telegram_send_interval_seconds = 1.0
         mock_settings.get_high_priority_neighborhoods_list.return_value = ["Center"]
 
         with patch('app.services.telegram_notifier.Bot') as mock_bot_class:
@@ -76,6 +90,21 @@ class TestTelegramNotifier:
         assert notifier_enabled.bot is not None
         assert notifier_enabled.chat_id is not None
 
+    def test_init_reuses_bot_across_notifiers(self, mock_db_session):
+        """Test that notifiers created for separate runs share one Bot and its connections"""
+        with patch('app.services.telegram_notifier.settings') as mock_settings:
+            mock_settings.is_telegram_enabled.return_value = True
+            mock_settings.telegram_bot_token = "test_token"
+            mock_settings.get_high_priority_neighborhoods_list.return_value = []
+
+            with patch('app.services.telegram_notifier.Bot') as mock_bot_class:
+                with patch('app.services.telegram_notifier.DealScoreCalculator'):
+                    first = TelegramNotifier(mock_db_session)
+                    second = TelegramNotifier(mock_db_session)
+
+        assert first.bot is second.bot
+        mock_bot_class.assert_called_once()
+
     def test_init_disabled(self, notifier_disabled):
         """Test initialization with Telegram disabled"""
         assert notifier_disabled.bot is None
@@ -184,6 +213,104 @@ class TestTelegramNotifier:
 
         assert result is False
 
+    @pytest.mark.asyncio
+    async def test_notify_many_sends_concurrently_and_commits_once(self, notifier_enabled, mock_listing):
+        """Test that a batch is sent together and recorded with one bulk insert"""
+        skipped_listing = Mock(spec=Listing)
+        skipped_listing.deal_score = 50
+
+        with patch.object(notifier_enabled, '_load_notified_index', return_value={}):
+            with patch.object(notifier_enabled, '_send_message', side_effect=[True, False]) as mock_send:
+                with patch.object(notifier_enabled, '_build_listing_message', return_value="Test message"):
+                    sent = await notifier_enabled.notify_many([
+                        (mock_listing, 'high_score'),
+                        (skipped_listing, 'high_score'),
+                        (mock_listing, 'new_listing')
+                    ])
+
+        assert sent == 1
+        assert mock_send.call_count == 2
+        recorded = notifier_enabled.db.execute.call_args[0][1]
+        assert [row['notification_type'] for row in recorded] == ['high_score']
+        notifier_enabled.db.commit.assert_called_once()
+
+    @pytest.mark.asyncio
+    async def test_notify_many_overlapping_batches_notify_once(self, notifier_enabled, db_session):
+        """Test that a batch started while another is still sending sees the first batch's records"""
+        listing = Listing(property_hash='hash_overlap', source='yad2', status='unseen', deal_score=90)
+        db_session.add(listing)
+        db_session.commit()
+        notifier_enabled.db = db_session
+
+        async def slow_send(message):
+            await asyncio.sleep(0.05)
+            return True
+
+        with patch.object(notifier_enabled, '_send_message', side_effect=slow_send) as mock_send:
+            with patch.object(notifier_enabled, '_build_listing_message', return_value="Test message"):
+                results = await asyncio.gather(
+                    notifier_enabled.notify_many([(listing, 'high_score')]),
+                    notifier_enabled.notify_many([(listing, 'high_score')])
+                )
+
+        assert sorted(results) == [0, 1]
+        assert mock_send.call_count == 1
+        assert db_session.query(Notification).filter_by(listing_id=listing.id).count() == 1
+
+    @pytest.mark.asyncio
+    async def test_notify_many_loads_history_in_one_query(self, notifier_enabled, db_session):
+        """Test that the batch checks notification history with one query instead of one per listing"""
+        listings = [
+            Listing(property_hash=f'hash_{i}', source='yad2', status='unseen', deal_score=90)
+            for i in range(3)
+        ]
+        db_session.add_all(listings)
+        db_session.commit()
+        db_session.add_all([
+            Notification(listing_id=listings[0].id, notification_type='high_score', sent_at=datetime.utcnow()),
+            Notification(listing_id=listings[1].id, notification_type='price_drop',
+                         sent_at=datetime.utcnow() - timedelta(hours=1)),
+            Notification(listing_id=listings[2].id, notification_type='price_drop',
+                         sent_at=datetime.utcnow() - timedelta(days=3)),
+        ])
+        db_session.commit()
+        notifier_enabled.db = db_session
+        notifier_enabled.deal_calculator.get_price_drop_percentages.return_value = {
+            listing.id: 20 for listing in listings
+        }
+
+        with patch.object(notifier_enabled, '_send_message', return_value=True) as mock_send:
+            with patch.object(notifier_enabled, '_build_listing_message', side_effect=lambda listing, **kw: listing.property_hash):
+                with patch.object(db_session, 'query', wraps=db_session.query) as mock_query:
+                    sent = await notifier_enabled.notify_many(
+                        [(listing, 'high_score') for listing in listings] +
+                        [(listing, 'price_drop') for listing in listings]
+                    )
+
+        mock_query.assert_called_once()
+        # Already sent: high score for listing 0, and a price drop within 24 hours for listing 1
+        assert sorted(call.args[0] for call in mock_send.call_args_list) == [
+            'hash_0', 'hash_1', 'hash_2', 'hash_2'
+        ]
+        assert sent == 4
+        assert db_session.query(Notification).count() == 7
+
+    @pytest.mark.asyncio
+    async def test_notify_disabled_skips_message_building(self, notifier_disabled, mock_listing):
+        """Test that a disabled notifier returns before any query or message building"""
+        with patch.object(notifier_disabled, '_build_listing_message') as mock_build:
+            assert await notifier_disabled.notify_price_drop(mock_listing) is False
+            assert await notifier_disabled.notify_many([(mock_listing, 'new_listing')]) == 0
+
+        mock_build.assert_not_called()
+        notifier_disabled.db.query.assert_not_called()
+        notifier_disabled.deal_calculator.get_price_drop_percentage.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_notify_many_disabled(self, notifier_disabled, mock_listing):
+        """Test that nothing is sent when Telegram is disabled"""
+        assert await notifier_disabled.notify_many([(mock_listing, 'new_listing')]) == 0
+
     def test_should_notify_not_interested(self, notifier_enabled, mock_listing):
         """Test should notify for not interested listing"""
         mock_listing.status = "not_interested"
@@ -217,6 +344,22 @@ class TestTelegramNotifier:
 
         assert result is True
 
+    def test_should_notify_snapshots_settings(self, mock_db_session, mock_listing):
+        """Test that notification criteria are read once, when the notifier is created"""
+        with patch('app.services.telegram_notifier.settings') as mock_settings:
+            mock_settings.is_telegram_enabled.return_value = False
+            mock_settings.min_deal_score_notify = 80
+            mock_settings.get_high_priority_neighborhoods_list.return_value = ["Center"]
+
+            with patch('app.services.telegram_notifier.DealScoreCalculator'):
+                notifier = TelegramNotifier(mock_db_session)
+
+            mock_listing.deal_score = 50
+            mock_listing.neighborhood = "Center"
+            assert notifier._should_notify(mock_listing, 'new_listing') is True
+            assert notifier._should_notify(mock_listing, 'new_listing') is True
+            mock_settings.get_high_priority_neighborhoods_list.assert_called_once()
+
     def test_should_notify_low_score_normal_neighborhood(self, notifier_enabled, mock_listing):
         """Test should not notify for low score in normal neighborhood"""
         mock_listing.deal_score = 50
@@ -299,6 +442,21 @@ class TestTelegramNotifier:
         assert result is True
         notifier_enabled.bot.send_message.assert_called_once()
 
+    @pytest.mark.asyncio
+    async def test_send_message_waits_only_for_remaining_interval(self, notifier_enabled):
+        """Test that consecutive sends are spaced by the interval, and the first one doesn't wait"""
+        notifier_enabled.bot.send_message = AsyncMock()
+
+        with patch('app.services.telegram_notifier.time.monotonic', side_effect=[100.0, 100.25]):
+            with patch('asyncio.sleep', new_callable=AsyncMock) as mock_sleep:
+                await notifier_enabled._send_message("First")
+                mock_sleep.assert_not_awaited()
+
+                await notifier_enabled._send_message("Second")
+                mock_sleep.assert_awaited_once_with(0.75)
+
+        assert notifier_enabled.bot.send_message.call_count == 2
+
     @pytest.mark.asyncio
     async def test_send_message_no_bot(self, notifier_disabled):
         """Test sending message with no bot"""